@@ -1,14 +1,14 @@
 # -*- coding: utf-8 -*-
-from typing import TYPE_CHECKING
-
-import ipyflow.api
-from ipyflow import singletons
-from ipyflow.api import *  # noqa: F403
-from ipyflow.kernel.kernel import IPyflowKernel, UsesIPyflowKernel
-from ipyflow.shell import load_ipython_extension as load_ipyflow_extension, unload_ipython_extension as unload_ipyflow_extension
-from ipyflow.models import cell_above, cell_below, cell_at_offset, cells, last_run_cell, namespaces, scopes, statements, symbols, timestamps
-from ipyflow.singletons import flow, kernel, shell, tracer
-from ipyflow.tracing.uninstrument import uninstrument
+"""
+Most of ipyflow (the tracer, the dataflow graph, IPython and the kernel) is
+expensive to import and not needed by e.g. the Jupyter server extension hooks
+below, so the names exported here get imported on first access instead.
+"""
+import importlib
+import importlib.util
+import sys
+import types
+from typing import TYPE_CHECKING, Any, List
 
 from . import _version
 __version__ = _version.get_versions()['version']
@@ -16,6 +16,108 @@ __version__ = _version.get_versions()['version']
 if TYPE_CHECKING:
     from IPython import InteractiveShell
 
+    from ipyflow.api import code, deps, has_tag, lift, mutate, rdeps, replay, reproduce_cell, rusers, set_tag, stderr, stdout, timestamp, unset_tag, users, value_at, watchpoints
+    from ipyflow.kernel.kernel import IPyflowKernel as IPyflowKernel, UsesIPyflowKernel as UsesIPyflowKernel
+    from ipyflow.shell import load_ipython_extension as load_ipyflow_extension, unload_ipython_extension as unload_ipyflow_extension  # noqa: F401
+    from ipyflow.models import cell_above, cell_below, cell_at_offset, cells, last_run_cell, namespaces, scopes, statements, symbols, timestamps
+    from ipyflow.singletons import flow, kernel, shell, tracer
+    from ipyflow.tracing.uninstrument import uninstrument
+
+
+# the api names are kept in sync with ipyflow.api.__all__ by test_import_time.py
+__all__ = [
+    "__version__",
+    "cell_above",
+    "cell_below",
+    "cell_at_offset",
+    "cells",
+    "code",
+    "deps",
+    "flow",
+    "has_tag",
+    "kernel",
+    "last_run_cell",
+    "lift",
+    "mutate",
+    "namespaces",
+    "rdeps",
+    "replay",
+    "reproduce_cell",
+    "rusers",
+    "scopes",
+    "set_tag",
+    "shell",
+    "statements",
+    "stderr",
+    "stdout",
+    "symbols",
+    "timestamp",
+    "timestamps",
+    "tracer",
+    "uninstrument",
+    "unset_tag",
+    "users",
+    "value_at",
+    "watchpoints",
+]
+
+
+_LAZY_ATTRS = {
+    "IPyflowKernel": ("ipyflow.kernel.kernel", "IPyflowKernel"),
+    "UsesIPyflowKernel": ("ipyflow.kernel.kernel", "UsesIPyflowKernel"),
+    "load_ipyflow_extension": ("ipyflow.shell", "load_ipython_extension"),
+    "unload_ipyflow_extension": ("ipyflow.shell", "unload_ipython_extension"),
+    **{
+        name: ("ipyflow.models", name)
+        for name in (
+            "cell_above",
+            "cell_below",
+            "cell_at_offset",
+            "cells",
+            "last_run_cell",
+            "namespaces",
+            "scopes",
+            "statements",
+            "symbols",
+            "timestamps",
+        )
+    },
+    **{name: ("ipyflow.singletons", name) for name in ("flow", "kernel", "shell", "tracer")},
+    "uninstrument": ("ipyflow.tracing.uninstrument", "uninstrument"),
+}
+
+
+class _IPyflowModule(types.ModuleType):
+    def __setattr__(self, name: str, value: Any) -> None:
+        # importing e.g. ipyflow.flow or ipyflow.shell would otherwise shadow
+        # the singleton accessors with the same names
+        if isinstance(value, types.ModuleType) and name in _LAZY_ATTRS:
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _IPyflowModule
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRS:
+        module_name, attr = _LAZY_ATTRS[name]
+        value: Any = getattr(importlib.import_module(module_name), attr)
+    elif name.startswith("_") or importlib.util.find_spec(f"{__name__}.{name}"):
+        # let the import system deal with submodules, and don't let probes for
+        # dunders and such drag in the api
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    elif name in __all__:
+        value = getattr(importlib.import_module("ipyflow.api"), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | set(__all__))
+
 
 def _jupyter_server_extension_paths():
     return [{"module": "ipyflow"}]
@@ -32,6 +134,10 @@ def load_jupyter_server_extension(nbapp):
 
 
 def load_ipython_extension(ipy: "InteractiveShell", do_asyncio_patches: bool = False) -> None:
+    from ipyflow import singletons
+    from ipyflow.kernel.kernel import IPyflowKernel, UsesIPyflowKernel
+    from ipyflow.shell import load_ipython_extension as load_ipyflow_extension
+
     load_ipyflow_extension(ipy)
     kernel = getattr(ipy, "kernel", None)
     if kernel is None:
@@ -54,6 +160,9 @@ def load_ipython_extension(ipy: "InteractiveShell", do_asyncio_patches: bool = F
 
 
 def unload_ipython_extension(ipy: "InteractiveShell") -> None:
+    from ipyflow.kernel.kernel import IPyflowKernel
+    from ipyflow.shell import unload_ipython_extension as unload_ipyflow_extension
+
     unload_ipyflow_extension(ipy)
     kernel = getattr(ipy, "kernel", None)
     if kernel is None:
@@ -69,26 +178,6 @@ def unload_ipython_extension(ipy: "InteractiveShell") -> None:
         IPyflowKernel.client_comm.send({"type": "unestablish", "success": True})  # type: ignore
 
 
-__all__ = ipyflow.api.__all__ + [
-    "__version__",
-    "cell_above",
-    "cell_below",
-    "cell_at_offset",
-    "cells",
-    "flow",
-    "kernel",
-    "last_run_cell",
-    "namespaces",
-    "scopes",
-    "shell",
-    "statements",
-    "symbols",
-    "timestamps",
-    "tracer",
-    "uninstrument",
-]
-
-
 def main():
     import sys
     # Remove the CWD from sys.path while we load stuff.
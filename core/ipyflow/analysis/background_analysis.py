@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Parses and runs liveness analysis for edited (but not executing) cells on a
+worker thread, so that notebook edits do not compete with user code for the
+kernel's main thread. Workers only ever see an immutable snapshot of a cell's
+sanitized content; their results get joined into the flow graph on the main
+thread, between executions.
+"""
+import ast
+import logging
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from ipyflow.analysis.live_refs import compute_live_dead_symbol_refs
+from ipyflow.analysis.symbol_ref import (
+    LiveSymbolRef,
+    SymbolRef,
+    resolve_slice_to_constant,
+)
+from ipyflow.types import IdType
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+class StaticAnalysisResult(NamedTuple):
+    content: str
+    cell_ctr: int
+    live_refs: Set[LiveSymbolRef]
+    dead_refs: Set[SymbolRef]
+    modified_refs: Set[SymbolRef]
+    # e.g. `d[k]`, which only resolves precisely (to `d["a"]` when `k == "a"`)
+    # given the global scope that workers can't access; such cells need to
+    # get analyzed on the main thread instead
+    needs_scope: bool
+
+
+def _has_name_subscript(module: ast.Module) -> bool:
+    return any(
+        isinstance(node, ast.Subscript)
+        and isinstance(resolve_slice_to_constant(node), ast.Name)
+        for node in ast.walk(module)
+    )
+
+
+def analyze_snapshot(
+    content: str, sanitized_content: str, cell_ctr: int
+) -> Optional[StaticAnalysisResult]:
+    try:
+        module = ast.parse(sanitized_content)
+    except SyntaxError:
+        return None
+    if _has_name_subscript(module):
+        return StaticAnalysisResult(content, cell_ctr, set(), set(), set(), True)
+    live_refs, dead_refs, modified_refs = compute_live_dead_symbol_refs(
+        module, include_killed_live=cell_ctr > 0
+    )
+    return StaticAnalysisResult(
+        content, cell_ctr, live_refs, dead_refs, modified_refs, False
+    )
+
+
+class BackgroundStaticAnalyzer:
+    def __init__(self, max_workers: int = 1) -> None:
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending_by_cell_id: Dict[
+            IdType, Tuple[str, "Future[Optional[StaticAnalysisResult]]"]
+        ] = {}
+        self.num_submitted = 0
+        self.num_cancelled = 0
+
+    @property
+    def has_pending(self) -> bool:
+        return len(self._pending_by_cell_id) > 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="ipyflow-static-analysis",
+            )
+        return self._executor
+
+    def is_pending_for(self, cell_id: IdType, content: str) -> bool:
+        pending = self._pending_by_cell_id.get(cell_id)
+        return pending is not None and pending[0] == content
+
+    def submit(
+        self,
+        cell_id: IdType,
+        content: str,
+        sanitized_content: str,
+        cell_ctr: int,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> None:
+        if self.is_pending_for(cell_id, content):
+            return
+        self.cancel(cell_id)
+        future = self._get_executor().submit(
+            analyze_snapshot, content, sanitized_content, cell_ctr
+        )
+        self.num_submitted += 1
+        self._pending_by_cell_id[cell_id] = (content, future)
+        if on_done is not None:
+            future.add_done_callback(lambda _: on_done())
+
+    def cancel(self, cell_id: IdType) -> None:
+        pending = self._pending_by_cell_id.pop(cell_id, None)
+        if pending is None:
+            return
+        # results of analyses that already started just get dropped when done
+        pending[1].cancel()
+        self.num_cancelled += 1
+
+    def pop_completed(self) -> List[Tuple[IdType, StaticAnalysisResult]]:
+        completed = []
+        for cell_id, (_, future) in list(self._pending_by_cell_id.items()):
+            if not future.done():
+                continue
+            del self._pending_by_cell_id[cell_id]
+            try:
+                result = future.result()
+            except CancelledError:
+                continue
+            except Exception:
+                logger.exception("static analysis failed for cell %s", cell_id)
+                continue
+            if result is not None:
+                completed.append((cell_id, result))
+        return completed
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        wait_for_futures(
+            [future for _, future in self._pending_by_cell_id.values()],
+            timeout=timeout,
+        )
+
+    def suspend_workers(self) -> None:
+        """
+        Finishes in-flight analyses and joins the worker threads, e.g. so that
+        none of them holds a lock across a fork; workers restart on demand.
+        """
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def shutdown(self) -> None:
+        for cell_id in list(self._pending_by_cell_id):
+            self.cancel(cell_id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
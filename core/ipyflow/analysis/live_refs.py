@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import ast
 import builtins
+import copy
 import itertools
 import logging
 import sys
@@ -14,7 +15,6 @@ from typing import (
     Set,
     Tuple,
     Union,
-    cast,
 )
 
 from ipyflow.analysis.mixins import (
@@ -27,6 +27,7 @@ from ipyflow.analysis.symbol_ref import Atom, LiveSymbolRef, SymbolRef, visit_st
 from ipyflow.config import FlowDirection
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.singletons import flow, tracer
+from ipyflow.utils.ast_utils import subscript_to_slice
 
 if TYPE_CHECKING:
     from ipyflow.data_model.scope import Scope
@@ -50,6 +51,29 @@ def _chain_root(node: ast.AST):
     return node
 
 
+def _split_constant_list_subscript(node: ast.Subscript) -> List[ast.Subscript]:
+    """
+    Splits e.g. `df[["a", "b"]]` into `df["a"]` and `df["b"]`, so that selecting
+    several columns of a dataframe only uses those columns rather than all of it.
+    """
+    slc = subscript_to_slice(node)
+    if (
+        not isinstance(slc, ast.List)
+        or len(slc.elts) == 0
+        or not all(
+            isinstance(elt, ast.Constant) and isinstance(elt.value, (int, str))
+            for elt in slc.elts
+        )
+    ):
+        return [node]
+    return [
+        ast.copy_location(
+            ast.Subscript(value=node.value, slice=elt, ctx=ast.Load()), node
+        )
+        for elt in slc.elts
+    ]
+
+
 # TODO: have the logger warnings additionally raise exceptions for tests
 class ComputeLiveSymbolRefs(
     SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitListsMixin, ast.NodeVisitor
@@ -408,7 +432,8 @@ class ComputeLiveSymbolRefs(
             # skip quasiquoted values
             return
         if not self._inside_attrsub and not isinstance(_chain_root(node), ast.BinOp):
-            self._add_attrsub_to_live_if_eligible(SymbolRef(node))
+            for ref_node in _split_constant_list_subscript(node):
+                self._add_attrsub_to_live_if_eligible(SymbolRef(ref_node))
         with self.attrsub_context():
             self.visit(node.value)
         with self.attrsub_context(inside=False):
@@ -598,10 +623,8 @@ def _compute_call_chain_live_symbols_and_cells(
             continue
         seen.add(workitem)
         init_killed = {arg.arg for arg in called_sym.sym.get_definition_args()}
-        live_refs, *_ = compute_live_dead_symbol_refs(
-            cast(ast.FunctionDef, called_sym.sym.func_def_stmt).body,
-            init_killed=init_killed,
-            include_killed_live=cell_ctr > 0,
+        live_refs = called_sym.sym.get_funcall_live_refs(
+            include_killed_live=cell_ctr > 0
         )
         used_time = Timestamp(cell_ctr, stmt_ctr)
         for symbol_ref in live_refs:
@@ -627,13 +650,17 @@ def _compute_call_chain_live_symbols_and_cells(
                 ):
                     continue
                 # FIXME: kind of hacky
-                resolved.atom.is_cascading_reactive = (
-                    resolved.atom.is_cascading_reactive
-                    or called_sym.is_cascading_reactive
-                )
-                resolved.atom.is_reactive = (
-                    resolved.atom.is_reactive or called_sym.is_reactive
-                )
+                if (
+                    called_sym.is_cascading_reactive
+                    and not resolved.atom.is_cascading_reactive
+                ) or (called_sym.is_reactive and not resolved.atom.is_reactive):
+                    # copy, since the live refs (and their atoms) are cached per function
+                    atom = copy.copy(resolved.atom)
+                    atom.is_cascading_reactive = (
+                        atom.is_cascading_reactive or called_sym.is_cascading_reactive
+                    )
+                    atom.is_reactive = atom.is_reactive or called_sym.is_reactive
+                    resolved.atom = atom
                 did_resolve = True
                 if resolved.is_called:
                     worklist.append((resolved, stmt_ctr))
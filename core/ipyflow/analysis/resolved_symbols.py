@@ -59,6 +59,8 @@ class ResolvedSymbol(CommonEqualityMixin):
     def timestamp(self) -> Timestamp:
         if self.is_deep:
             return self.sym.timestamp
+        elif self.sym._column_access_timestamp is not None:
+            return self.sym._column_access_timestamp
         else:
             return self.sym.shallow_timestamp
 
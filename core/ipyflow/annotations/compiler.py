@@ -1,33 +1,78 @@
 # -*- coding: utf-8 -*-
 """
 Compiles the annotations in .pyi files into handlers for library code.
+
+Parsed specs can optionally be cached on disk (in the directory named by the
+IPYFLOW_ANNOTATIONS_CACHE_DIR environment variable), keyed by a hash of the
+stub file contents, so that stubs only need to be parsed again when they
+change. Handlers are
+compiled lazily: importing an annotated module only marks it as pending, and
+its handlers get compiled the first time a call into it needs resolving.
 """
 import ast
 import functools
+import hashlib
 import logging
 import os
+import pickle
 import sys
 from types import ModuleType
-from typing import Dict, List, Optional, Set, Tuple, Type, Union
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Type, Union
 
 from ipyflow.annotations.annotations import Mutate, UpsertSymbol
 from ipyflow.tracing.external_calls.base_handlers import (
+    MODULES_AWAITING_IMPORT,
+    MODULES_PENDING_HANDLER_COMPILATION,
     REGISTERED_HANDLER_BY_FUNCTION,
-    REGISTERED_HANDLER_BY_METHOD,
     CallerMutation,
     CallerUpsert,
     ExternalCallHandler,
     ModuleMutation,
     ModuleUpsert,
+    defer_handler_compilation_for_module,
     external_call_handler_by_name,
+    invalidate_method_handler_dispatch_table,
+    register_annotated_module_names,
+    register_method_handler,
 )
 from ipyflow.utils.ast_utils import subscript_to_slice
 
 logger = logging.getLogger(__name__)
 
 
-REGISTERED_CLASS_SPECS: Dict[str, List[ast.ClassDef]] = {}
-REGISTERED_FUNCTION_SPECS: Dict[str, List[ast.FunctionDef]] = {}
+REGISTERED_CLASS_SPECS: Dict[str, List["ClassSpec"]] = {}
+REGISTERED_FUNCTION_SPECS: Dict[str, List["FunctionSpec"]] = {}
+
+ANNOTATIONS_CACHE_DIR_ENV_VAR = "IPYFLOW_ANNOTATIONS_CACHE_DIR"
+# bump whenever the format of cached specs changes
+_SPEC_CACHE_VERSION = 1
+
+# (kind, position, name), where kind is one of "module", "self", or "arg"
+MutationTarget = Tuple[str, Optional[int], Optional[str]]
+
+
+class FunctionSpec(NamedTuple):
+    """
+    A function annotation reduced to just what is needed to compile its
+    handler, so that it stays cheap to serialize and to compile.
+    """
+
+    name: str
+    # the names under which the compiled handler gets registered
+    registered_names: Tuple[str, ...]
+    # set when the return annotation names a handler directly
+    handler_name: Optional[str]
+    overwrite: bool
+    targets: Tuple[MutationTarget, ...]
+    is_multi_target: bool
+
+
+class ClassSpec(NamedTuple):
+    name: str
+    methods: Tuple[FunctionSpec, ...]
+
+
+AnnotationSpec = Tuple[str, Union[ClassSpec, FunctionSpec, None]]
 
 
 @functools.lru_cache(maxsize=None)
@@ -80,45 +125,46 @@ def _arg_position_in_signature(
     )
 
 
+def _make_mutation_target(
+    func: ast.FunctionDef, is_method: bool, name: str
+) -> MutationTarget:
+    if name == "__module__":
+        return ("module", None, None)
+    elif name == "self":
+        return ("self" if is_method else "none", None, None)
+    else:
+        pos, is_posonly = _arg_position_in_signature(func, name, is_method=is_method)
+        return ("arg", pos, None if is_posonly else name)
+
+
 def _make_mutate_name_handler(
-    func: ast.FunctionDef, is_method: bool, name: str, overwrite: bool = False
+    target: MutationTarget, overwrite: bool = False
 ) -> Type[ExternalCallHandler]:
-    if name == "__module__":
+    kind, pos, name = target
+    if kind == "module":
         if overwrite:
             return ModuleUpsert
         else:
             return ModuleMutation
-    elif name == "self":
-        if is_method:
-            if overwrite:
-                return CallerUpsert
-            else:
-                return CallerMutation
-    else:
-        pos, is_posonly = _arg_position_in_signature(func, name, is_method=is_method)
-        return _mutate_argument(
-            pos=pos,
-            name=None if is_posonly else name,
-            overwrite=overwrite,
-        )
+    elif kind == "self":
+        if overwrite:
+            return CallerUpsert
+        else:
+            return CallerMutation
+    elif kind == "arg":
+        return _mutate_argument(pos=pos, name=name, overwrite=overwrite)
+    return None  # type: ignore[return-value]
 
 
-def compile_function_handler(
-    func: ast.FunctionDef, is_method: bool
-) -> Type[ExternalCallHandler]:
-    # step 1: union arguments into groups such that any 2 args reference the same symbol somehow
-    # step 2: for each group, create a handler that searches for a solution to the group constraint
-    # step 3: combine the handlers into a single handler
+def make_function_spec(func: ast.FunctionDef, is_method: bool) -> FunctionSpec:
+    registered_names = tuple(get_names_for_function(func))
     ret = func.returns
     if ret is None:
         raise TypeError(
             f"unable to handle null return type when trying to compile {func.name}"
         )
     if isinstance(ret, ast.Name):
-        handler_type = external_call_handler_by_name.get(ret.id)
-        if handler_type is None:
-            raise ValueError(f"No known handler for return type {ret}")
-        return handler_type
+        return FunctionSpec(func.name, registered_names, ret.id, False, (), False)
     elif isinstance(ret, ast.Subscript):
         sub_value = ret.value
         slice_value = subscript_to_slice(ret)
@@ -126,32 +172,54 @@ def compile_function_handler(
             if sub_value.id == Mutate.__name__ or sub_value.id == UpsertSymbol.__name__:
                 overwrite = sub_value.id == UpsertSymbol.__name__
                 if isinstance(slice_value, ast.Name):
-                    return _make_mutate_name_handler(
-                        func,
-                        is_method=is_method,
-                        name=slice_value.id,
-                        overwrite=overwrite,
+                    target = _make_mutation_target(func, is_method, slice_value.id)
+                    return FunctionSpec(
+                        func.name, registered_names, None, overwrite, (target,), False
                     )
                 elif isinstance(slice_value, ast.Tuple):
-                    handlers = []
+                    targets = []
                     for elt in slice_value.elts:
                         if not isinstance(elt, ast.Name):
                             break
-                        handlers.append(
-                            _make_mutate_name_handler(
-                                func,
-                                is_method=is_method,
-                                name=elt.id,
-                                overwrite=overwrite,
-                            )
-                        )
+                        targets.append(_make_mutation_target(func, is_method, elt.id))
                     else:
-                        return _make_multi_handler(handlers)
+                        return FunctionSpec(
+                            func.name,
+                            registered_names,
+                            None,
+                            overwrite,
+                            tuple(targets),
+                            True,
+                        )
             raise ValueError(f"No known handler for return type {ret}")
+    raise TypeError(
+        f"unable to handle return type {ret} when trying to compile {func.name}"
+    )
+
+
+def compile_function_spec(spec: FunctionSpec) -> Type[ExternalCallHandler]:
+    # step 1: union arguments into groups such that any 2 args reference the same symbol somehow
+    # step 2: for each group, create a handler that searches for a solution to the group constraint
+    # step 3: combine the handlers into a single handler
+    if spec.handler_name is not None:
+        handler_type = external_call_handler_by_name.get(spec.handler_name)
+        if handler_type is None:
+            raise ValueError(f"No known handler for return type {spec.handler_name}")
+        return handler_type
+    handlers = [
+        _make_mutate_name_handler(target, overwrite=spec.overwrite)
+        for target in spec.targets
+    ]
+    if spec.is_multi_target:
+        return _make_multi_handler(handlers)
     else:
-        raise TypeError(
-            f"unable to handle return type {ret} when trying to compile {func.name}"
-        )
+        return handlers[0]
+
+
+def compile_function_handler(
+    func: ast.FunctionDef, is_method: bool
+) -> Type[ExternalCallHandler]:
+    return compile_function_spec(make_function_spec(func, is_method=is_method))
 
 
 def get_names_for_function(func: ast.FunctionDef) -> List[str]:
@@ -173,19 +241,29 @@ def get_names_for_function(func: ast.FunctionDef) -> List[str]:
         return [func.name]
 
 
-def compile_class_handler(cls: ast.ClassDef) -> Dict[str, Type[ExternalCallHandler]]:
-    handlers = {}
+def make_class_spec(cls: ast.ClassDef) -> ClassSpec:
+    methods = []
     for func in cls.body:
         if not isinstance(func, ast.FunctionDef):
             continue
         try:
-            func_handler = compile_function_handler(func, is_method=True)
-            for name in get_names_for_function(func):
+            methods.append(make_function_spec(func, is_method=True))
+        except (ValueError, TypeError):
+            continue
+    return ClassSpec(cls.name, tuple(methods))
+
+
+def compile_class_handler(cls: ClassSpec) -> Dict[str, Type[ExternalCallHandler]]:
+    handlers = {}
+    for method in cls.methods:
+        try:
+            func_handler = compile_function_spec(method)
+            for name in method.registered_names:
                 handlers[name] = func_handler
         except (ValueError, TypeError):
             # logger.exception(
             #     "exception while trying to compile handler for %s in class %s"
-            #     % (func.name, cls.name)
+            #     % (method.name, cls.name)
             # )
             continue
     return handlers
@@ -212,7 +290,7 @@ def get_modules_from_decorators(decorators: List[ast.expr]) -> Set[str]:
 
 
 def compile_classes(
-    classes: List[ast.ClassDef],
+    classes: List[ClassSpec],
 ) -> Dict[str, Dict[str, Type[ExternalCallHandler]]]:
     handlers_by_class = {}
     for clazz in classes:
@@ -221,13 +299,13 @@ def compile_classes(
 
 
 def compile_functions(
-    functions: List[ast.FunctionDef],
+    functions: List[FunctionSpec],
 ) -> Dict[str, Type[ExternalCallHandler]]:
     function_handlers = {}
     for func in functions:
         try:
-            func_handler = compile_function_handler(func, is_method=False)
-            for name in get_names_for_function(func):
+            func_handler = compile_function_spec(func)
+            for name in func.registered_names:
                 function_handlers[name] = func_handler
         except (ValueError, TypeError):
             # logger.exception(
@@ -238,7 +316,7 @@ def compile_functions(
 
 
 def handle_string_annotation(
-    node: Union[ast.Expr, ast.Str], filename: str
+    node: Union[ast.Expr, ast.Str], filename: str, specs: List[AnnotationSpec]
 ) -> Optional[Set[str]]:
     str_const = ""
     if isinstance(node, ast.Expr):
@@ -279,12 +357,14 @@ def handle_string_annotation(
                 ):
                     return None
     if eval(header):
-        return register_annotations_from_source(contents, filename)
+        return _collect_specs_from_source(contents, filename, specs)
     else:
         return None
 
 
-def register_annotations_from_source(source: str, filename: str) -> Set[str]:
+def _collect_specs_from_source(
+    source: str, filename: str, specs: List[AnnotationSpec]
+) -> Set[str]:
     regisered_modules = set()
     for node in ast.parse(source).body:
         if not isinstance(
@@ -300,26 +380,121 @@ def register_annotations_from_source(source: str, filename: str) -> Set[str]:
             continue
         if isinstance(node, ast.Constant) and not isinstance(node.value, str):
             continue
+        spec: Union[ClassSpec, FunctionSpec, None] = None
+        if isinstance(node, ast.ClassDef):
+            spec = make_class_spec(node)
+        elif isinstance(node, ast.FunctionDef):
+            try:
+                spec = make_function_spec(node, is_method=False)
+            except (ValueError, TypeError):
+                # the module still counts as registered
+                spec = None
         for module in get_modules_from_decorators(
             getattr(node, "decorator_list", [])
         ) or [os.path.splitext(os.path.basename(filename))[0]]:
             regisered_modules.add(module)
-            if isinstance(node, ast.ClassDef):
-                REGISTERED_CLASS_SPECS.setdefault(module, []).append(node)
-            elif isinstance(node, ast.FunctionDef):
-                REGISTERED_FUNCTION_SPECS.setdefault(module, []).append(node)
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+                specs.append((module, spec))
             elif isinstance(
                 node, (ast.Expr, ast.Constant, getattr(ast, "Str", type(None)))
             ):
-                regisered_modules |= handle_string_annotation(node, filename) or set()
+                regisered_modules |= (
+                    handle_string_annotation(node, filename, specs) or set()
+                )
     return regisered_modules
 
 
+def _register_specs(specs: List[AnnotationSpec]) -> None:
+    for module, spec in specs:
+        if isinstance(spec, ClassSpec):
+            REGISTERED_CLASS_SPECS.setdefault(module, []).append(spec)
+        else:
+            function_specs = REGISTERED_FUNCTION_SPECS.setdefault(module, [])
+            if spec is not None:
+                function_specs.append(spec)
+    # lets imports of modules without specs skip handler compilation entirely
+    register_annotated_module_names(module for module, _ in specs)
+    # newly registered specs may shadow handlers resolved for subclasses
+    invalidate_method_handler_dispatch_table()
+
+
+def register_annotations_from_source(source: str, filename: str) -> Set[str]:
+    specs: List[AnnotationSpec] = []
+    registered_modules = _collect_specs_from_source(source, filename, specs)
+    _register_specs(specs)
+    return registered_modules
+
+
+def _get_spec_cache_dir() -> Optional[str]:
+    # opt-in, so that nothing gets written outside of the environment by default
+    return os.environ.get(ANNOTATIONS_CACHE_DIR_ENV_VAR) or None
+
+
+def _spec_cache_path(source: str, filename: str) -> Optional[str]:
+    cache_dir = _get_spec_cache_dir()
+    if cache_dir is None:
+        return None
+    # specs depend on the interpreter version through version-guarded blocks
+    hasher = hashlib.sha256(
+        ("%d:%d.%d:" % (_SPEC_CACHE_VERSION, *sys.version_info[:2])).encode()
+    )
+    # the file name is the default module for the specs it contains
+    hasher.update(os.path.basename(filename).encode() + b"\0")
+    hasher.update(source.encode())
+    return os.path.join(cache_dir, hasher.hexdigest() + ".pickle")
+
+
+def _load_cached_specs(
+    cache_path: str,
+) -> Optional[Tuple[Set[str], List[AnnotationSpec]]]:
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.info("ignoring unreadable annotation spec cache %s", cache_path)
+        return None
+
+
+def _save_cached_specs(
+    cache_path: str, modules: Set[str], specs: List[AnnotationSpec]
+) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            pickle.dump((modules, specs), f, protocol=pickle.HIGHEST_PROTOCOL)
+        # atomic so that concurrently starting kernels never see partial writes
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        logger.info("unable to write annotation spec cache %s", cache_path)
+
+
+def compile_pending_handlers(module: Optional[ModuleType] = None) -> None:
+    """
+    Compiles handlers for `module` if it is pending, or for every pending
+    module if `module` is None.
+    """
+    if module is None:
+        pending = list(MODULES_PENDING_HANDLER_COMPILATION.values())
+        MODULES_PENDING_HANDLER_COMPILATION.clear()
+    else:
+        pending_module = MODULES_PENDING_HANDLER_COMPILATION.pop(
+            getattr(module, "__name__", None), None
+        )
+        pending = [] if pending_module is None else [pending_module]
+    for pending_module in pending:
+        compile_and_register_handlers_for_module(pending_module)
+
+
 def compile_handlers_for_already_imported_modules(modules: Set[str]) -> None:
     for module_name in modules:
         module = sys.modules.get(module_name)
-        if module is not None:
-            compile_and_register_handlers_for_module(module)
+        if module is None:
+            MODULES_AWAITING_IMPORT.add(module_name)
+        else:
+            defer_handler_compilation_for_module(module)
 
 
 def register_annotations_file(
@@ -330,7 +505,16 @@ def register_annotations_file(
     """
     with open(filename, "r") as f:
         source = f.read()
-    modules = register_annotations_from_source(source, filename)
+    cache_path = _spec_cache_path(source, filename)
+    cached = None if cache_path is None else _load_cached_specs(cache_path)
+    if cached is None:
+        specs: List[AnnotationSpec] = []
+        modules = _collect_specs_from_source(source, filename, specs)
+        if cache_path is not None:
+            _save_cached_specs(cache_path, modules, specs)
+    else:
+        modules, specs = cached
+    _register_specs(specs)
     if should_compile_handlers_for_already_imported_modules:
         compile_handlers_for_already_imported_modules(modules)
     return modules
@@ -348,7 +532,7 @@ def compile_and_register_handlers_for_module(module: ModuleType) -> None:
         if clazz is None:
             continue
         for method_name, handler in compiled_class_method_handlers.items():
-            REGISTERED_HANDLER_BY_METHOD[clazz, method_name] = handler
+            register_method_handler(clazz, method_name, handler)
             method_function = getattr(clazz, method_name, None)
             if method_function is not None:
                 REGISTERED_HANDLER_BY_FUNCTION[method_function] = handler
@@ -368,8 +552,5 @@ def register_annotations_directory(dirname: str) -> Set[str]:
                 os.path.join(dirname, filename),
                 should_compile_handlers_for_already_imported_modules=False,
             )
-    for module_name in registered_modules:
-        module = sys.modules.get(module_name)
-        if module is not None:
-            compile_and_register_handlers_for_module(module)
+    compile_handlers_for_already_imported_modules(registered_modules)
     return registered_modules
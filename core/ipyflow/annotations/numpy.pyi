@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from ipyflow.annotations import (
+    Mutate,
+    NoopCallHandler,
+    __module__,
+    handler_for,
+    module,
+    self,
+)
+
+# fake symbols to reduce lint errors
+a = arr = dst = out = x = None
+
+class ndarray:
+    """"""  # just to ensure space isn't removed by autoformatting
+
+    @handler_for("fill", "partition", "put", "resize", "sort")
+    def mutating_method(self) -> Mutate[self]: ...
+
+    """"""
+
+    # methods that only mutate the array passed as `out`
+    @handler_for("any", "all", "argmax", "argmin", "dot", "max", "min", "round")
+    def reduction_with_out_after_one_arg(self, _0, out) -> Mutate[out]: ...
+
+    """"""
+
+    @handler_for(
+        "clip", "cumprod", "cumsum", "mean", "prod", "std", "sum", "take", "var"
+    )
+    def reduction_with_out_after_two_args(self, _0, _1, out) -> Mutate[out]: ...
+
+    """"""
+
+    @handler_for(
+        "argsort",
+        "astype",
+        "copy",
+        "dump",
+        "flatten",
+        "item",
+        "nonzero",
+        "ravel",
+        "reshape",
+        "squeeze",
+        "swapaxes",
+        "tobytes",
+        "tofile",
+        "tolist",
+        "transpose",
+        "view",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
+
+@module("numpy")
+def copyto(dst, *_, **__) -> Mutate[dst]: ...
+
+#
+@module("numpy")
+@handler_for("fill_diagonal", "place", "put", "putmask")
+def mutate_first_arg(a, *_, **__) -> Mutate[a]: ...
+
+#
+@module("numpy")
+@handler_for("save", "savetxt", "savez", "savez_compressed")
+def save(*_, **__) -> NoopCallHandler: ...
+
+#
+@module("numpy.random")
+def seed() -> Mutate[__module__]: ...
+
+#
+@module("numpy.random")
+def shuffle(x, *_, **__) -> Mutate[x, __module__]: ...
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+from ipyflow.annotations import Mutate, NoopCallHandler, handler_for, self
+from ipyflow.tracing.external_calls.base_handlers import InplaceCallerMutation
+from ipyflow.tracing.external_calls.frame_handlers import (
+    DataFrameAssign,
+    DataFrameDrop,
+    DataFrameDropInPlace,
+)
+
+class DataFrame:
+    """"""  # just to ensure space isn't removed by autoformatting
+
+    @handler_for(
+        "bfill",
+        "clip",
+        "drop_duplicates",
+        "dropna",
+        "eval",
+        "ffill",
+        "fillna",
+        "interpolate",
+        "mask",
+        "query",
+        "rename",
+        "rename_axis",
+        "replace",
+        "reset_index",
+        "set_index",
+        "sort_index",
+        "sort_values",
+        "where",
+    )
+    def inplace_method(self) -> InplaceCallerMutation: ...
+
+    """"""
+
+    @handler_for("insert", "update")
+    def mutating_method(self) -> Mutate[self]: ...
+
+    """"""
+
+    def assign(self) -> DataFrameAssign: ...
+    def drop(self) -> DataFrameDrop: ...
+    def pop(self) -> DataFrameDropInPlace: ...
+
+    """"""
+
+    @handler_for(
+        "agg",
+        "aggregate",
+        "all",
+        "any",
+        "apply",
+        "astype",
+        "copy",
+        "corr",
+        "count",
+        "cov",
+        "cumsum",
+        "describe",
+        "diff",
+        "duplicated",
+        "equals",
+        "explode",
+        "filter",
+        "groupby",
+        "head",
+        "info",
+        "isin",
+        "isna",
+        "join",
+        "max",
+        "mean",
+        "median",
+        "melt",
+        "memory_usage",
+        "merge",
+        "min",
+        "nlargest",
+        "notna",
+        "nsmallest",
+        "nunique",
+        "pct_change",
+        "pivot",
+        "pivot_table",
+        "reindex",
+        "rolling",
+        "round",
+        "sample",
+        "select_dtypes",
+        "shift",
+        "stack",
+        "std",
+        "sum",
+        "tail",
+        "to_csv",
+        "to_dict",
+        "to_excel",
+        "to_json",
+        "to_numpy",
+        "to_parquet",
+        "to_pickle",
+        "transpose",
+        "unstack",
+        "value_counts",
+        "var",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
+
+class Series:
+    """"""
+
+    @handler_for(
+        "clip",
+        "drop",
+        "dropna",
+        "fillna",
+        "mask",
+        "rename",
+        "replace",
+        "reset_index",
+        "sort_index",
+        "sort_values",
+        "where",
+    )
+    def inplace_method(self) -> InplaceCallerMutation: ...
+
+    """"""
+
+    @handler_for("update")
+    def mutating_method(self) -> Mutate[self]: ...
+
+    """"""
+
+    @handler_for(
+        "agg",
+        "all",
+        "any",
+        "apply",
+        "astype",
+        "copy",
+        "count",
+        "cumsum",
+        "describe",
+        "diff",
+        "equals",
+        "groupby",
+        "head",
+        "isin",
+        "isna",
+        "map",
+        "max",
+        "mean",
+        "median",
+        "min",
+        "notna",
+        "nunique",
+        "round",
+        "shift",
+        "std",
+        "sum",
+        "tail",
+        "to_csv",
+        "to_dict",
+        "to_frame",
+        "to_list",
+        "to_numpy",
+        "unique",
+        "value_counts",
+        "var",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
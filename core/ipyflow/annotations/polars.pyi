@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from ipyflow.annotations import Mutate, NoopCallHandler, handler_for, self
+from ipyflow.tracing.external_calls.base_handlers import InplaceCallerMutation
+from ipyflow.tracing.external_calls.frame_handlers import (
+    DataFrameAssign,
+    DataFrameDropInPlace,
+    PolarsDataFrameDrop,
+)
+
+class DataFrame:
+    """"""  # just to ensure space isn't removed by autoformatting
+
+    @handler_for("extend", "insert_column", "replace_column")
+    def mutating_method(self) -> Mutate[self]: ...
+
+    """"""
+
+    def drop(self) -> PolarsDataFrameDrop: ...
+    def drop_in_place(self) -> DataFrameDropInPlace: ...
+    def with_columns(self) -> DataFrameAssign: ...
+
+    """"""
+
+    @handler_for(
+        "cast",
+        "clone",
+        "collect_schema",
+        "describe",
+        "equals",
+        "explode",
+        "fill_null",
+        "filter",
+        "get_column",
+        "group_by",
+        "head",
+        "join",
+        "lazy",
+        "pivot",
+        "rename",
+        "sample",
+        "select",
+        "sort",
+        "tail",
+        "to_arrow",
+        "to_dict",
+        "to_dicts",
+        "to_numpy",
+        "to_pandas",
+        "unique",
+        "unpivot",
+        "with_row_index",
+        "write_csv",
+        "write_ipc",
+        "write_json",
+        "write_parquet",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
+
+class Series:
+    """"""
+
+    @handler_for("append", "extend", "scatter")
+    def mutating_method(self) -> Mutate[self]: ...
+
+    """"""
+
+    @handler_for("rechunk", "shrink_to_fit", "sort")
+    def inplace_method(self) -> InplaceCallerMutation: ...
+
+    """"""
+
+    @handler_for(
+        "alias",
+        "cast",
+        "clone",
+        "describe",
+        "fill_null",
+        "filter",
+        "head",
+        "max",
+        "mean",
+        "min",
+        "sum",
+        "tail",
+        "to_arrow",
+        "to_list",
+        "to_numpy",
+        "to_pandas",
+        "unique",
+        "value_counts",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
+
+class LazyFrame:
+    """"""
+
+    @handler_for(
+        "collect",
+        "drop",
+        "explain",
+        "filter",
+        "group_by",
+        "join",
+        "select",
+        "sink_csv",
+        "sink_parquet",
+        "sort",
+        "with_columns",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from ipyflow.annotations import NoopCallHandler, handler_for, module
+
+# arrow tables and arrays are immutable, so none of these mutate their caller or args
+
+@module("pyarrow")
+class Table:
+    """"""  # just to ensure space isn't removed by autoformatting
+
+    @handler_for(
+        "add_column",
+        "append_column",
+        "cast",
+        "column",
+        "combine_chunks",
+        "drop_columns",
+        "equals",
+        "filter",
+        "group_by",
+        "join",
+        "rename_columns",
+        "select",
+        "set_column",
+        "slice",
+        "sort_by",
+        "take",
+        "to_batches",
+        "to_pandas",
+        "to_pydict",
+        "to_pylist",
+        "validate",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
+
+@module("pyarrow")
+class Array:
+    """"""
+
+    @handler_for(
+        "cast",
+        "equals",
+        "fill_null",
+        "filter",
+        "slice",
+        "take",
+        "to_numpy",
+        "to_pandas",
+        "to_pylist",
+        "unique",
+        "validate",
+        "value_counts",
+    )
+    def non_mutating_method(self) -> NoopCallHandler: ...
+
+@module("pyarrow.parquet")
+def write_table(*_, **__) -> NoopCallHandler: ...
+
+#
+@module("pyarrow.csv")
+def write_csv(*_, **__) -> NoopCallHandler: ...
+
+#
+@module("pyarrow.feather")
+def write_feather(*_, **__) -> NoopCallHandler: ...
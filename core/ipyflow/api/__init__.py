@@ -7,11 +7,13 @@ from ipyflow.api.lift import (
     lift,
     mutate,
     rdeps,
+    replay,
     rusers,
     set_tag,
     timestamp,
     unset_tag,
     users,
+    value_at,
     watchpoints,
 )
 
@@ -22,6 +24,7 @@ __all__ = [
     "lift",
     "mutate",
     "rdeps",
+    "replay",
     "reproduce_cell",
     "rusers",
     "set_tag",
@@ -30,5 +33,6 @@ __all__ = [
     "timestamp",
     "unset_tag",
     "users",
+    "value_at",
     "watchpoints",
 ]
@@ -27,8 +27,6 @@ def stderr(ts_or_cell_num: Union[int, Timestamp]) -> Optional[str]:
         cell_num = _to_cell_num(ts_or_cell_num)
         captured = cells().at_counter(cell_num).captured_output
         return None if captured is None else str(captured.stderr)
-        captured = cells().at_counter(cell_num).captured_output
-        return None if captured is None else str(captured.stderr)
     except KeyError:
         raise ValueError("cell with counter %d has not yet executed" % cell_num)
 
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
-from typing import TYPE_CHECKING, Any, List, Set, Union, cast
+from typing import TYPE_CHECKING, Any, List, Optional, Set, Union, cast
 
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.singletons import flow
+from ipyflow.slicing.replay import replay_symbols
 from ipyflow.tracing.watchpoint import Watchpoints
 
 if TYPE_CHECKING:
@@ -72,6 +74,34 @@ def users(sym: Any) -> List[Symbol]:
     return [child for child in sym.children.keys() if not child.is_anonymous]
 
 
+def replay(sym: Any, timeout: Optional[float] = None) -> Any:
+    """
+    Given the programmatic usage of some symbol, recompute its
+    value from just its slice in a fresh interpreter.
+    """
+    # See the `argument` handler in ipyflow_tracer for the
+    # actual implementation; this is just a stub that ensures
+    # that handler was able to find something.
+    sym = _validate(sym)
+    return replay_symbols([sym], timeout=timeout)[sym.readable_name]
+
+
+def value_at(sym: Any, ts_or_cell_num: Union[int, Timestamp]) -> Any:
+    """
+    Given the programmatic usage of some symbol, look up the value it
+    had as of the given timestamp (or cell), if the versioned value
+    store recorded it.
+    """
+    # See the `argument` handler in ipyflow_tracer for the
+    # actual implementation; this is just a stub that ensures
+    # that handler was able to find something.
+    sym = _validate(sym)
+    try:
+        return flow().value_store.value_at(sym, ts_or_cell_num)
+    except KeyError as e:
+        raise ValueError(str(e.args[0])) from None
+
+
 def mutate(sym: Any) -> None:
     """
     Force mutation for a particular symbol.
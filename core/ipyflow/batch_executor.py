@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Kernel-side execution of batch-mode reactive cascades. Instead of the frontend
+sending one execute request per downstream cell and then asking for a fresh
+execution schedule, the topologically ordered closure runs inside a single
+comm request: the tracer stays warm between cells, the schedule only gets
+recomputed once the current closure has run, and whatever remains of the
+cascade gets dropped as soon as a cell raises or the notebook is edited.
+"""
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from IPython.core.interactiveshell import ExecutionResult
+from IPython.utils.capture import CapturedIO
+
+from ipyflow.config import ExecutionMode
+from ipyflow.data_model.cell import cells
+from ipyflow.frontend import compute_reactive_cascade
+from ipyflow.singletons import flow, shell
+from ipyflow.types import IdType
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+class BatchCellExecution(NamedTuple):
+    cell_id: IdType
+    execution_count: Optional[int]
+    outputs: List[Dict[str, Any]]
+    error: bool
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "type": "batch_cell_executed",
+            "cell_id": self.cell_id,
+            "execution_count": self.execution_count,
+            "outputs": self.outputs,
+            "error": self.error,
+        }
+
+
+def make_nbformat_outputs(
+    result: ExecutionResult, captured: Optional[CapturedIO]
+) -> List[Dict[str, Any]]:
+    """
+    Converts what a cell printed, displayed, and evaluated to into nbformat
+    outputs, since iopub messages for cells run from a comm request aren't
+    routed to those cells by the frontend.
+    """
+    outputs: List[Dict[str, Any]] = []
+    if captured is not None:
+        for name in ("stdout", "stderr"):
+            text = getattr(captured, name)
+            if text:
+                outputs.append({"output_type": "stream", "name": name, "text": text})
+        for rich_output in captured.outputs:
+            outputs.append(
+                {
+                    "output_type": "display_data",
+                    "data": rich_output.data,
+                    "metadata": rich_output.metadata,
+                }
+            )
+    if result.result is not None:
+        data, metadata = shell().display_formatter.format(result.result)
+        outputs.append(
+            {
+                "output_type": "execute_result",
+                "execution_count": result.execution_count,
+                "data": data,
+                "metadata": metadata,
+            }
+        )
+    error = result.error_before_exec or result.error_in_exec
+    if error is not None:
+        try:
+            traceback = shell().InteractiveTB.structured_traceback(
+                type(error), error, error.__traceback__
+            )
+        except Exception:
+            traceback = []
+        outputs.append(
+            {
+                "output_type": "error",
+                "ename": type(error).__name__,
+                "evalue": str(error),
+                "traceback": traceback,
+            }
+        )
+    return outputs
+
+
+def next_reactive_cell_ids(
+    exec_schedule: Dict[str, Any],
+    executed_cell_ids: Set[IdType],
+    ignore_cost_budget: bool = False,
+) -> List[IdType]:
+    """
+    Picks the cells that the frontend would execute next in batch reactivity
+    mode, given a ``compute_exec_schedule`` response.
+    """
+    if exec_schedule.get("cascade_paused", False) and not ignore_cost_budget:
+        return []
+    return compute_reactive_cascade(
+        exec_schedule.get("new_ready_cells", []),
+        exec_schedule.get("forced_reactive_cells", []),
+        exec_schedule.get("forced_cascading_reactive_cells", []),
+        exec_schedule.get("cell_children", {}),
+        ExecutionMode(exec_schedule.get("exec_mode")),
+        # memoized_skippable_cells still get run: their inputs may match an
+        # older memoized execution than the latest one, and rerunning is what
+        # restores that execution's outputs
+        skip_cell_ids=executed_cell_ids,
+    )
+
+
+class BatchReactiveExecutor:
+    def __init__(self) -> None:
+        self._plan: Deque[IdType] = deque()
+        self._content_by_cell_id: Dict[IdType, str] = {}
+        self._skipped_cell_ids: Set[IdType] = set()
+        self.executed_cell_ids: List[IdType] = []
+        self.cancelled_cell_ids: List[IdType] = []
+        self.is_active = False
+        self.is_running_cell = False
+        self.had_error = False
+        self.was_cancelled = False
+        self.ignore_cost_budget = False
+        self.num_batches = 0
+        self.num_cells_executed = 0
+        self.num_cancellations = 0
+
+    @property
+    def has_next(self) -> bool:
+        return len(self._plan) > 0
+
+    @property
+    def planned_cell_ids(self) -> List[IdType]:
+        return list(self._plan)
+
+    @property
+    def seen_cell_ids(self) -> Set[IdType]:
+        return set(self.executed_cell_ids) | self._skipped_cell_ids
+
+    def start(
+        self,
+        content_by_cell_id: Dict[IdType, str],
+        skip_cell_ids: Iterable[IdType] = (),
+        ignore_cost_budget: bool = False,
+    ) -> None:
+        self._plan.clear()
+        self._content_by_cell_id = dict(content_by_cell_id)
+        self._skipped_cell_ids = set(skip_cell_ids)
+        self.executed_cell_ids = []
+        self.cancelled_cell_ids = []
+        self.is_active = True
+        self.had_error = False
+        self.was_cancelled = False
+        # set once the user confirmed a cascade that exceeded the cost budget
+        self.ignore_cost_budget = ignore_cost_budget
+        self.num_batches += 1
+        shell().keep_tracing_warm = True
+
+    def extend(self, cell_ids: Iterable[IdType]) -> None:
+        seen_cell_ids = self.seen_cell_ids | set(self._plan)
+        for cell_id in cell_ids:
+            if cell_id in seen_cell_ids or cell_id not in self._content_by_cell_id:
+                continue
+            seen_cell_ids.add(cell_id)
+            self._plan.append(cell_id)
+
+    def cancel(self) -> None:
+        if not self.is_active:
+            return
+        if self.has_next:
+            self.num_cancellations += 1
+        self.was_cancelled = True
+        self.cancelled_cell_ids.extend(self._plan)
+        self._plan.clear()
+
+    def cancel_if_edited(self, content_by_cell_id: Dict[IdType, str]) -> bool:
+        if not self.is_active:
+            return False
+        for cell_id, content in content_by_cell_id.items():
+            if self._content_by_cell_id.get(cell_id) != content:
+                self.cancel()
+                return True
+        return False
+
+    def run_next(self) -> Optional[BatchCellExecution]:
+        if not self.has_next:
+            return None
+        cell_id = self._plan.popleft()
+        flow_ = flow()
+        shell_ = shell()
+        prev_cell = cells().from_id_nullable(cell_id)
+        flow_.set_active_cell(cell_id)
+        flow_.set_tags(() if prev_cell is None else prev_cell.tags)
+        # keep ipython's counter in sync with ours in case the two drifted apart
+        shell_.execution_count = cells().next_exec_counter()
+        self.is_running_cell = True
+        try:
+            result = shell_.run_cell(
+                self._content_by_cell_id[cell_id], store_history=True, cell_id=cell_id
+            )
+        finally:
+            self.is_running_cell = False
+        self.executed_cell_ids.append(cell_id)
+        self.num_cells_executed += 1
+        cell = cells().current_cell()
+        error = result.error_before_exec or result.error_in_exec
+        if error is not None:
+            self.had_error = True
+            self.cancel()
+        return BatchCellExecution(
+            cell_id,
+            result.execution_count,
+            make_nbformat_outputs(
+                result, cell.captured_output if cell.cell_id == cell_id else None
+            ),
+            error is not None,
+        )
+
+    def finish(self) -> None:
+        self.cancelled_cell_ids.extend(self._plan)
+        self._plan.clear()
+        self.is_active = False
+        shell_ = shell()
+        shell_.keep_tracing_warm = False
+        shell_.stash_meta_path_entries()
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Fork-based namespace checkpoints. Right before selected cells run, the kernel
+forks; the child just sits paused on a pipe, sharing (copy-on-write) memory
+pages with the kernel, so that the namespace as of that cell boundary stays
+around without being copied up front. Restoring asks the child to pickle the
+globals it has, which then get upserted back into the kernel's namespace so
+that downstream cells see the rollback as an ordinary update.
+
+Checkpoints get taken once enough execution time has accumulated since the
+previous one; when more than the budgeted number are alive, the one that saves
+the least recomputation relative to its predecessor gets evicted.
+"""
+import atexit
+import gc
+import logging
+import os
+import pickle
+import signal
+import struct
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from ipyflow.data_model.cell import cells
+from ipyflow.singletons import flow, shell
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_RESTORE = b"r"
+_QUIT = b"q"
+_LENGTH_HEADER = struct.Struct("!Q")
+
+
+def fork_checkpoints_supported() -> bool:
+    return hasattr(os, "fork") and sys.platform.startswith("linux")
+
+
+class CheckpointRestoreResult(NamedTuple):
+    cell_ctr: int
+    restored: List[str]
+    deleted: List[str]
+    unrestorable: List[str]
+
+
+def _read_exactly(fd: int, num_bytes: int) -> bytes:
+    chunks = []
+    while num_bytes > 0:
+        chunk = os.read(fd, num_bytes)
+        if not chunk:
+            raise EOFError("checkpoint process went away")
+        chunks.append(chunk)
+        num_bytes -= len(chunk)
+    return b"".join(chunks)
+
+
+def _write_all(fd: int, payload: bytes) -> None:
+    view = memoryview(payload)
+    while len(view) > 0:
+        view = view[os.write(fd, view) :]
+
+
+def _snapshot_names() -> List[str]:
+    user_ns = shell().user_ns
+    return [
+        sym.name
+        for sym in flow().global_scope.all_symbols_this_indentation()
+        if sym.is_user_accessible
+        and isinstance(sym.name, str)
+        and sym.name in user_ns
+        and not sym.is_module
+    ]
+
+
+def _serve_checkpoint(request_fd: int, response_fd: int) -> None:
+    # runs in the forked child; everything it needs is already in memory
+    names = _snapshot_names()
+    user_ns = shell().user_ns
+    while os.read(request_fd, 1) == _RESTORE:
+        values = {name: user_ns[name] for name in names}
+        unpicklable: List[str] = []
+        try:
+            # pickled together so that references shared between names survive
+            pickled = pickle.dumps(values)
+        except Exception:
+            for name in names:
+                try:
+                    pickle.dumps(values[name])
+                except Exception:
+                    unpicklable.append(name)
+                    del values[name]
+            pickled = pickle.dumps(values)
+        payload = pickle.dumps((names, pickled, unpicklable))
+        _write_all(response_fd, _LENGTH_HEADER.pack(len(payload)) + payload)
+
+
+class ForkCheckpoint:
+    def __init__(
+        self,
+        cell_ctr: int,
+        cumulative_cost: float,
+        pid: int,
+        request_fd: int,
+        response_fd: int,
+    ) -> None:
+        self.cell_ctr = cell_ctr
+        self.cumulative_cost = cumulative_cost
+        self.pid = pid
+        self.request_fd = request_fd
+        self.response_fd = response_fd
+        self.is_discarded = False
+
+    @classmethod
+    def take(
+        cls, cell_ctr: int, cumulative_cost: float, inherited_fds: List[int]
+    ) -> Optional["ForkCheckpoint"]:
+        request_read, request_write = os.pipe()
+        response_read, response_write = os.pipe()
+        try:
+            pid = os.fork()
+        except OSError:
+            logger.exception("unable to fork checkpoint process")
+            for fd in (request_read, request_write, response_read, response_write):
+                os.close(fd)
+            return None
+        if pid == 0:  # pragma: no cover
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                # the collector would touch (and hence copy) every tracked page
+                gc.disable()
+                # without this, older checkpoints would never see their pipes close
+                for fd in inherited_fds + [request_write, response_read]:
+                    os.close(fd)
+                _serve_checkpoint(request_read, response_write)
+            finally:
+                os._exit(0)
+        os.close(request_read)
+        os.close(response_write)
+        return cls(cell_ctr, cumulative_cost, pid, request_write, response_read)
+
+    @property
+    def fds(self) -> List[int]:
+        return [self.request_fd, self.response_fd]
+
+    def fetch_namespace(self) -> Tuple[List[str], bytes, List[str]]:
+        _write_all(self.request_fd, _RESTORE)
+        (length,) = _LENGTH_HEADER.unpack(
+            _read_exactly(self.response_fd, _LENGTH_HEADER.size)
+        )
+        return pickle.loads(_read_exactly(self.response_fd, length))
+
+    def discard(self) -> None:
+        if self.is_discarded:
+            return
+        self.is_discarded = True
+        try:
+            _write_all(self.request_fd, _QUIT)
+        except OSError:
+            pass
+        for fd in self.fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        try:
+            os.waitpid(self.pid, 0)
+        except ChildProcessError:
+            pass
+
+
+class CheckpointManager:
+    def __init__(self) -> None:
+        self.checkpoints: List[ForkCheckpoint] = []
+        self._cumulative_cost = 0.0
+        self._last_costed_ctr = 0
+        self.num_evictions = 0
+        self._is_clear_registered_atexit = False
+
+    def _accumulate_costs(self, cell_ctr: int) -> None:
+        for ctr in range(self._last_costed_ctr + 1, cell_ctr):
+            try:
+                cost = cells().at_counter(ctr).execution_cost
+            except KeyError:
+                continue
+            if cost is not None:
+                self._cumulative_cost += cost.wall_time
+        self._last_costed_ctr = max(self._last_costed_ctr, cell_ctr - 1)
+
+    @property
+    def cost_since_last_checkpoint(self) -> float:
+        if len(self.checkpoints) == 0:
+            return self._cumulative_cost
+        return self._cumulative_cost - self.checkpoints[-1].cumulative_cost
+
+    def maybe_take(self, cell_ctr: int) -> Optional[ForkCheckpoint]:
+        """
+        Called at the boundary right before the cell with counter `cell_ctr` runs.
+        """
+        settings = flow().mut_settings
+        if not settings.fork_checkpoints_enabled or not fork_checkpoints_supported():
+            return None
+        self._accumulate_costs(cell_ctr)
+        if self.cost_since_last_checkpoint < settings.fork_checkpoint_min_cost:
+            return None
+        return self.take(cell_ctr)
+
+    def take(self, cell_ctr: int) -> Optional[ForkCheckpoint]:
+        if not fork_checkpoints_supported():
+            return None
+        self._accumulate_costs(cell_ctr)
+        if len(self.checkpoints) > 0 and self.checkpoints[-1].cell_ctr == cell_ctr:
+            return self.checkpoints[-1]
+        inherited_fds = [fd for checkpoint in self.checkpoints for fd in checkpoint.fds]
+        # a worker thread holding e.g. the logging or import lock at fork time
+        # would leave that lock held forever in the child
+        flow().comm_manager.static_analyzer.suspend_workers()
+        checkpoint = ForkCheckpoint.take(cell_ctr, self._cumulative_cost, inherited_fds)
+        if checkpoint is None:
+            return None
+        self.checkpoints.append(checkpoint)
+        if not self._is_clear_registered_atexit:
+            atexit.register(self.clear)
+            self._is_clear_registered_atexit = True
+        self._evict_over_budget()
+        return checkpoint
+
+    def _evict_over_budget(self) -> None:
+        budget = max(flow().mut_settings.fork_checkpoint_budget, 0)
+        while len(self.checkpoints) > budget:
+            # always keep the newest; otherwise drop whichever checkpoint saves
+            # the least recomputation over the one before it
+            prev_cost = 0.0
+            victim_idx, victim_saved_cost = 0, float("inf")
+            for idx, checkpoint in enumerate(self.checkpoints[:-1]):
+                saved_cost = checkpoint.cumulative_cost - prev_cost
+                prev_cost = checkpoint.cumulative_cost
+                if saved_cost < victim_saved_cost:
+                    victim_idx, victim_saved_cost = idx, saved_cost
+            if len(self.checkpoints) == 1:
+                victim_idx = 0
+            self.checkpoints.pop(victim_idx).discard()
+            self.num_evictions += 1
+
+    def latest_at_or_before(self, cell_ctr: int) -> Optional[ForkCheckpoint]:
+        ret = None
+        for checkpoint in self.checkpoints:
+            if checkpoint.cell_ctr <= cell_ctr:
+                ret = checkpoint
+        return ret
+
+    def restore(self, cell_ctr: int) -> Optional[CheckpointRestoreResult]:
+        """
+        Restores the user namespace to how it was right before the cell with
+        counter `cell_ctr` ran (or an earlier one, if the closest checkpoint was
+        taken earlier). Restored values get upserted like any other update, so
+        cells depending on them become stale as usual.
+        """
+        checkpoint = self.latest_at_or_before(cell_ctr)
+        if checkpoint is None:
+            return None
+        try:
+            names, pickled, unpicklable = checkpoint.fetch_namespace()
+        except (EOFError, OSError):
+            logger.warning("checkpoint before cell %d is gone", checkpoint.cell_ctr)
+            self.checkpoints.remove(checkpoint)
+            checkpoint.discard()
+            return None
+        user_ns = shell().user_ns
+        global_scope = flow().global_scope
+        restored: List[str] = []
+        unrestorable = list(unpicklable)
+        try:
+            values: Dict[str, Any] = pickle.loads(pickled)
+        except Exception:
+            logger.exception("unable to unpickle checkpoint namespace")
+            unrestorable.extend(name for name in names if name not in unpicklable)
+            values = {}
+        for name, value in values.items():
+            user_ns[name] = value
+            global_scope.upsert_symbol_for_name(name, value)
+            restored.append(name)
+        snapshot_names: Set[str] = set(names)
+        deleted: List[str] = []
+        for sym in list(global_scope.all_symbols_this_indentation()):
+            name = sym.name
+            if (
+                not sym.is_user_accessible
+                or sym.is_module
+                or name in snapshot_names
+                or name not in user_ns
+            ):
+                continue
+            # anything else was created after the checkpoint was taken
+            del user_ns[name]
+            global_scope.delete_symbol_for_name(name)
+            deleted.append(name)
+        return CheckpointRestoreResult(
+            checkpoint.cell_ctr, sorted(restored), sorted(deleted), sorted(unrestorable)
+        )
+
+    def clear(self) -> None:
+        for checkpoint in self.checkpoints:
+            checkpoint.discard()
+        self.checkpoints.clear()
+        if self._is_clear_registered_atexit:
+            # otherwise every manager ever created stays alive until exit
+            atexit.unregister(self.clear)
+            self._is_clear_registered_atexit = False
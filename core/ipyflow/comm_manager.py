@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import ast
+import json
 import logging
 import textwrap
 from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set
@@ -8,14 +9,20 @@ import pyccolo as pyc
 from ipykernel.comm import Comm
 from ipykernel.ipkernel import IPythonKernel
 
+from ipyflow.analysis.background_analysis import BackgroundStaticAnalyzer
 from ipyflow.analysis.resolved_symbols import ResolvedSymbol
 from ipyflow.analysis.symbol_ref import SymbolRef
-from ipyflow.config import ExecutionSchedule
-from ipyflow.data_model.cell import cells
+from ipyflow.batch_executor import BatchReactiveExecutor, next_reactive_cell_ids
+from ipyflow.comm_queue import CommRequestQueue
+from ipyflow.config import ExecutionSchedule, FlowDirection
+from ipyflow.data_model.cell import Cell, cells
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.frontend import compute_reactive_closure, diff_exec_schedules
+from ipyflow.metrics import SIZE_BUCKETS
 from ipyflow.singletons import shell
 from ipyflow.types import IdType
+from ipyflow.utils.ipython_utils import is_executing_cell
 
 if TYPE_CHECKING:
     from ipyflow.flow import NotebookFlow
@@ -24,6 +31,10 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+# measure the serialized size of one in this many outgoing messages
+_MESSAGE_SIZE_SAMPLE_INTERVAL = 16
+
+
 class CommManager:
     """Manages communication between the IPyflow backend and frontend."""
 
@@ -36,7 +47,19 @@ class CommManager:
             str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
         ] = {}
         self._comm: Optional[Comm] = None
+        self._io_loop: Optional[Any] = None
         self.debounced_exec_schedule_pending = False
+        self.static_analyzer = BackgroundStaticAnalyzer()
+        self.batch_executor = BatchReactiveExecutor()
+        self._batch_exec_schedule: Optional[Dict[str, Any]] = None
+        # frontends that opt in get exec schedules as patches against the last one
+        self.exec_schedule_deltas_enabled = False
+        self._exec_schedule_revision = 0
+        self._last_sent_exec_schedule: Optional[Dict[str, Any]] = None
+        self._should_send_full_exec_schedule = True
+        self.request_queue = CommRequestQueue()
+        self._drain_scheduled = False
+        self._num_messages_sent = 0
 
         # Register default handlers
         self._register_default_handlers()
@@ -58,6 +81,8 @@ class CommManager:
             "get_last_updated_cell_id", self.handle_get_last_updated_cell_id
         )
         self.register_comm_handler("bump_timestamp", self.handle_bump_timestamp)
+        self.register_comm_handler("execute_closure", self.handle_execute_closure)
+        self.register_comm_handler("get_metrics", self.handle_get_metrics)
         self.register_comm_handler(
             "register_dynamic_comm_handler", self.handle_register_dynamic_comm_handler
         )
@@ -65,6 +90,7 @@ class CommManager:
     def register_comm_target(self, kernel: IPythonKernel) -> None:
         """Register the comm target with the kernel."""
         kernel.comm_manager.register_target(__package__, self._comm_target)
+        self._io_loop = getattr(kernel, "io_loop", None)
 
     def register_comm_handler(
         self,
@@ -80,6 +106,8 @@ class CommManager:
     def handle(self, request: Dict[str, Any], comm=None) -> None:
         """Handle a comm request by dispatching to the appropriate handler."""
         request_type = request["type"]
+        self.flow.metrics.inc("comm_requests")
+        self._note_exec_schedule_sync(request)
         handler = self._comm_handlers.get(request_type)
         if handler is None:
             dbg_msg = "Unsupported request type for request %s" % request
@@ -105,6 +133,8 @@ class CommManager:
             response = {}
         response["type"] = response.get("type", request_type)
         response["success"] = response.get("success", True)
+        response = self._maybe_encode_exec_schedule(response)
+        self._record_message_size(response)
         try:
             comm.send(response)
         except TypeError as e:
@@ -112,6 +142,88 @@ class CommManager:
                 "unable to serialize response for request of type %s" % request_type
             ) from e
 
+    def enqueue(self, request: Dict[str, Any], comm=None) -> None:
+        """
+        Queue up a request to be handled from the io loop, where it may get
+        coalesced with newer requests of the same type or overtaken by cheaper
+        interactive ones that arrive before it gets its turn.
+        """
+        self.request_queue.push(request, comm)
+        if self._io_loop is None:
+            self._drain_request_queue()
+        elif not self._drain_scheduled:
+            self._drain_scheduled = True
+            self._io_loop.add_callback(self._drain_request_queue)
+
+    def _drain_request_queue(self) -> None:
+        self._drain_scheduled = False
+        entry = self.request_queue.pop()
+        if entry is not None:
+            self.handle(entry.request, comm=entry.comm)
+        if len(self.request_queue) == 0:
+            return
+        if self._io_loop is None:
+            self._drain_request_queue()
+        else:
+            # yield to the kernel between requests so that newer ones can land
+            self._drain_scheduled = True
+            self._io_loop.add_callback(self._drain_request_queue)
+
+    def _record_message_size(self, response: Dict[str, Any]) -> None:
+        self.flow.metrics.inc("comm_messages_sent")
+        self._num_messages_sent += 1
+        # re-serializing is as expensive as sending, so only a sample gets measured
+        if (self._num_messages_sent - 1) % _MESSAGE_SIZE_SAMPLE_INTERVAL != 0:
+            return
+        try:
+            num_bytes = len(json.dumps(response))
+        except (TypeError, ValueError):
+            return
+        self.flow.metrics.observe("comm_message_bytes", num_bytes, SIZE_BUCKETS)
+
+    def _note_exec_schedule_sync(self, request: Dict[str, Any]) -> None:
+        if request.get("exec_schedule_deltas", False):
+            self.exec_schedule_deltas_enabled = True
+        if request.get("full_snapshot", False):
+            self._should_send_full_exec_schedule = True
+        elif "ack_revision" in request:
+            ack_revision = request["ack_revision"]
+            # acks lag behind while responses are in flight, but an ack for a
+            # revision we never sent means the frontend lost its state
+            if ack_revision is None or ack_revision > self._exec_schedule_revision:
+                self._should_send_full_exec_schedule = True
+
+    def _maybe_encode_exec_schedule(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Since comm messages arrive in order, any exec schedule after the first
+        can be sent as a patch against the previous one; the frontend asks for
+        a full snapshot if it ever finds itself on a different revision.
+        """
+        if (
+            not self.exec_schedule_deltas_enabled
+            or response.get("type") != "compute_exec_schedule"
+            or not response.get("success", True)
+        ):
+            return response
+        self._exec_schedule_revision += 1
+        prev_response = self._last_sent_exec_schedule
+        self._last_sent_exec_schedule = response
+        if prev_response is None or self._should_send_full_exec_schedule:
+            self._should_send_full_exec_schedule = False
+            return {
+                **response,
+                "revision": self._exec_schedule_revision,
+                "is_delta": False,
+            }
+        return {
+            "type": response["type"],
+            "success": response["success"],
+            "revision": self._exec_schedule_revision,
+            "base_revision": self._exec_schedule_revision - 1,
+            "is_delta": True,
+            **diff_exec_schedules(prev_response, response),
+        }
+
     def _comm_target(self, comm: Comm, open_msg: Dict[str, Any]) -> None:
         """Handle comm target initialization."""
 
@@ -123,9 +235,10 @@ class CommManager:
                 and self.debounced_exec_schedule_pending
             ):
                 return
-            self.handle(request, comm=comm)
+            self.enqueue(request, comm=comm)
 
         self._comm = comm
+        self._should_send_full_exec_schedule = True
         self.flow.initialize(**open_msg.get("content", {}).get("data", {}))
         comm.send({"type": "establish", "success": True})
 
@@ -217,14 +330,101 @@ class CommManager:
     ) -> Optional[Dict[str, Any]]:
         """Handle compute execution schedule request."""
         try:
-            return self._handle_compute_exec_schedule_impl(
-                request,
-                notify_content_changed=notify_content_changed,
-                allow_new_ready=allow_new_ready,
-            )
+            with self.flow.metrics.timer("exec_schedule_seconds"):
+                return self._handle_compute_exec_schedule_impl(
+                    request,
+                    notify_content_changed=notify_content_changed,
+                    allow_new_ready=allow_new_ready,
+                )
         finally:
             self.flow.active_cell_id = None
 
+    def _update_static_check_result(self, cell: Cell) -> None:
+        result = cell.check_and_resolve_symbols(
+            update_liveness_time_versions=True,
+        )
+        if cell.last_check_result is None:
+            prev_resolved_live_syms: Set[ResolvedSymbol] = set()
+        else:
+            prev_resolved_live_syms = cell.last_check_result.live
+        prev_live_syms = {resolved.sym for resolved in prev_resolved_live_syms}
+        live_syms: Set[Symbol] = {resolved.sym for resolved in result.live}
+        cell.static_removed_symbols |= prev_live_syms
+        # cell.static_removed_symbols |= {
+        #     sym
+        #     for sym in prev_live_syms
+        #     # TODO: need a better way to prevent removing dangling references
+        #     # if not cells().from_timestamp(sym.timestamp).is_current
+        # }
+        cell.static_removed_symbols -= live_syms
+        cell.last_check_content = cell.current_content
+        cell.last_check_result = result
+        cell.last_check_cell_ctr = cell.cell_ctr
+
+    def _maybe_submit_static_analysis(self, cell: Cell, content: str) -> bool:
+        """
+        Returns True if analysis of the cell's new content was handed off to
+        the background analyzer, in which case its results get joined later.
+        """
+        mut_settings = self.flow.mut_settings
+        if (
+            not mut_settings.background_static_analysis_enabled
+            or mut_settings.flow_order == FlowDirection.ANY_ORDER
+            or content == cell.current_content
+        ):
+            return False
+        sanitized_content = cell.make_static_analysis_snapshot(content)
+        if sanitized_content is None:
+            return False
+        self.static_analyzer.submit(
+            cell.cell_id,
+            content,
+            sanitized_content,
+            cell.cell_ctr,
+            on_done=self._schedule_join_static_analyses,
+        )
+        return True
+
+    def join_static_analyses(self, wait: bool = False) -> bool:
+        """
+        Joins the results of completed background analyses into the flow graph;
+        should only be called on the main thread, between executions.
+        """
+        if wait:
+            self.static_analyzer.wait()
+        should_recompute_exec_schedule = False
+        for cell_id, result in self.static_analyzer.pop_completed():
+            cell = cells().from_id_nullable(cell_id)
+            if cell is None or cell.cell_ctr != result.cell_ctr:
+                # the cell was executed in the meantime
+                continue
+            if result.needs_scope:
+                # gets analyzed synchronously by the static check below
+                cell.current_content = result.content
+            else:
+                cell.set_static_analysis_result(result)
+            self._update_static_check_result(cell)
+            should_recompute_exec_schedule = True
+        return should_recompute_exec_schedule
+
+    def _schedule_join_static_analyses(self) -> None:
+        # called from the worker thread; the io loop runs callbacks on the main thread
+        if self._io_loop is not None:
+            self._io_loop.add_callback(self._on_static_analyses_done)
+
+    def _on_static_analyses_done(self) -> None:
+        if is_executing_cell() or self._comm is None:
+            # will get joined during the next comm request instead
+            return
+        if self.join_static_analyses():
+            self.handle(
+                {
+                    "type": "compute_exec_schedule",
+                    "notify_content_changed": False,
+                    "allow_new_ready": False,
+                }
+            )
+
     def _recompute_ast_for_cells(
         self, content_by_cell_id: Dict[IdType, str], force: bool = False
     ) -> bool:
@@ -240,40 +440,24 @@ class CommManager:
             if not is_same_content or not is_same_counter:
                 should_recompute_exec_schedule = True
         if not should_recompute_exec_schedule:
-            return False
+            return self.join_static_analyses()
         should_recompute_exec_schedule = False
         for cell_id, content in content_by_cell_id.items():
             cell = cells().from_id_nullable(cell_id)
             if cell is None:
                 continue
+            if self._maybe_submit_static_analysis(cell, content):
+                continue
+            self.static_analyzer.cancel(cell_id)
             prev_content = cell.current_content
             try:
                 cell.current_content = content
                 cell.to_ast()
-                result = cell.check_and_resolve_symbols(
-                    update_liveness_time_versions=True,
-                )
-                if cell.last_check_result is None:
-                    prev_resolved_live_syms: Set[ResolvedSymbol] = set()
-                else:
-                    prev_resolved_live_syms = cell.last_check_result.live
-                prev_live_syms = {resolved.sym for resolved in prev_resolved_live_syms}
-                live_syms: Set[Symbol] = {resolved.sym for resolved in result.live}
-                cell.static_removed_symbols |= prev_live_syms
-                # cell.static_removed_symbols |= {
-                #     sym
-                #     for sym in prev_live_syms
-                #     # TODO: need a better way to prevent removing dangling references
-                #     # if not cells().from_timestamp(sym.timestamp).is_current
-                # }
-                cell.static_removed_symbols -= live_syms
-                cell.last_check_content = cell.current_content
-                cell.last_check_result = result
-                cell.last_check_cell_ctr = cell.cell_ctr
+                self._update_static_check_result(cell)
                 should_recompute_exec_schedule = True
             except SyntaxError:
                 cell.current_content = prev_content
-        return should_recompute_exec_schedule
+        return self.join_static_analyses() or should_recompute_exec_schedule
 
     def _handle_notify_content_changed_impl(
         self, request: Dict[str, Any], is_reactively_executing: bool = False
@@ -309,6 +493,7 @@ class CommManager:
             cell_id: metadata["content"]
             for cell_id, metadata in cell_metadata_by_id.items()
         }
+        self.batch_executor.cancel_if_edited(content_by_cell_id)
         override_live_refs_by_cell_id = {
             cell_id: metadata["override_live_refs"]
             for cell_id, metadata in cell_metadata_by_id.items()
@@ -426,6 +611,106 @@ class CommManager:
         self.flow.tracked_timestamps[timestamp_name] = Timestamp.current()
         return None
 
+    def _compute_batch_exec_schedule(self) -> Dict[str, Any]:
+        request: Dict[str, Any] = {
+            "cell_metadata_by_id": self.flow._prev_cell_metadata_by_id,
+            "is_reactively_executing": True,
+            "notify_content_changed": False,
+        }
+        if len(self.batch_executor.executed_cell_ids) > 0:
+            request["executed_cell_id"] = self.batch_executor.executed_cell_ids[-1]
+        return self.handle_compute_exec_schedule(request) or {}
+
+    def _run_batch_step(self) -> bool:
+        executor = self.batch_executor
+        if not executor.has_next:
+            if executor.was_cancelled:
+                return False
+            # only recompute the schedule once the current closure has run
+            exec_schedule = self._compute_batch_exec_schedule()
+            executor.extend(
+                next_reactive_cell_ids(
+                    exec_schedule,
+                    executor.seen_cell_ids,
+                    ignore_cost_budget=executor.ignore_cost_budget,
+                )
+            )
+            if not executor.has_next:
+                self._batch_exec_schedule = exec_schedule
+                return False
+        execution = executor.run_next()
+        if execution is not None and self._comm is not None:
+            self._comm.send(execution.to_json())
+        return True
+
+    def _finish_batch(self) -> Dict[str, Any]:
+        executor = self.batch_executor
+        executor.finish()
+        exec_schedule = self._batch_exec_schedule
+        self._batch_exec_schedule = None
+        if exec_schedule is None:
+            # cancelled midway, so edits may have come in since the last schedule
+            exec_schedule = self._compute_batch_exec_schedule()
+        exec_schedule["batch_executed_cells"] = list(executor.executed_cell_ids)
+        exec_schedule["batch_cancelled_cells"] = list(executor.cancelled_cell_ids)
+        if executor.had_error:
+            exec_schedule["last_execution_was_error"] = True
+        return exec_schedule
+
+    def _run_batch_steps_on_io_loop(self) -> None:
+        try:
+            should_continue = self._run_batch_step()
+        except Exception:
+            logger.exception("exception during batch execution")
+            self.batch_executor.cancel()
+            should_continue = False
+        if should_continue:
+            # yield to the kernel between cells so that edits can cancel the rest
+            self._io_loop.add_callback(self._run_batch_steps_on_io_loop)
+            return
+        response = self._finish_batch()
+        response["type"] = response.get("type", "compute_exec_schedule")
+        response["success"] = response.get("success", True)
+        if self._comm is not None:
+            response = self._maybe_encode_exec_schedule(response)
+            self._record_message_size(response)
+            self._comm.send(response)
+
+    def handle_get_metrics(self, _request=None) -> Dict[str, Any]:
+        """Handle get metrics request."""
+        return {"metrics": self.flow.metrics.snapshot()}
+
+    def handle_execute_closure(self, request) -> Optional[Dict[str, Any]]:
+        """Handle request to execute the reactive closure of some cells."""
+        if not self.flow.mut_settings.kernel_batch_execution_enabled:
+            return {"success": False, "error": "kernel batch execution not enabled"}
+        if self.batch_executor.is_active:
+            return {"success": False, "error": "batch execution already in progress"}
+        self._handle_notify_content_changed_impl(request, is_reactively_executing=True)
+        cell_metadata_by_id = self.flow._prev_cell_metadata_by_id or {}
+        self.batch_executor.start(
+            {
+                cell_id: metadata["content"]
+                for cell_id, metadata in cell_metadata_by_id.items()
+                if metadata["type"] == "code"
+            },
+            skip_cell_ids=request.get("executed_cell_ids", []),
+            ignore_cost_budget=request.get("ignore_cost_budget", False),
+        )
+        cell_children = self.flow.check_and_link_multiple_cells().cell_children
+        self.batch_executor.extend(
+            compute_reactive_closure(request.get("cell_ids", []), cell_children)
+        )
+        if self._io_loop is None:
+            try:
+                while self._run_batch_step():
+                    pass
+            finally:
+                response = self._finish_batch()
+            return response
+        self._io_loop.add_callback(self._run_batch_steps_on_io_loop)
+        return self.NO_RESPONSE
+
     def handle_register_dynamic_comm_handler(self, request) -> Optional[Dict[str, Any]]:
         """Handle register dynamic comm handler request."""
         handler_msg_type = request.get("msg_type", None)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduling for comm requests from the frontend. Requests get queued and then
+handled one at a time from the kernel's io loop, which gives requests that
+arrive in the meantime (e.g. while a slider floods the kernel with widget
+updates) a chance to either jump the queue, if they are cheap interactive
+queries, or to replace a pending request that they make obsolete.
+"""
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+INTERACTIVE_PRIORITY = 0
+DEFAULT_PRIORITY = 1
+BACKGROUND_PRIORITY = 2
+
+_PRIORITY_BY_REQUEST_TYPE = {
+    "change_active_cell": INTERACTIVE_PRIORITY,
+    "get_code": INTERACTIVE_PRIORITY,
+    "get_last_updated_cell_id": INTERACTIVE_PRIORITY,
+    "compute_exec_schedule": BACKGROUND_PRIORITY,
+    "notify_content_changed": BACKGROUND_PRIORITY,
+    "refresh_symbols": BACKGROUND_PRIORITY,
+}
+
+# a newer request of one of these types makes any pending one obsolete
+SUPERSEDABLE_REQUEST_TYPES = frozenset(
+    {"compute_exec_schedule", "notify_content_changed", "refresh_symbols"}
+)
+
+
+class QueuedRequest(NamedTuple):
+    request: Dict[str, Any]
+    comm: Any
+    enqueued_at: float
+
+
+class RequestLatencyStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.num_superseded = 0
+
+    def record(self, latency: float) -> None:
+        self.count += 1
+        self.total_seconds += latency
+        self.max_seconds = max(self.max_seconds, latency)
+
+    @property
+    def mean_seconds(self) -> float:
+        return 0.0 if self.count == 0 else self.total_seconds / self.count
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_seconds": self.mean_seconds,
+            "max_seconds": self.max_seconds,
+            "num_superseded": self.num_superseded,
+        }
+
+
+def _merge_superseded(
+    prev_request: Dict[str, Any], request: Dict[str, Any]
+) -> Dict[str, Any]:
+    if request["type"] == "refresh_symbols":
+        # these accumulate rather than replace
+        symbols = list(prev_request.get("symbols", []))
+        seen = set(symbols)
+        symbols.extend(sym for sym in request.get("symbols", []) if sym not in seen)
+        return {**request, "symbols": symbols}
+    return request
+
+
+class CommRequestQueue:
+    def __init__(self) -> None:
+        self._heap: List[Tuple[int, int]] = []
+        self._entries: Dict[int, QueuedRequest] = {}
+        self._seq_by_supersedable_type: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self.stats_by_request_type: Dict[str, RequestLatencyStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _stats_for(self, request_type: str) -> RequestLatencyStats:
+        stats = self.stats_by_request_type.get(request_type)
+        if stats is None:
+            stats = self.stats_by_request_type[request_type] = RequestLatencyStats()
+        return stats
+
+    def push(self, request: Dict[str, Any], comm: Any = None) -> None:
+        request_type = request.get("type", "")
+        now = time.perf_counter()
+        if request_type in SUPERSEDABLE_REQUEST_TYPES:
+            pending_seq = self._seq_by_supersedable_type.get(request_type)
+            if pending_seq is not None:
+                # take the pending request's place in line so floods can't starve it
+                prev = self._entries[pending_seq]
+                self._entries[pending_seq] = QueuedRequest(
+                    _merge_superseded(prev.request, request), comm, prev.enqueued_at
+                )
+                self._stats_for(request_type).num_superseded += 1
+                return
+        seq = next(self._seq)
+        self._entries[seq] = QueuedRequest(request, comm, now)
+        if request_type in SUPERSEDABLE_REQUEST_TYPES:
+            self._seq_by_supersedable_type[request_type] = seq
+        heapq.heappush(
+            self._heap,
+            (_PRIORITY_BY_REQUEST_TYPE.get(request_type, DEFAULT_PRIORITY), seq),
+        )
+
+    def pop(self) -> Optional[QueuedRequest]:
+        if len(self._heap) == 0:
+            return None
+        _, seq = heapq.heappop(self._heap)
+        entry = self._entries.pop(seq)
+        request_type = entry.request.get("type", "")
+        if self._seq_by_supersedable_type.get(request_type) == seq:
+            del self._seq_by_supersedable_type[request_type]
+        self._stats_for(request_type).record(time.perf_counter() - entry.enqueued_at)
+        return entry
+
+    def latency_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            request_type: stats.to_json()
+            for request_type, stats in self.stats_by_request_type.items()
+        }
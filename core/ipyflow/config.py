@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from dataclasses import asdict, dataclass
 from enum import Enum
-from typing import Any, Dict, Generator, List
+from typing import Any, Dict, Generator, List, Optional
 
 from ipyflow.slicing.context import SlicingContext, iter_slicing_contexts
 
@@ -103,6 +103,26 @@ class MutableDataflowSettings(JsonSerializableMixin):
     syntax_transforms_enabled: bool
     syntax_transforms_only: bool
     max_external_call_depth_for_tracing: int
+    function_demotion_enabled: bool
+    function_demotion_min_calls: int
+    function_demotion_min_overhead_seconds: float
+    function_summaries_enabled: bool
+    function_summaries_verify: bool
+    sys_monitoring_enabled: bool
+    opaque_comprehensions_enabled: bool
+    thread_aware_tracing_enabled: bool
+    background_static_analysis_enabled: bool
+    kernel_batch_execution_enabled: bool
+    reactive_cost_budget: float
+    fork_checkpoints_enabled: bool
+    fork_checkpoint_budget: int
+    fork_checkpoint_min_cost: float
+    value_store_enabled: bool
+    value_store_byte_budget: int
+    metrics_dump_path: Optional[str]
+    metrics_dump_interval: float
+    capture_output_limit: int
+    capture_output_spill_enabled: bool
     is_dev_mode: bool
 
     def slicing_contexts(self) -> List[SlicingContext]:
@@ -1,7 +1,40 @@
 # -*- coding: utf-8 -*-
-from typing import Tuple
+import sys
+from typing import Any, Optional, Tuple
 
+# dataframe classes whose columns get tracked as individual symbols, with
+# attribute and subscript symbols for the same column kept in sync
 DUPED_ATTRSUB_CLASSES: Tuple[Tuple[str, str], ...] = (
     ("pandas", "DataFrame"),
     ("modin.pandas", "DataFrame"),
+    ("polars", "DataFrame"),
 )
+
+
+def is_dataframe(obj: Any) -> bool:
+    # checked without importing any of the dataframe libraries
+    for modname, classname in DUPED_ATTRSUB_CLASSES:
+        module = sys.modules.get(modname)
+        if module is None:
+            continue
+        clazz = getattr(module, classname, None)
+        if clazz is not None and isinstance(obj, clazz):
+            return True
+    return False
+
+
+def get_dataframe_column_names(obj: Any) -> Optional[Tuple[Any, ...]]:
+    if not is_dataframe(obj):
+        return None
+    try:
+        return tuple(obj.columns)
+    except Exception:
+        return None
+
+
+def has_multiindex_columns(obj: Any) -> bool:
+    # tuple subscripts of such frames name a single column
+    try:
+        return getattr(obj.columns, "nlevels", 1) > 1
+    except Exception:
+        return False
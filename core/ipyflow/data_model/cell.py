@@ -52,6 +52,7 @@ from ipyflow.utils.ipython_utils import _IPY
 from ipyflow.utils.ipython_utils import cell_counter as ipy_cell_counter
 
 if TYPE_CHECKING:
+    from ipyflow.analysis.background_analysis import StaticAnalysisResult
     from ipyflow.data_model.statement import Statement
     from ipyflow.data_model.symbol import Symbol
 
@@ -74,6 +75,12 @@ class CheckerResult(NamedTuple):
     typechecks: bool  # whether the cell typechecks successfully
 
 
+class CellExecutionCost(NamedTuple):
+    wall_time: float  # seconds spent running the cell
+    cpu_time: float  # seconds of cpu time used by the kernel process
+    output_size: int  # number of characters of captured output
+
+
 class Cell(SliceableMixin):
     _current_cell_by_cell_id: Dict[IdType, "Cell"] = {}
     _cell_by_cell_ctr: Dict[int, "Cell"] = {}
@@ -106,6 +113,7 @@ class Cell(SliceableMixin):
         self.current_content: str = content
         self.last_ast_content: Optional[str] = None
         self.captured_output: Optional[IPyflowCapturedIO] = None
+        self.execution_cost: Optional[CellExecutionCost] = None
         self.tags: Tuple[str, ...] = tags
         self.prev_cell = prev_cell
         self.override_live_refs: Optional[List[str]] = None
@@ -125,6 +133,7 @@ class Cell(SliceableMixin):
             set
         )
         self._cached_ast: Optional[ast.Module] = None
+        self._precomputed_static_analysis: Optional["StaticAnalysisResult"] = None
         self._cached_typecheck_result: Optional[bool] = (
             None if flow().settings.mark_typecheck_failures_unsafe else True
         )
@@ -566,20 +575,27 @@ class Cell(SliceableMixin):
         return self.raw_and_sanitized_content()[1]
 
     def get_memoized_counter(self) -> Optional[int]:
-        prev_cell = self.prev_cell
-        if not self.is_memoized or prev_cell is None:
+        if not self.is_memoized or self.prev_cell is None:
             return None
+        return self._get_memoized_counter_before(self.cell_ctr)
+
+    @property
+    def has_unchanged_memoized_inputs(self) -> bool:
+        """Whether rerunning this cell would just reuse a memoized result."""
+        return (
+            self.is_memoized
+            and self._get_memoized_counter_before(self.cell_ctr + 1) is not None
+        )
 
+    def _get_memoized_counter_before(self, max_ctr: int) -> Optional[int]:
         symbols_ = symbols()
         for (
             inputs,
             outputs,
             displayed_output,
             ctr,
-        ) in prev_cell._memoized_executions.get(
-            self.executed_content or "", {}
-        ).values():
-            if ctr >= self.cell_ctr:
+        ) in self._memoized_executions.get(self.executed_content or "", {}).values():
+            if ctr >= max_ctr:
                 continue
             for sym, in_ts, mem_ts, obj_id, comparable in inputs:
                 if comparable is not symbols_.NULL:
@@ -604,6 +620,25 @@ class Cell(SliceableMixin):
                 return ctr
         return None
 
+    @property
+    def captured_output_size(self) -> int:
+        captured = self.captured_output
+        return 0 if captured is None else captured.size
+
+    def record_execution_cost(self, wall_time: float, cpu_time: float) -> None:
+        self.execution_cost = CellExecutionCost(
+            wall_time, cpu_time, self.captured_output_size
+        )
+
+    @property
+    def last_execution_cost(self) -> Optional[CellExecutionCost]:
+        cell: Optional[Cell] = self
+        while cell is not None:
+            if cell.execution_cost is not None:
+                return cell.execution_cost
+            cell = cell.prev_cell
+        return None
+
     def get_transformed_memoized_content(
         self, ctr: Optional[int] = None
     ) -> Optional[str]:
@@ -677,6 +712,32 @@ class Cell(SliceableMixin):
                     rewriter.visit(self._cached_ast)
         return self._cached_ast
 
+    def make_static_analysis_snapshot(self, content: str) -> Optional[str]:
+        """
+        Returns the sanitized version of the given content if it can be parsed and
+        analyzed off of the main thread, i.e., if doing so does not require any
+        syntax augmentations that only the ast rewriter knows how to track.
+        """
+        if self.override_live_refs is not None or self.override_dead_refs is not None:
+            return None
+        raw_cell = self.get_memoized_content(content) or content
+        shell_ = shell()
+        try:
+            sanitized_content = shell_.transform_cell(raw_cell)
+        except Exception:
+            sanitized_content = raw_cell
+        for tracer_cls in shell_.registered_tracers:
+            for spec in tracer_cls.syntax_augmentation_specs():
+                if spec.token in sanitized_content:
+                    return None
+        return sanitized_content
+
+    def set_static_analysis_result(self, result: "StaticAnalysisResult") -> None:
+        # only the liveness results get reused; the ast is left for `to_ast` to
+        # (re)build, since background workers skip the cell's ast rewriter
+        self.current_content = result.content
+        self._precomputed_static_analysis = result
+
     @property
     def num_original_stmts(self) -> int:
         return len(self.to_ast().body)
@@ -781,7 +842,19 @@ class Cell(SliceableMixin):
         live_symbol_refs: Set[LiveSymbolRef] = set()
         dead_symbol_refs: Set[SymbolRef] = set()
         modified_symbol_refs: Set[SymbolRef] = set()
-        if self.override_live_refs is None and self.override_dead_refs is None:
+        precomputed = self._precomputed_static_analysis
+        self._precomputed_static_analysis = None
+        if (
+            precomputed is not None
+            and precomputed.content == self.current_content
+            and precomputed.cell_ctr == self.cell_ctr
+            and self.override_live_refs is None
+            and self.override_dead_refs is None
+        ):
+            live_symbol_refs = precomputed.live_refs
+            dead_symbol_refs = precomputed.dead_refs
+            modified_symbol_refs = precomputed.modified_refs
+        elif self.override_live_refs is None and self.override_dead_refs is None:
             (
                 live_symbol_refs,
                 dead_symbol_refs,
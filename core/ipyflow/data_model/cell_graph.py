@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+A dense index over a cell dependency graph. Cell ids get mapped to integers so
+that edge sets and reachability sets can be stored as int bitsets; strongly
+connected components and a topological order of the condensation get computed
+once up front, after which reachability / closure queries for any number of
+start cells are just bitwise ors.
+"""
+import heapq
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+)
+
+from ipyflow.types import IdType
+
+
+def iter_bits(mask: int) -> Generator[int, None, None]:
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class CellGraphIndex:
+    def __init__(
+        self,
+        edges: Mapping[IdType, Iterable[IdType]],
+        cell_ids: Iterable[IdType] = (),
+    ) -> None:
+        self._ids: List[IdType] = []
+        self._idx_by_id: Dict[IdType, int] = {}
+        self._succ: List[int] = []
+        for cell_id in cell_ids:
+            self._intern(cell_id)
+        for src_id, dst_ids in edges.items():
+            src = self._intern(src_id)
+            mask = 0
+            for dst_id in dst_ids:
+                mask |= 1 << self._intern(dst_id)
+            self._succ[src] |= mask
+        self._component_by_idx: Optional[List[int]] = None
+        self._components: Optional[List[int]] = None
+        self._reach: Optional[List[int]] = None
+
+    @classmethod
+    def for_existing_cells(
+        cls,
+        edges: Mapping[IdType, Iterable[IdType]],
+        has_id: Callable[[IdType], bool],
+    ) -> "CellGraphIndex":
+        """
+        Builds an index over only those cells for which `has_id` holds, so that
+        edges into or out of cells that no longer exist get dropped.
+        """
+        return cls(
+            {
+                src_id: [dst_id for dst_id in dst_ids if has_id(dst_id)]
+                for src_id, dst_ids in edges.items()
+                if has_id(src_id)
+            }
+        )
+
+    def _intern(self, cell_id: IdType) -> int:
+        idx = self._idx_by_id.get(cell_id)
+        if idx is None:
+            idx = len(self._ids)
+            self._idx_by_id[cell_id] = idx
+            self._ids.append(cell_id)
+            self._succ.append(0)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, cell_id: IdType) -> bool:
+        return cell_id in self._idx_by_id
+
+    @property
+    def cell_ids(self) -> List[IdType]:
+        return list(self._ids)
+
+    def to_mask(self, cell_ids: Iterable[IdType]) -> int:
+        mask = 0
+        for cell_id in cell_ids:
+            idx = self._idx_by_id.get(cell_id)
+            if idx is not None:
+                mask |= 1 << idx
+        return mask
+
+    def to_ids(self, mask: int) -> List[IdType]:
+        return [self._ids[idx] for idx in iter_bits(mask)]
+
+    def successors_mask(self, mask: int) -> int:
+        ret = 0
+        for idx in iter_bits(mask):
+            ret |= self._succ[idx]
+        return ret
+
+    def _compute_components(self) -> None:
+        # iterative Tarjan; components come out in reverse topological order
+        num_nodes = len(self._ids)
+        index_by_idx = [-1] * num_nodes
+        lowlink = [0] * num_nodes
+        on_stack = [False] * num_nodes
+        component_by_idx = [-1] * num_nodes
+        components: List[int] = []
+        scc_stack: List[int] = []
+        counter = 0
+        for root in range(num_nodes):
+            if index_by_idx[root] >= 0:
+                continue
+            work = [(root, iter_bits(self._succ[root]))]
+            index_by_idx[root] = lowlink[root] = counter
+            counter += 1
+            scc_stack.append(root)
+            on_stack[root] = True
+            while len(work) > 0:
+                node, succ_iter = work[-1]
+                for succ in succ_iter:
+                    if index_by_idx[succ] < 0:
+                        index_by_idx[succ] = lowlink[succ] = counter
+                        counter += 1
+                        scc_stack.append(succ)
+                        on_stack[succ] = True
+                        work.append((succ, iter_bits(self._succ[succ])))
+                        break
+                    elif on_stack[succ]:
+                        lowlink[node] = min(lowlink[node], index_by_idx[succ])
+                else:
+                    work.pop()
+                    if len(work) > 0:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index_by_idx[node]:
+                        members = 0
+                        while True:
+                            member = scc_stack.pop()
+                            on_stack[member] = False
+                            component_by_idx[member] = len(components)
+                            members |= 1 << member
+                            if member == node:
+                                break
+                        components.append(members)
+        self._component_by_idx = component_by_idx
+        self._components = components
+
+    @property
+    def components(self) -> List[List[IdType]]:
+        """
+        Strongly connected components, in topological order.
+        """
+        if self._components is None:
+            self._compute_components()
+        return [self.to_ids(members) for members in reversed(self._components)]
+
+    def _compute_reach(self) -> None:
+        if self._components is None:
+            self._compute_components()
+        component_by_idx = self._component_by_idx
+        reach_by_component: List[int] = []
+        for members in self._components:
+            # successor components were all emitted (and so handled) before this one
+            reach = members
+            for succ in iter_bits(self.successors_mask(members) & ~members):
+                reach |= reach_by_component[component_by_idx[succ]]
+            reach_by_component.append(reach)
+        self._reach = [reach_by_component[comp] for comp in component_by_idx]
+
+    def reachable_mask(self, mask: int, inclusive: bool = True) -> int:
+        """
+        Everything reachable from the cells in `mask`; if not `inclusive`, only
+        what is reachable along at least one edge.
+        """
+        if self._reach is None:
+            self._compute_reach()
+        if not inclusive:
+            mask = self.successors_mask(mask)
+        ret = 0
+        for idx in iter_bits(mask):
+            ret |= self._reach[idx]
+        return ret
+
+    def reachable(
+        self, cell_ids: Iterable[IdType], inclusive: bool = True
+    ) -> Set[IdType]:
+        cell_ids = list(cell_ids)
+        ret = set(self.to_ids(self.reachable_mask(self.to_mask(cell_ids), inclusive)))
+        if inclusive:
+            # cells missing from the index have no edges but still reach themselves
+            ret.update(cell_ids)
+        return ret
+
+    def topological_order(
+        self, cell_ids: Iterable[IdType], key: Callable[[IdType], object]
+    ) -> List[IdType]:
+        """
+        Orders `cell_ids` so that parents come before children, considering
+        only edges among them and breaking ties by `key`. Cells that can't be
+        ordered due to cycles go at the end, in `key` order.
+        """
+        cell_ids = list(cell_ids)
+        subset = self.to_mask(cell_ids)
+        num_parents_by_idx: Dict[int, int] = {}
+        for idx in iter_bits(subset):
+            for succ in iter_bits(self._succ[idx] & subset):
+                num_parents_by_idx[succ] = num_parents_by_idx.get(succ, 0) + 1
+        ready = []
+        for cell_id in cell_ids:
+            # cells missing from the index have no edges
+            idx = self._idx_by_id.get(cell_id, -1)
+            if num_parents_by_idx.get(idx, 0) == 0:
+                ready.append((key(cell_id), idx, cell_id))
+        heapq.heapify(ready)
+        ordered: List[IdType] = []
+        while len(ready) > 0:
+            _, idx, cell_id = heapq.heappop(ready)
+            ordered.append(cell_id)
+            if idx < 0:
+                continue
+            for succ in iter_bits(self._succ[idx] & subset):
+                num_parents_by_idx[succ] -= 1
+                if num_parents_by_idx[succ] == 0:
+                    succ_id = self._ids[succ]
+                    heapq.heappush(ready, (key(succ_id), succ, succ_id))
+        if len(ordered) < len(cell_ids):
+            # cycles have no valid topological order; fall back to key order
+            seen = set(ordered)
+            ordered.extend(
+                sorted(
+                    (cell_id for cell_id in cell_ids if cell_id not in seen), key=key
+                )
+            )
+        return ordered
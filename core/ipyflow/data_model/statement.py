@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 import ast
 import builtins
+import linecache
 import logging
 import sys
+import textwrap
 from types import FrameType
 from typing import TYPE_CHECKING, Dict, List, Optional, Set, Type, Union, cast
 
@@ -12,7 +14,7 @@ from ipyflow.analysis.live_refs import stmt_contains_cascading_reactive_rval
 from ipyflow.analysis.symbol_edges import get_symbol_edges
 from ipyflow.analysis.symbol_ref import SymbolRef
 from ipyflow.analysis.utils import stmt_contains_lval
-from ipyflow.data_model import DUPED_ATTRSUB_CLASSES
+from ipyflow.data_model import is_dataframe
 from ipyflow.data_model.namespace import Namespace
 from ipyflow.data_model.scope import Scope
 from ipyflow.data_model.symbol import Symbol
@@ -59,6 +61,12 @@ class Statement(SliceableMixin):
     ) -> None:
         self.stmt_node: ast.stmt = stmt_node
         self.frame: Optional[FrameType] = frame
+        # the frame gets dropped once the statement finishes, so hang on to
+        # where its source lives for rendering slices later on
+        self._filename: Optional[str] = (
+            None if frame is None else frame.f_code.co_filename
+        )
+        self._text: Optional[str] = None
         self._timestamp = timestamp or Timestamp.current()
         self._finished: bool = False
         self.override: bool = override
@@ -90,6 +98,34 @@ class Statement(SliceableMixin):
 
     @property
     def text(self) -> str:
+        if self._text is None:
+            self._text = self._get_source_segment() or self._unparse()
+        return self._text
+
+    def _get_source_segment(self, node: Optional[ast.stmt] = None) -> Optional[str]:
+        node = self.stmt_node if node is None else node
+        if self._filename is None:
+            return None
+        source = "".join(linecache.getlines(self._filename))
+        if not source:
+            return None
+        try:
+            segment = ast.get_source_segment(source, node, padded=True)
+        except Exception:
+            return None
+        if segment is None:
+            return None
+        segment = textwrap.dedent(segment).strip()
+        try:
+            parsed = ast.parse(segment).body
+        except SyntaxError:
+            return None
+        if len(parsed) != 1 or type(parsed[0]) is not type(node):
+            # the node was synthesized or the source changed under us
+            return None
+        return segment
+
+    def _unparse(self) -> str:
         if isinstance(self.stmt_node, ast.Assign) and self.stmt_node.lineno == max(
             getattr(nd, "lineno", self.stmt_node.lineno)
             for nd in ast.walk(self.stmt_node)
@@ -154,6 +190,26 @@ class Statement(SliceableMixin):
         flow().stmt_deferred_static_parents.pop(stmt.timestamp, None)
         return stmt
 
+    @property
+    def module_stmt_node(self) -> ast.stmt:
+        """
+        The outermost statement containing this one (possibly this one itself).
+        """
+        node = self.stmt_node
+        parent_stmt_by_id = tracer().parent_stmt_by_id
+        while True:
+            parent = parent_stmt_by_id.get(id(node))
+            if parent is None:
+                return node
+            node = parent
+
+    @property
+    def module_stmt_text(self) -> str:
+        node = self.module_stmt_node
+        if node is self.stmt_node:
+            return self.text
+        return self._get_source_segment(node) or astunparse.unparse(node).strip()
+
     def is_module_stmt(self) -> bool:
         return tracer().parent_stmt_by_id.get(self.stmt_id) is None
 
@@ -388,16 +444,13 @@ class Statement(SliceableMixin):
         subscript_vals_to_use = [is_subscript]
         if scope.is_namespace_scope:
             namespace = cast(Namespace, scope)
-            for modname, classname in DUPED_ATTRSUB_CLASSES:
-                module = sys.modules.get(modname)
-                if module is None:
-                    continue
-                clazz = getattr(module, classname, None)
-                if clazz is None:
-                    continue
-                if isinstance(namespace.obj, clazz) and name in namespace.obj.columns:
-                    subscript_vals_to_use.append(not is_subscript)
-                    break
+            # only string labels double as attributes; e.g. MultiIndex keys do not
+            if (
+                isinstance(name, str)
+                and is_dataframe(namespace.obj)
+                and name in namespace.obj.columns
+            ):
+                subscript_vals_to_use.append(not is_subscript)
         for subscript_val in subscript_vals_to_use:
             upserted = scope.upsert_symbol_for_name(
                 name,
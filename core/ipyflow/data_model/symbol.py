@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import ast
+import itertools
 import logging
 import sys
 from enum import Enum
@@ -21,6 +22,7 @@ from typing import (
 )
 
 from ipyflow.config import ExecutionSchedule, FlowDirection
+from ipyflow.data_model import get_dataframe_column_names
 from ipyflow.data_model.cell import Cell, cells
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.data_model.utils.annotation_utils import (
@@ -29,7 +31,7 @@ from ipyflow.data_model.utils.annotation_utils import (
 )
 from ipyflow.data_model.utils.update_protocol import UpdateProtocol
 from ipyflow.models import _SymbolContainer, namespaces, statements, symbols
-from ipyflow.singletons import flow, shell, tracer
+from ipyflow.singletons import flow, shell, tracer, tracer_initialized
 from ipyflow.slicing.context import dynamic_slicing_context, slicing_context
 from ipyflow.slicing.mixin import FormatType, Slice
 from ipyflow.tracing.watchpoint import Watchpoints
@@ -50,6 +52,7 @@ else:
 
 if TYPE_CHECKING:
     # avoid circular imports
+    from ipyflow.analysis.symbol_ref import LiveSymbolRef
     from ipyflow.data_model.namespace import Namespace
     from ipyflow.data_model.scope import Scope
 
@@ -139,7 +142,9 @@ class Symbol:
         self.func_def_stmt: Optional[Union[ast.stmt, ast.Lambda]] = None
         self.stmt_node = self.update_stmt_node(stmt_node)
         self.symbol_node = symbol_node
-        self._funcall_live_symbols = None
+        self._funcall_live_symbols: Optional[
+            Tuple[Union[ast.stmt, ast.Lambda], Dict[bool, Set["LiveSymbolRef"]]]
+        ] = None
         self.parents: Dict["Symbol", List[Timestamp]] = {}
         self.children: Dict["Symbol", List[Timestamp]] = {}
 
@@ -156,6 +161,9 @@ class Symbol:
         self._cascading_reactive_cell_num = -1
         self._override_ready_liveness_cell_num = -1
         self._override_timestamp: Optional[Timestamp] = None
+        # for dataframes derived from their previous value by e.g. `df.assign(...)`,
+        # the timestamp to use for accesses to the columns carried over unchanged
+        self._column_access_timestamp: Optional[Timestamp] = None
         self.watchpoints = Watchpoints()
 
         # The necessary last-updated timestamp / cell counter for this symbol to not be waiting
@@ -174,6 +182,10 @@ class Symbol:
         self.fresher_ancestors: Set["Symbol"] = set()
         self.fresher_ancestor_timestamps: Set[Timestamp] = set()
 
+        # generation stamps used in lieu of per-traversal `seen` sets
+        self._update_generation = -1
+        self._refresh_generation = -1
+
         # cells where this symbol was live
         self.cells_where_deep_live: Set[Cell] = set()
         self.cells_where_shallow_live: Set[Cell] = set()
@@ -734,6 +746,11 @@ class Symbol:
         self.cells_where_deep_live.clear()
         self.obj = obj
         if self.cached_obj_id is not None and self.cached_obj_id != self.obj_id:
+            if tracer_initialized():
+                lineage = tracer().frame_column_lineage.get(self.obj_id)
+                if lineage is not None and lineage[0] != self.cached_obj_id:
+                    # derived from some other frame, so no columns carry over
+                    del tracer().frame_column_lineage[self.obj_id]
             new_ns = flow().namespaces.get(self.obj_id, None)
             # don't overwrite existing namespace for this obj
             old_ns = flow().namespaces.get(self.cached_obj_id, None)
@@ -816,6 +833,36 @@ class Symbol:
         self.cached_obj_type = self.obj_type
         self.cached_obj_len = self.obj_len
 
+    def get_funcall_live_refs(
+        self, include_killed_live: bool = False
+    ) -> Set["LiveSymbolRef"]:
+        """
+        Static live references in the body of this symbol's function definition;
+        computed once per definition and reset by update_stmt_node.
+        """
+        from ipyflow.analysis.live_refs import compute_live_dead_symbol_refs
+
+        func_def_stmt = self.func_def_stmt
+        assert isinstance(
+            func_def_stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+        ), ("got %s" % func_def_stmt)
+        if (
+            self._funcall_live_symbols is None
+            or self._funcall_live_symbols[0] is not func_def_stmt
+        ):
+            # lambda symbols get func_def_stmt assigned directly, so check identity
+            self._funcall_live_symbols = (func_def_stmt, {})
+        live_refs_by_include_killed = self._funcall_live_symbols[1]
+        live_refs = live_refs_by_include_killed.get(include_killed_live)
+        if live_refs is None:
+            live_refs, *_ = compute_live_dead_symbol_refs(
+                cast(ast.FunctionDef, func_def_stmt).body,
+                init_killed={arg.arg for arg in self.get_definition_args()},
+                include_killed_live=include_killed_live,
+            )
+            live_refs_by_include_killed[include_killed_live] = live_refs
+        return live_refs
+
     def get_definition_args(self) -> List[ast.arg]:
         assert isinstance(
             self.func_def_stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
@@ -1340,15 +1387,71 @@ class Symbol:
         for alias in flow().aliases.get(containing_ns.obj_id, []):
             alias._take_timestamp_snapshots(ts_ubound, seen=seen)
 
+    _refresh_generations = itertools.count()
+
+    @staticmethod
+    def _unchanged_frame_columns(ns: "Namespace") -> Set[Any]:
+        if not tracer_initialized():
+            return set()
+        lineage = tracer().frame_column_lineage.get(ns.obj_id)
+        if lineage is None:
+            return set()
+        return set(get_dataframe_column_names(ns.obj) or ()) - lineage[1]
+
     def refresh(
         self,
         take_timestamp_snapshots: bool = True,
         refresh_descendent_namespaces: bool = False,
         timestamp: Optional[Timestamp] = None,
-        seen: Optional[Set["Symbol"]] = None,
     ) -> None:
-        if seen is not None and self in seen:
+        prev_column_access_timestamp = (
+            self._column_access_timestamp or self.shallow_timestamp
+        )
+        self._refresh_this_symbol(take_timestamp_snapshots, timestamp)
+        self._column_access_timestamp = None
+        if not refresh_descendent_namespaces:
             return
+        generation = next(self._refresh_generations)
+        self._refresh_generation = generation
+        stack: List["Symbol"] = [self]
+        while len(stack) > 0:
+            parent = stack.pop()
+            ns = parent.namespace
+            if ns is None:
+                continue
+            unchanged_columns = self._unchanged_frame_columns(ns)
+            if len(unchanged_columns) > 0 and parent is self:
+                self._column_access_timestamp = prev_column_access_timestamp
+            for sym in ns.all_symbols_this_indentation(exclude_class=True):
+                if sym.name in unchanged_columns:
+                    # e.g. `df = df.assign(a=...)` leaves the other columns fresh
+                    continue
+                # this is to handle cases like `x = x.mutate(42)`, where
+                # we could have changed some member of x but returned the
+                # original object -- in this case, just assume that all
+                # the stale namespace descendents are no longer stale, as
+                # this is likely the user intention. For an example, see
+                # `test_external_object_update_propagates_to_stale_namespace_symbols()`
+                # in `test_frontend_checker.py`
+                # logger.error(
+                #     "refresh %s due to %s (value %s) via namespace %s",
+                #     sym.full_path,
+                #     parent.full_path,
+                #     parent.obj,
+                #     ns.full_path,
+                # )
+                if sym._refresh_generation == generation:
+                    continue
+                sym._refresh_this_symbol(
+                    take_timestamp_snapshots=False, timestamp=parent._timestamp
+                )
+                if sym.name != "__class__":
+                    sym._refresh_generation = generation
+                    stack.append(sym)
+
+    def _refresh_this_symbol(
+        self, take_timestamp_snapshots: bool, timestamp: Optional[Timestamp]
+    ) -> None:
         orig_timestamp = self._timestamp
         self._updated_timestamps.add(orig_timestamp)
         self._timestamp = Timestamp.current() if timestamp is None else timestamp
@@ -1371,35 +1474,6 @@ class Symbol:
                 for cell in alias.cells_where_deep_live:
                     cell.add_used_cell_counter(alias, self._timestamp.cell_num)
         self.namespace_waiting_symbols.clear()
-        if not refresh_descendent_namespaces:
-            return
-        if seen is None:
-            seen = set()
-        seen.add(self)
-        ns = self.namespace
-        if ns is None:
-            return
-        for sym in ns.all_symbols_this_indentation(exclude_class=True):
-            # this is to handle cases like `x = x.mutate(42)`, where
-            # we could have changed some member of x but returned the
-            # original object -- in this case, just assume that all
-            # the stale namespace descendents are no longer stale, as
-            # this is likely the user intention. For an example, see
-            # `test_external_object_update_propagates_to_stale_namespace_symbols()`
-            # in `test_frontend_checker.py`
-            # logger.error(
-            #     "refresh %s due to %s (value %s) via namespace %s",
-            #     sym.full_path,
-            #     self.full_path,
-            #     self.obj,
-            #     ns.full_path,
-            # )
-            sym.refresh(
-                refresh_descendent_namespaces=sym.name != "__class__",
-                timestamp=self._timestamp,
-                take_timestamp_snapshots=False,
-                seen=seen,
-            )
 
     def resync_if_necessary(self, refresh: bool) -> None:
         if not self.containing_scope.is_global:
@@ -1,24 +1,66 @@
 # -*- coding: utf-8 -*-
+import itertools
 import logging
-import sys
-from typing import TYPE_CHECKING, Generator, Iterable, Set, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    cast,
+)
 
-from ipyflow.data_model import DUPED_ATTRSUB_CLASSES
+from ipyflow.data_model import is_dataframe
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.singletons import flow, tracer
 
 if TYPE_CHECKING:
     # avoid circular imports
+    from ipyflow.data_model.namespace import Namespace
     from ipyflow.data_model.symbol import Symbol
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
 
+# (step, symbol, skip_seen_check)
+_PropagationStep = Tuple[Callable[["Symbol"], List[Any]], "Symbol", bool]
+
+
 class UpdateProtocol:
+    """
+    Marks symbols that transitively depend on an updated symbol as waiting.
+
+    Propagation walks the dependency graph with explicit work stacks rather
+    than recursion, so that long dependency chains don't blow the interpreter
+    stack. Instead of allocating a fresh ``seen`` set for every update, each
+    protocol invocation claims a new generation number and stamps the symbols
+    it visits with it; a symbol whose stamp matches the current generation is
+    never revisited.
+    """
+
+    _generations = itertools.count()
+
     def __init__(self, updated_sym: "Symbol") -> None:
         self.updated_sym = updated_sym
-        self.seen: Set["Symbol"] = set()
+        self.generation = next(self._generations)
+        # looked up once per propagation, rather than once per visited symbol
+        self._namespaces: Dict[int, "Namespace"] = {}
+        self._aliases: Dict[int, Set["Symbol"]] = {}
+        self._already_updated: Tuple[Set["Symbol"], Set["Symbol"]] = (set(), set())
+        self._updated_sym_timestamp = Timestamp.uninitialized()
+        self._required_timestamp = Timestamp.uninitialized()
+
+    def _is_seen(self, sym: "Symbol") -> bool:
+        return sym._update_generation == self.generation
+
+    def _mark_seen(self, sym: "Symbol") -> None:
+        sym._update_generation = self.generation
 
     def __call__(
         self,
@@ -41,8 +83,10 @@ class UpdateProtocol:
             flow().aliases[self.updated_sym.obj_id] if mutated else {self.updated_sym}
         )
         directly_updated_symbols |= self._maybe_get_duped_attrsub_updated_syms()
-        self._collect_updated_symbols_and_refresh_namespaces(
-            directly_updated_symbols, propagate_to_namespace_descendents
+        updated_symbols_with_ancestors = (
+            self._collect_updated_symbols_and_refresh_namespaces(
+                directly_updated_symbols, propagate_to_namespace_descendents
+            )
         )
         logger.warning(
             "for symbol %s: mutated=%s; updated_symbols=%s",
@@ -50,61 +94,61 @@ class UpdateProtocol:
             mutated,
             directly_updated_symbols,
         )
-        updated_symbols_with_ancestors = set(self.seen)
         logger.warning(
             "all updated symbols for symbol %s: %s",
             self.updated_sym,
             updated_symbols_with_ancestors,
         )
-        tracer().this_stmt_updated_symbols |= self.seen
+        tracer().this_stmt_updated_symbols.update(updated_symbols_with_ancestors)
         if refresh:
             for updated_sym in directly_updated_symbols:
                 if not updated_sym.is_waiting and updated_sym is not self.updated_sym:
                     updated_sym.refresh()
-        self.seen |= new_deps  # don't propagate to stuff on RHS
-        for sym in updated_symbols_with_ancestors:
-            self._propagate_waiting_to_deps(sym, skip_seen_check=True)
+        for dep in new_deps:
+            # don't propagate to stuff on RHS
+            self._mark_seen(dep)
+        self._propagate_waiting(
+            (self._propagate_waiting_to_deps, sym, True)
+            for sym in updated_symbols_with_ancestors
+        )
 
     def _maybe_get_duped_attrsub_updated_syms(self) -> Set["Symbol"]:
-        for modname, classname in DUPED_ATTRSUB_CLASSES:
-            module = sys.modules.get(modname, None)
-            if modname is None:
-                continue
-            clazz = getattr(module, classname, None)
-            if clazz is None:
-                continue
-
-            ns = self.updated_sym.containing_namespace
-            if ns is None or ns.obj is None or not isinstance(ns.obj, clazz):
-                continue
-
-            name = self.updated_sym.name
-            return cast(
-                Set["Symbol"],
-                {
-                    ns.lookup_symbol_by_name_this_indentation(name, is_subscript=is_sub)
-                    for is_sub in (True, False)
-                }
-                - {None},
-            )
-        return set()
+        ns = self.updated_sym.containing_namespace
+        if ns is None or ns.obj is None or not is_dataframe(ns.obj):
+            return set()
+        name = self.updated_sym.name
+        return cast(
+            Set["Symbol"],
+            {
+                ns.lookup_symbol_by_name_this_indentation(name, is_subscript=is_sub)
+                for is_sub in (True, False)
+            }
+            - {None},
+        )
 
     def _collect_updated_symbols_and_refresh_namespaces(
         self,
         updated_symbols: Iterable["Symbol"],
         refresh_descendent_namespaces: bool,
-    ) -> None:
+    ) -> List["Symbol"]:
         # TODO: can this method be unified with symbol.refresh() with bump_version=False?
         logger.warning(
             "collecting updated symbols and namespaces for %s", updated_symbols
         )
-        for sym in updated_symbols:
-            if sym.is_import or sym in self.seen:
+        collected: List["Symbol"] = []
+        stack: List[Iterator["Symbol"]] = [iter(updated_symbols)]
+        while len(stack) > 0:
+            sym = next(stack[-1], None)
+            if sym is None:
+                stack.pop()
+                continue
+            if sym.is_import or self._is_seen(sym):
                 continue
             # TODO: why was this present before?
             # sym.updated_timestamps.add(Timestamp.current())
             sym.required_timestamp = Timestamp.uninitialized()
-            self.seen.add(sym)
+            self._mark_seen(sym)
+            collected.append(sym)
             for cell in sym.cells_where_deep_live:
                 cell.add_used_cell_counter(sym, flow().cell_counter())
             containing_ns = None if sym.is_module else sym.containing_namespace
@@ -118,40 +162,63 @@ class UpdateProtocol:
                 )
                 containing_ns.namespace_waiting_symbols.discard(sym)
                 containing_ns.max_descendent_timestamp = Timestamp.current()
-                self._collect_updated_symbols_and_refresh_namespaces(
-                    flow().aliases.get(containing_ns.obj_id, set()),
-                    refresh_descendent_namespaces,
-                )
-            if refresh_descendent_namespaces:
-                sym_ns = sym.namespace
-                if sym_ns is not None:
-                    self._collect_updated_symbols_and_refresh_namespaces(
-                        sym_ns.all_symbols_this_indentation(),
-                        refresh_descendent_namespaces,
-                    )
+            # pushed in reverse so that containing aliases get visited first
+            sym_ns = sym.namespace if refresh_descendent_namespaces else None
+            if sym_ns is not None:
+                stack.append(iter(sym_ns.all_symbols_this_indentation()))
+            if containing_ns is not None:
+                stack.append(iter(flow().aliases.get(containing_ns.obj_id, set())))
+        return collected
+
+    def _propagate_waiting(self, work: Iterable[_PropagationStep]) -> None:
+        # Each step pushes its follow-up steps rather than calling them, in
+        # reverse so that they get visited in the same depth-first order as
+        # the equivalent recursive calls would. Already-stamped symbols get
+        # dropped before they ever make it onto the stack.
+        # nothing read below changes mid-propagation
+        flow_ = flow()
+        self._namespaces = flow_.namespaces
+        self._aliases = flow_.aliases
+        self._already_updated = (
+            flow_.updated_symbols,
+            tracer().this_stmt_updated_symbols,
+        )
+        self._updated_sym_timestamp = self.updated_sym.timestamp
+        self._required_timestamp = Timestamp.current()
+        stack = list(work)
+        stack.reverse()
+        generation = self.generation
+        while len(stack) > 0:
+            step, sym, skip_seen_check = stack.pop()
+            if not skip_seen_check and sym._update_generation == generation:
+                continue
+            sym._update_generation = generation
+            for next_step in reversed(step(sym)):
+                if next_step[2] or next_step[1]._update_generation != generation:
+                    stack.append(next_step)
 
     def _propagate_waiting_to_namespace_parents(
-        self, sym: "Symbol", skip_seen_check: bool = False
-    ) -> None:
-        if not skip_seen_check and sym in self.seen:
-            return
-        self.seen.add(sym)
+        self, sym: "Symbol"
+    ) -> List[_PropagationStep]:
         containing_ns = sym.containing_namespace
         if containing_ns is None or containing_ns.is_module:
-            return
+            return []
         logger.warning("add %s to namespace waiting symbols of %s", sym, containing_ns)
         containing_ns.namespace_waiting_symbols.add(sym)
-        for containing_alias in flow().aliases.get(containing_ns.obj_id, []):
-            self._propagate_waiting_to_namespace_parents(containing_alias)
-
-        for containing_alias in flow().aliases.get(containing_ns.obj_id, []):
-            # do this in 2 separate loops to make sure all containing_alias are added to 'seen'
+        containing_aliases = list(self._aliases.get(containing_ns.obj_id, []))
+        next_steps: List[_PropagationStep] = [
+            (self._propagate_waiting_to_namespace_parents, containing_alias, False)
+            for containing_alias in containing_aliases
+        ]
+        for containing_alias in containing_aliases:
+            # these come after the parents above to make sure all containing_alias are seen first;
             # works around the issue when one alias depends on another
             for child in self._non_class_to_instance_children(containing_alias):
                 logger.warning(
                     "propagate from namespace parent of %s to child %s", sym, child
                 )
-                self._propagate_waiting_to_deps(child)
+                next_steps.append((self._propagate_waiting_to_deps, child, False))
+        return next_steps
 
     def _non_class_to_instance_children(
         self, sym: "Symbol"
@@ -169,34 +236,36 @@ class UpdateProtocol:
             yield child
 
     def _propagate_waiting_to_namespace_children(
-        self, sym: "Symbol", skip_seen_check: bool = False
-    ) -> None:
-        if not skip_seen_check and sym in self.seen:
-            return
-        self.seen.add(sym)
-        self_ns = flow().namespaces.get(sym.obj_id)
+        self, sym: "Symbol"
+    ) -> List[_PropagationStep]:
+        self_ns = self._namespaces.get(sym.obj_id)
         if self_ns is None:
-            return
+            return []
+        next_steps: List[_PropagationStep] = []
         for ns_child in self_ns.all_symbols_this_indentation(exclude_class=True):
             logger.warning("propagate from %s to namespace child %s", sym, ns_child)
-            self._propagate_waiting_to_deps(ns_child)
+            next_steps.append((self._propagate_waiting_to_deps, ns_child, False))
+        return next_steps
 
-    def _propagate_waiting_to_deps(
-        self, sym: "Symbol", skip_seen_check: bool = False
-    ) -> None:
-        if not skip_seen_check and sym in self.seen:
-            return
-        self.seen.add(sym)
-        if (
-            sym not in flow().updated_symbols
-            and sym not in tracer().this_stmt_updated_symbols
-        ):
+    def _propagate_waiting_to_deps(self, sym: "Symbol") -> List[_PropagationStep]:
+        next_steps: List[_PropagationStep] = []
+        updated_symbols, this_stmt_updated_symbols = self._already_updated
+        if sym not in updated_symbols and sym not in this_stmt_updated_symbols:
             if sym.should_mark_waiting(self.updated_sym):
                 sym.fresher_ancestors.add(self.updated_sym)
-                sym.fresher_ancestor_timestamps.add(self.updated_sym.timestamp)
-                sym.required_timestamp = Timestamp.current()
-                self._propagate_waiting_to_namespace_parents(sym, skip_seen_check=True)
-                self._propagate_waiting_to_namespace_children(sym, skip_seen_check=True)
+                sym.fresher_ancestor_timestamps.add(self._updated_sym_timestamp)
+                sym.required_timestamp = self._required_timestamp
+                # only schedule the namespace steps that have something to do
+                containing_ns = sym.containing_namespace
+                if containing_ns is not None and not containing_ns.is_module:
+                    next_steps.append(
+                        (self._propagate_waiting_to_namespace_parents, sym, True)
+                    )
+                if sym.obj_id in self._namespaces:
+                    next_steps.append(
+                        (self._propagate_waiting_to_namespace_children, sym, True)
+                    )
         for child in self._non_class_to_instance_children(sym):
             logger.warning("propagate %s %s to %s", sym, sym.obj_id, child)
-            self._propagate_waiting_to_deps(child)
+            next_steps.append((self._propagate_waiting_to_deps, child, False))
+        return next_steps
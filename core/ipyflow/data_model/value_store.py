@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+An opt-in store of past symbol values, so that questions like "what did `df`
+look like as of cell 12" can be answered without re-running anything. Values
+get snapshotted at the end of the cell that updated them, using a strategy
+that depends on their type:
+
+- immutable values (and functions, classes, modules) are kept by reference;
+- numpy arrays get their buffer copied;
+- pandas objects get copied (shallowly when pandas copy-on-write is on);
+- anything else gets pickled if its symbol was explicitly tagged as versioned,
+  and is skipped otherwise (or if it can't be pickled).
+
+Snapshots across all symbols share a byte budget, and the least recently used
+ones get evicted once it is exceeded; values estimated to exceed the budget on
+their own are never snapshotted in the first place.
+"""
+import itertools
+import logging
+import pickle
+import sys
+from collections import OrderedDict, deque
+from types import FunctionType, ModuleType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.singletons import flow
+
+if TYPE_CHECKING:
+    from ipyflow.data_model.symbol import Symbol
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+VERSIONED_TAG = "versioned"
+
+_IMMUTABLE_TYPES = (
+    type(None),
+    bool,
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    range,
+    frozenset,
+)
+_BY_REFERENCE_TYPES = (FunctionType, ModuleType, type)
+
+# bounds on how much of a value gets walked when estimating its size
+_MAX_ESTIMATE_DEPTH = 3
+_MAX_ESTIMATE_ITEMS = 100
+
+_UNPICKLABLE_TYPES: Set[type] = set()
+
+
+class ValueSnapshot(NamedTuple):
+    payload: Any
+    num_bytes: int
+    materialize: Callable[[Any], Any]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _copy(value: Any) -> Any:
+    return value.copy()
+
+
+def _is_immutable(value: Any) -> bool:
+    if isinstance(value, tuple):
+        return all(_is_immutable(elt) for elt in value)
+    return isinstance(value, _IMMUTABLE_TYPES)
+
+
+def _is_plain_ndarray(value: Any) -> bool:
+    numpy = sys.modules.get("numpy", None)
+    return (
+        numpy is not None and isinstance(value, numpy.ndarray) and value.dtype != object
+    )
+
+
+def _is_pandas_object(value: Any) -> bool:
+    pandas = sys.modules.get("pandas", None)
+    return pandas is not None and isinstance(value, (pandas.DataFrame, pandas.Series))
+
+
+def estimate_num_bytes(value: Any, depth: int = 0) -> int:
+    """
+    Estimates the memory footprint of `value`, recursing into containers (and
+    object attributes) up to a bounded depth, and extrapolating from a bounded
+    sample of their elements.
+    """
+    if _is_plain_ndarray(value):
+        return int(value.nbytes)
+    if _is_pandas_object(value):
+        num_bytes = value.memory_usage(deep=False)
+        if isinstance(value, sys.modules["pandas"].DataFrame):
+            num_bytes = num_bytes.sum()
+        return int(num_bytes)
+    try:
+        num_bytes = sys.getsizeof(value)
+    except Exception:
+        num_bytes = 0
+    if depth >= _MAX_ESTIMATE_DEPTH or isinstance(value, _BY_REFERENCE_TYPES):
+        return num_bytes
+    if isinstance(value, dict):
+        sample = list(itertools.islice(value.items(), _MAX_ESTIMATE_ITEMS))
+        elts: Iterable[Any] = itertools.chain.from_iterable(sample)
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        sample = list(itertools.islice(value, _MAX_ESTIMATE_ITEMS))
+        elts = sample
+    elif isinstance(getattr(value, "__dict__", None), dict):
+        return num_bytes + estimate_num_bytes(value.__dict__, depth + 1)
+    else:
+        return num_bytes
+    if len(sample) == 0:
+        return num_bytes
+    sample_bytes = sum(estimate_num_bytes(elt, depth + 1) for elt in elts)
+    return num_bytes + sample_bytes * len(value) // len(sample)
+
+
+def make_value_snapshot(
+    value: Any, max_bytes: Optional[int] = None, allow_pickle: bool = True
+) -> Optional[ValueSnapshot]:
+    """
+    Snapshots `value` with the cheapest strategy that keeps later mutations of
+    it from leaking into the snapshot; returns None if it can't be snapshotted,
+    or if it is estimated to take up more than `max_bytes`.
+    """
+    if isinstance(value, _BY_REFERENCE_TYPES):
+        return ValueSnapshot(value, 0, _identity)
+    num_bytes = estimate_num_bytes(value)
+    if max_bytes is not None and num_bytes > max_bytes:
+        return None
+    if _is_immutable(value):
+        return ValueSnapshot(value, num_bytes, _identity)
+    if _is_plain_ndarray(value):
+        return ValueSnapshot(value.copy(), num_bytes, _copy)
+    if _is_pandas_object(value):
+        pandas = sys.modules["pandas"]
+        copy_on_write = getattr(pandas.options.mode, "copy_on_write", False) is True
+        return ValueSnapshot(value.copy(deep=not copy_on_write), num_bytes, _copy)
+    if not allow_pickle or type(value) in _UNPICKLABLE_TYPES:
+        return None
+    try:
+        pickled = pickle.dumps(value)
+    except Exception:
+        # don't bother trying again for other values of this type
+        _UNPICKLABLE_TYPES.add(type(value))
+        return None
+    if max_bytes is not None and len(pickled) > max_bytes:
+        return None
+    return ValueSnapshot(pickled, len(pickled), pickle.loads)
+
+
+class VersionedValueStore:
+    def __init__(self) -> None:
+        # includes tombstones: versions that were not (or are no longer) stored,
+        # so that lookups as of them fail rather than return an older version
+        self._versions_by_symbol: Dict["Symbol", List[Timestamp]] = {}
+        self._snapshots: "OrderedDict[Tuple[Symbol, Timestamp], ValueSnapshot]" = (
+            OrderedDict()
+        )
+        self.num_bytes = 0
+        self.num_evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    @staticmethod
+    def should_record(sym: "Symbol") -> bool:
+        if not sym.is_user_accessible:
+            return False
+        return flow().mut_settings.value_store_enabled or sym.has_tag(VERSIONED_TAG)
+
+    def record_symbols(self, syms: Iterable["Symbol"]) -> None:
+        for sym in syms:
+            if self.should_record(sym):
+                self.record(sym, sym.timestamp, sym.obj)
+
+    def record(self, sym: "Symbol", timestamp: Timestamp, value: Any) -> bool:
+        versions = self._versions_by_symbol.setdefault(sym, [])
+        if len(versions) > 0 and versions[-1] >= timestamp:
+            return False
+        # values without a cheap copying strategy only get pickled for symbols
+        # that were explicitly tagged, rather than after every cell
+        snapshot = make_value_snapshot(
+            value,
+            max_bytes=flow().mut_settings.value_store_byte_budget,
+            allow_pickle=sym.has_tag(VERSIONED_TAG),
+        )
+        versions.append(timestamp)
+        if snapshot is None:
+            logger.info("unable to snapshot value for %s", sym)
+            self._prune_leading_tombstones(sym)
+            return False
+        self._snapshots[sym, timestamp] = snapshot
+        self.num_bytes += snapshot.num_bytes
+        self._evict_over_budget()
+        return True
+
+    def _evict_over_budget(self) -> None:
+        budget = flow().mut_settings.value_store_byte_budget
+        while self.num_bytes > budget and len(self._snapshots) > 0:
+            (sym, _), snapshot = self._snapshots.popitem(last=False)
+            self.num_bytes -= snapshot.num_bytes
+            self._prune_leading_tombstones(sym)
+            self.num_evictions += 1
+
+    def _prune_leading_tombstones(self, sym: "Symbol") -> None:
+        # lookups as of these fail the same way with or without them
+        versions = self._versions_by_symbol[sym]
+        num_leading_tombstones = 0
+        for timestamp in versions:
+            if (sym, timestamp) in self._snapshots:
+                break
+            num_leading_tombstones += 1
+        del versions[:num_leading_tombstones]
+
+    def timestamps(self, sym: "Symbol") -> List[Timestamp]:
+        return [
+            timestamp
+            for timestamp in self._versions_by_symbol.get(sym, [])
+            if (sym, timestamp) in self._snapshots
+        ]
+
+    def value_at(self, sym: "Symbol", ts_or_cell_num: Union[int, Timestamp]) -> Any:
+        """
+        The value that `sym` had as of the given timestamp (or the end of the
+        cell with the given counter).
+        """
+        for timestamp in reversed(self._versions_by_symbol.get(sym, [])):
+            if isinstance(ts_or_cell_num, Timestamp):
+                if timestamp <= ts_or_cell_num:
+                    break
+            elif timestamp.cell_num <= ts_or_cell_num:
+                break
+        else:
+            raise KeyError(
+                "no value recorded for %s as of %s"
+                % (sym.readable_name, ts_or_cell_num)
+            )
+        key = (sym, timestamp)
+        if key not in self._snapshots:
+            raise KeyError(
+                "value of %s as of %s was not stored (unable to snapshot it or evicted)"
+                % (sym.readable_name, ts_or_cell_num)
+            )
+        self._snapshots.move_to_end(key)
+        snapshot = self._snapshots[key]
+        return snapshot.materialize(snapshot.payload)
+
+    def clear(self) -> None:
+        self._versions_by_symbol.clear()
+        self._snapshots.clear()
+        self.num_bytes = 0
@@ -25,7 +25,7 @@ from pyccolo.tracer import PYCCOLO_DEV_MODE_ENV_VAR
 
 from ipyflow import singletons
 from ipyflow.analysis.symbol_ref import SymbolRef
-from ipyflow.annotations.compiler import compile_handlers_for_already_imported_modules
+from ipyflow.checkpoint import CheckpointManager
 from ipyflow.comm_manager import CommManager
 from ipyflow.config import (
     ColorScheme,
@@ -44,14 +44,19 @@ from ipyflow.data_model.scope import Scope
 from ipyflow.data_model.statement import statements
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.data_model.value_store import VersionedValueStore
 from ipyflow.frontend import FrontendCheckerResult
 from ipyflow.line_magics import make_line_magic
+from ipyflow.metrics import MetricsRegistry
 from ipyflow.singletons import shell
 from ipyflow.slicing.context import (
     SlicingContext,
     slicing_ctx_var,
     static_slicing_context,
 )
+from ipyflow.tracing.external_calls.base_handlers import (
+    defer_handler_compilation_for_module,
+)
 from ipyflow.tracing.ipyflow_tracer import DataflowTracer
 from ipyflow.tracing.watchpoint import Watchpoint
 from ipyflow.types import IdType, SupportedIndexType
@@ -164,6 +169,86 @@ class NotebookFlow(singletons.NotebookFlow):
                 "max_external_call_depth_for_tracing",
                 getattr(config, "max_external_call_depth_for_tracing", 3),
             ),
+            function_demotion_enabled=kwargs.pop(
+                "function_demotion_enabled",
+                getattr(config, "function_demotion_enabled", False),
+            ),
+            function_demotion_min_calls=kwargs.pop(
+                "function_demotion_min_calls",
+                getattr(config, "function_demotion_min_calls", 20),
+            ),
+            function_demotion_min_overhead_seconds=kwargs.pop(
+                "function_demotion_min_overhead_seconds",
+                getattr(config, "function_demotion_min_overhead_seconds", 0.05),
+            ),
+            function_summaries_enabled=kwargs.pop(
+                "function_summaries_enabled",
+                getattr(config, "function_summaries_enabled", False),
+            ),
+            function_summaries_verify=kwargs.pop(
+                "function_summaries_verify",
+                getattr(config, "function_summaries_verify", False),
+            ),
+            sys_monitoring_enabled=kwargs.pop(
+                "sys_monitoring_enabled",
+                getattr(config, "sys_monitoring_enabled", True),
+            ),
+            opaque_comprehensions_enabled=kwargs.pop(
+                "opaque_comprehensions_enabled",
+                getattr(config, "opaque_comprehensions_enabled", True),
+            ),
+            thread_aware_tracing_enabled=kwargs.pop(
+                "thread_aware_tracing_enabled",
+                getattr(config, "thread_aware_tracing_enabled", True),
+            ),
+            background_static_analysis_enabled=kwargs.pop(
+                "background_static_analysis_enabled",
+                getattr(config, "background_static_analysis_enabled", False),
+            ),
+            kernel_batch_execution_enabled=kwargs.pop(
+                "kernel_batch_execution_enabled",
+                getattr(config, "kernel_batch_execution_enabled", False),
+            ),
+            reactive_cost_budget=kwargs.pop(
+                "reactive_cost_budget",
+                getattr(config, "reactive_cost_budget", 0.0),
+            ),
+            fork_checkpoints_enabled=kwargs.pop(
+                "fork_checkpoints_enabled",
+                getattr(config, "fork_checkpoints_enabled", False),
+            ),
+            fork_checkpoint_budget=kwargs.pop(
+                "fork_checkpoint_budget",
+                getattr(config, "fork_checkpoint_budget", 3),
+            ),
+            fork_checkpoint_min_cost=kwargs.pop(
+                "fork_checkpoint_min_cost",
+                getattr(config, "fork_checkpoint_min_cost", 5.0),
+            ),
+            value_store_enabled=kwargs.pop(
+                "value_store_enabled",
+                getattr(config, "value_store_enabled", False),
+            ),
+            value_store_byte_budget=kwargs.pop(
+                "value_store_byte_budget",
+                getattr(config, "value_store_byte_budget", 256 * 1024 * 1024),
+            ),
+            metrics_dump_path=kwargs.pop(
+                "metrics_dump_path",
+                getattr(config, "metrics_dump_path", None),
+            ),
+            metrics_dump_interval=kwargs.pop(
+                "metrics_dump_interval",
+                getattr(config, "metrics_dump_interval", 60.0),
+            ),
+            capture_output_limit=kwargs.pop(
+                "capture_output_limit",
+                getattr(config, "capture_output_limit", 512 * 1024),
+            ),
+            capture_output_spill_enabled=kwargs.pop(
+                "capture_output_spill_enabled",
+                getattr(config, "capture_output_spill_enabled", False),
+            ),
             is_dev_mode=kwargs.pop(
                 "is_dev_mode",
                 getattr(
@@ -214,6 +299,10 @@ class NotebookFlow(singletons.NotebookFlow):
         self.last_executed_cell_id: Optional[IdType] = None
         self.tracked_timestamps: Dict[str, Timestamp] = {}
         self.comm_manager: CommManager = CommManager(self)
+        self.checkpoints: CheckpointManager = CheckpointManager()
+        self.value_store: VersionedValueStore = VersionedValueStore()
+        self.metrics: MetricsRegistry = MetricsRegistry()
+        self._register_metric_gauges()
         self.fs: Namespace = None  # type: ignore[assignment]
         self.display_sym: Symbol = None  # type: ignore[assignment]
         self.fake_edge_sym: Symbol = None  # type: ignore[assignment]
@@ -222,7 +311,42 @@ class NotebookFlow(singletons.NotebookFlow):
         self._prev_order_idx_by_id: Optional[Dict[IdType, int]] = None
         self._min_new_ready_cell_counter = -1
         self._min_forced_reactive_cell_counter = -1
-        compile_handlers_for_already_imported_modules({"ipyflow"})
+        defer_handler_compilation_for_module(sys.modules["ipyflow"])
+
+    def _register_metric_gauges(self) -> None:
+        metrics = self.metrics
+        metrics.register_gauge(
+            "num_symbols", lambda: sum(len(syms) for syms in self.aliases.values())
+        )
+        metrics.register_gauge("num_namespaces", lambda: len(self.namespaces))
+        metrics.register_gauge(
+            "num_edges", lambda: sum(len(sym.children) for sym in self.all_symbols())
+        )
+        metrics.register_gauge("bookkeeping_bytes", self._estimate_bookkeeping_bytes)
+        metrics.register_gauge("value_store_bytes", lambda: self.value_store.num_bytes)
+        metrics.register_gauge(
+            "num_checkpoints", lambda: len(self.checkpoints.checkpoints)
+        )
+        metrics.register_gauge(
+            "comm_queue_latency", self.comm_manager.request_queue.latency_metrics
+        )
+
+    def _estimate_bookkeeping_bytes(self) -> int:
+        """
+        A shallow estimate of the memory held by the dataflow graph itself
+        (symbols, their edges, and namespaces), not counting user values.
+        """
+        total = sys.getsizeof(self.aliases) + sys.getsizeof(self.namespaces)
+        for sym in self.all_symbols():
+            total += (
+                sys.getsizeof(sym)
+                + sys.getsizeof(sym.__dict__)
+                + sys.getsizeof(sym.parents)
+                + sys.getsizeof(sym.children)
+            )
+        for ns in self.namespaces.values():
+            total += sys.getsizeof(ns) + sys.getsizeof(ns._symbol_by_name)
+        return total
 
     def register_comm_target(self, kernel: IPythonKernel) -> None:
         self.comm_manager.register_comm_target(kernel)
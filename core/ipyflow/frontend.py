@@ -15,8 +15,9 @@ from typing import (
     Union,
 )
 
-from ipyflow.config import ExecutionSchedule, FlowDirection
+from ipyflow.config import ExecutionMode, ExecutionSchedule, FlowDirection
 from ipyflow.data_model.cell import Cell, CheckerResult, cells
+from ipyflow.data_model.cell_graph import CellGraphIndex
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.singletons import flow
 from ipyflow.slicing.context import SlicingContext, slicing_ctx_var
@@ -26,6 +27,130 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
+def compute_reactive_closure(
+    start_cell_ids: Iterable[IdType],
+    cell_children: Dict[IdType, Iterable[IdType]],
+    cell_graph: Optional[CellGraphIndex] = None,
+) -> List[IdType]:
+    """
+    Computes everything reachable from the start cells along child edges
+    (the kernel-side counterpart of the frontend's transitive closure), and
+    returns it in an order that can be executed front to back.
+    """
+    if cell_graph is None:
+        cell_graph = CellGraphIndex.for_existing_cells(cell_children, cells().has_id)
+    closure = cell_graph.reachable(
+        cell_id for cell_id in start_cell_ids if cells().has_id(cell_id)
+    )
+    position_by_cell_id = {
+        cell_id: cells().from_id(cell_id).position for cell_id in closure
+    }
+    if flow().mut_settings.flow_order == FlowDirection.IN_ORDER:
+        return sorted(closure, key=position_by_cell_id.__getitem__)
+    # any-order notebooks can have children above their parents, so
+    # topologically sort the closure, breaking ties by position
+    return cell_graph.topological_order(closure, key=position_by_cell_id.__getitem__)
+
+
+def compute_reactive_cascade(
+    new_ready_cells: Iterable[IdType],
+    forced_reactive_cells: Iterable[IdType],
+    forced_cascading_reactive_cells: Iterable[IdType],
+    cell_children: Dict[IdType, Iterable[IdType]],
+    exec_mode: ExecutionMode,
+    skip_cell_ids: Iterable[IdType] = (),
+    cell_graph: Optional[CellGraphIndex] = None,
+) -> List[IdType]:
+    """
+    Computes the cells that batch reactivity mode would rerun next, mirroring
+    how the frontend picks them from a ``compute_exec_schedule`` response.
+    """
+    skip_cell_ids = set(skip_cell_ids)
+    cascading_cell_ids = compute_reactive_closure(
+        [
+            cell_id
+            for cell_id in forced_cascading_reactive_cells
+            if cell_id not in skip_cell_ids
+        ],
+        cell_children,
+        cell_graph=cell_graph,
+    )
+    if exec_mode == ExecutionMode.REACTIVE:
+        cascade = compute_reactive_closure(
+            [
+                cell_id
+                for cell_id in [
+                    *new_ready_cells,
+                    *forced_reactive_cells,
+                    *cascading_cell_ids,
+                ]
+                if cell_id not in skip_cell_ids
+            ],
+            cell_children,
+            cell_graph=cell_graph,
+        )
+    else:
+        cascade = compute_reactive_closure(
+            [*forced_reactive_cells, *cascading_cell_ids], {}
+        )
+    return [cell_id for cell_id in cascade if cell_id not in skip_cell_ids]
+
+
+_EXEC_SCHEDULE_META_KEYS = frozenset(
+    {"type", "success", "revision", "base_revision", "is_delta"}
+)
+
+
+def diff_exec_schedules(prev: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Computes the changes needed to turn one ``compute_exec_schedule`` response
+    into another. Top-level fields that changed get sent whole, except for
+    dict-valued fields (keyed by cell id), which only get their changed entries.
+    """
+    changed: Dict[str, Any] = {}
+    patched: Dict[str, Dict[str, Any]] = {}
+    for key, value in cur.items():
+        if key in _EXEC_SCHEDULE_META_KEYS:
+            continue
+        prev_value = prev.get(key)
+        if key in prev and prev_value == value:
+            continue
+        if isinstance(value, dict) and isinstance(prev_value, dict):
+            patched[key] = {
+                "changed": {
+                    sub_key: sub_value
+                    for sub_key, sub_value in value.items()
+                    if sub_key not in prev_value or prev_value[sub_key] != sub_value
+                },
+                "removed": [sub_key for sub_key in prev_value if sub_key not in value],
+            }
+        else:
+            changed[key] = value
+    removed = [
+        key for key in prev if key not in cur and key not in _EXEC_SCHEDULE_META_KEYS
+    ]
+    return {"changed": changed, "patched": patched, "removed": removed}
+
+
+def apply_exec_schedule_delta(
+    prev: Dict[str, Any], delta: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    The inverse of `diff_exec_schedules`; mirrors what the frontend does.
+    """
+    ret = dict(prev)
+    for key in delta["removed"]:
+        ret.pop(key, None)
+    ret.update(delta["changed"])
+    for key, patch in delta["patched"].items():
+        patched = dict(ret.get(key, {}))
+        for sub_key in patch["removed"]:
+            patched.pop(sub_key, None)
+        patched.update(patch["changed"])
+        ret[key] = patched
+    return ret
+
+
 def _make_range_from_node(node: ast.AST) -> Dict[str, Any]:
     return {
         "start": {
@@ -56,6 +181,9 @@ class FrontendCheckerResult(NamedTuple):
     stale_parents_by_executed_cell_by_child: Dict[IdType, Dict[IdType, Set[IdType]]]
     stale_parents_by_child_by_executed_cell: Dict[IdType, Dict[IdType, Set[IdType]]]
     phantom_cell_info: Dict[IdType, Dict[IdType, Set[int]]]
+    cascade_cost_by_cell: Dict[IdType, float]
+    memoized_skippable_cells: Set[IdType]
+    paused_cascade_cells: Set[IdType]
     allow_new_ready: bool
 
     @classmethod
@@ -77,6 +205,9 @@ class FrontendCheckerResult(NamedTuple):
             stale_parents_by_executed_cell_by_child={},
             stale_parents_by_child_by_executed_cell={},
             phantom_cell_info={},
+            cascade_cost_by_cell={},
+            memoized_skippable_cells=set(),
+            paused_cascade_cells=set(),
             allow_new_ready=allow_new_ready,
         )
 
@@ -132,27 +263,61 @@ class FrontendCheckerResult(NamedTuple):
                 }
                 for executed_cell_id, stale_parents in self.stale_parents_by_child_by_executed_cell.items()
             },
+            "cascade_cost_by_cell": dict(self.cascade_cost_by_cell),
+            "cascade_cost": self.cascade_cost,
+            "memoized_skippable_cells": list(self.memoized_skippable_cells),
+            "paused_cascade_cells": list(self.paused_cascade_cells),
+            "cascade_paused": len(self.paused_cascade_cells) > 0,
         }
 
+    @property
+    def cascade_cost(self) -> float:
+        return sum(self.cascade_cost_by_cell.values())
+
+    def reactive_closure(self, start_cell_ids: Iterable[IdType]) -> List[IdType]:
+        return compute_reactive_closure(start_cell_ids, self.cell_children)
+
+    def _compute_cascade_cost(self, cell_graph: CellGraphIndex) -> None:
+        mut_settings = flow().mut_settings
+        cascade = compute_reactive_cascade(
+            self.new_ready_cells if self.allow_new_ready else (),
+            self.forced_reactive_cells,
+            self.forced_cascading_reactive_cells,
+            self.cell_children,
+            mut_settings.exec_mode,
+            cell_graph=cell_graph,
+        )
+        for cell_id in cascade:
+            cell = cells().from_id(cell_id)
+            if cell.has_unchanged_memoized_inputs:
+                # rerunning would just reuse the memoized result
+                self.memoized_skippable_cells.add(cell_id)
+                continue
+            last_cost = cell.last_execution_cost
+            self.cascade_cost_by_cell[cell_id] = (
+                0.0 if last_cost is None else last_cost.wall_time
+            )
+        budget = mut_settings.reactive_cost_budget
+        if 0 < budget < self.cascade_cost:
+            self.paused_cascade_cells.update(self.cascade_cost_by_cell.keys())
+
     def _compute_waiter_and_ready_maker_links(self) -> None:
-        waiter_link_changes = True
-        # transitive closure up until we hit non-waiting ready-making cells
-        while waiter_link_changes:
-            waiter_link_changes = False
-            for waiting_cell_id in self.waiting_cells:
-                new_waiter_links = set(self.waiter_links[waiting_cell_id])
-                original_length = len(new_waiter_links)
-                for ready_making_cell_id in self.waiter_links[waiting_cell_id]:
-                    if ready_making_cell_id not in self.waiting_cells:
-                        continue
-                    new_waiter_links |= self.waiter_links[ready_making_cell_id]
-                new_waiter_links.discard(waiting_cell_id)
-                waiter_link_changes = waiter_link_changes or original_length != len(
-                    new_waiter_links
-                )
-                self.waiter_links[waiting_cell_id] = new_waiter_links
+        # transitive closure up until we hit non-waiting ready-making cells:
+        # only waiting cells get outgoing edges, so that is where paths stop
+        waiter_graph = CellGraphIndex(
+            {
+                waiting_cell_id: self.waiter_links[waiting_cell_id]
+                for waiting_cell_id in self.waiting_cells
+            }
+        )
+        non_waiting_mask = ~waiter_graph.to_mask(self.waiting_cells)
         for waiting_cell_id in self.waiting_cells:
-            self.waiter_links[waiting_cell_id] -= self.waiting_cells
+            reachable_mask = waiter_graph.reachable_mask(
+                waiter_graph.to_mask([waiting_cell_id]), inclusive=False
+            )
+            self.waiter_links[waiting_cell_id] = set(
+                waiter_graph.to_ids(reachable_mask & non_waiting_mask)
+            )
             for ready_making_cell_id in self.waiter_links[waiting_cell_id]:
                 self.ready_maker_links[ready_making_cell_id].add(waiting_cell_id)
 
@@ -232,20 +397,20 @@ class FrontendCheckerResult(NamedTuple):
             ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED,
         ):
             return
-        prev_waiting_cells: Set[IdType] = set()
-        while True:
-            for cell in cells_to_check:
-                if cell.cell_id in self.waiting_cells:
-                    continue
-                for _ in flow_.mut_settings.iter_slicing_contexts():
-                    if cell.directional_parents.keys() & (
-                        self.ready_cells | self.waiting_cells
-                    ):
-                        self.waiting_cells.add(cell.cell_id)
-                        continue
-            if prev_waiting_cells == self.waiting_cells:
-                break
-            prev_waiting_cells = set(self.waiting_cells)
+        parent_ids_by_cell_id: Dict[IdType, Set[IdType]] = {}
+        for cell in cells_to_check:
+            parent_ids = parent_ids_by_cell_id.setdefault(cell.cell_id, set())
+            for _ in flow_.mut_settings.iter_slicing_contexts():
+                parent_ids.update(cell.directional_parents.keys())
+        children_by_parent_id: Dict[IdType, Set[IdType]] = {}
+        for cell_id, parent_ids in parent_ids_by_cell_id.items():
+            for parent_id in parent_ids:
+                children_by_parent_id.setdefault(parent_id, set()).add(cell_id)
+        # anything downstream of a ready or waiting cell has to wait
+        dag_graph = CellGraphIndex(children_by_parent_id)
+        self.waiting_cells.update(
+            dag_graph.reachable(self.ready_cells | self.waiting_cells, inclusive=False)
+        )
         self.ready_cells.difference_update(self.waiting_cells)
         self.new_ready_cells.difference_update(self.waiting_cells)
         for cell_id in self.waiting_cells:
@@ -632,4 +797,8 @@ class FrontendCheckerResult(NamedTuple):
         if flow_.mut_settings.lint_out_of_order_usages:
             self._compute_unsafe_order_usages(cells_to_check)
         self._compute_filtered_parents(cells_to_check)
+        cell_graph = CellGraphIndex.for_existing_cells(
+            self.cell_children, cells().has_id
+        )
+        self._compute_cascade_cost(cell_graph)
         return self
@@ -14,10 +14,7 @@ from IPython.core.magic import register_line_magic
 from IPython.core.magic_arguments import argument, magic_arguments, parse_argstring
 
 from ipyflow.analysis.symbol_ref import SymbolRef
-from ipyflow.annotations.compiler import (
-    register_annotations_directory,
-    register_annotations_file,
-)
+from ipyflow.checkpoint import fork_checkpoints_supported
 from ipyflow.config import (
     ExecutionMode,
     ExecutionSchedule,
@@ -27,9 +24,11 @@ from ipyflow.config import (
 )
 from ipyflow.data_model.cell import cells
 from ipyflow.data_model.symbol import Symbol
-from ipyflow.experimental.dag import create_dag_metadata
-from ipyflow.singletons import flow, shell
+from ipyflow.metrics import format_metrics
+from ipyflow.singletons import flow, shell, tracer
 from ipyflow.slicing.mixin import SliceableMixin, format_slice
+from ipyflow.slicing.replay import ReplayError, make_replay_script, replay_symbols
+from ipyflow.tracing.output_recorder import OutputRecorder
 from ipyflow.tracing.symbol_resolver import resolve_rval_symbols
 
 if TYPE_CHECKING:
@@ -65,6 +64,42 @@ show_tags:
     
 register_annotations <directory_or_file>:
     - This will register the annotations in the given directory or file.
+
+function_demotion [show|enable|disable|reset]:
+    - This will show (or toggle / reset) which notebook functions have been
+      demoted to untraced execution because of their tracing overhead.
+
+function_summaries [enable|disable|verify|noverify]:
+    - This will toggle whether calls whose global reads are unchanged since
+      earlier traced calls apply a cached dataflow summary instead of being
+      traced (optionally tracing anyway to verify the cached summaries).
+
+replay [--script] <symbol> [<symbol> ...]:
+    - This will recompute the given symbols in a fresh interpreter from just
+      their slices (independent slices run in parallel processes) and print the
+      recovered values; with --script, it prints the replay script instead.
+
+checkpoint [show|enable|disable|take|clear|restore <cell_num>|budget <n>|min_cost <seconds>]:
+    - This will show (or toggle / manage) fork-based namespace checkpoints, which
+      get taken at cell boundaries once enough execution time has accumulated,
+      and which allow restoring the namespace to how it was before <cell_num>.
+      Unpicklable values keep their current values when restoring.
+
+stats [show|json|reset|dump <path> [<interval_seconds>]|nodump]:
+    - This will show kernel-wide metrics (symbol / edge counts, bookkeeping
+      size, per-cell overhead timings, comm message sizes), optionally as JSON,
+      or periodically append them as JSON lines to the file at <path>.
+
+capture_limit [show|off|<kb>] [spill|nospill] [--cell]:
+    - This will show (or set) how many KB of stdout, stderr, and rich output get
+      kept in memory at each of the start and end of a cell's captured output;
+      with spill, the full stdout / stderr additionally get written to temporary
+      files, from which e.g. ipyflow.api.stdout() still reads them back. With
+      --cell, this only applies to the currently executing cell.
+
+cost_budget [show|off|<seconds>]:
+    - This will show (or set) the estimated runtime above which reactive
+      cascades get paused until confirmed. Off by default.
 """.strip()
 
 
@@ -95,6 +130,8 @@ def make_line_magic(flow_: "NotebookFlow"):
         elif cmd in ("hls", "nohls", "highlight", "highlights"):
             return set_highlights(cmd, line)
         elif cmd in ("dag", "make_dag", "cell_dag", "make_cell_dag"):
+            from ipyflow.experimental.dag import create_dag_metadata
+
             return json.dumps(create_dag_metadata(), indent=2)
         elif cmd in ("slice", "make_slice", "gather_slice"):
             return make_slice(line)
@@ -141,6 +178,20 @@ def make_line_magic(flow_: "NotebookFlow"):
             return None
         elif cmd.startswith("register_annotation"):
             return register_annotations(line)
+        elif cmd in ("function_demotion", "demoted", "show_demoted"):
+            return function_demotion(line)
+        elif cmd == "function_summaries":
+            return function_summaries(line)
+        elif cmd == "cost_budget":
+            return cost_budget(line)
+        elif cmd == "capture_limit":
+            return capture_limit(line)
+        elif cmd == "replay":
+            return replay(line)
+        elif cmd in ("checkpoint", "checkpoints"):
+            return checkpoint(line)
+        elif cmd == "stats":
+            return stats(line)
         elif cmd == "toggle_reactivity":
             flow_.toggle_reactivity()
             return None
@@ -493,10 +544,10 @@ def _resolve_tracer_class(name: str) -> Optional[Type[pyc.BaseTracer]]:
 
 def _deregister_tracers(tracers, shell_: Optional["IPyflowInteractiveShell"] = None):
     (shell_ or shell()).tracer_cleanup_pending = True
-    for tracer in tracers:
-        tracer.clear_instance()
+    for tracer_cls in tracers:
+        tracer_cls.clear_instance()
         try:
-            (shell_ or shell()).registered_tracers.remove(tracer)
+            (shell_ or shell()).registered_tracers.remove(tracer_cls)
         except ValueError:
             pass
 
@@ -543,6 +594,11 @@ def deregister_tracer(line_: str) -> None:
 
 
 def register_annotations(line_: str) -> None:
+    from ipyflow.annotations.compiler import (
+        register_annotations_directory,
+        register_annotations_file,
+    )
+
     line_ = line_.strip()
     usage = "Usage: %flow register_annotations <directory_or_file>"
     if os.path.isdir(line_):
@@ -553,3 +609,203 @@ def register_annotations(line_: str) -> None:
         warn(usage)
         return
     print_("Registered annotations for modules:", modules)
+
+
+def function_demotion(line_: str) -> Optional[str]:
+    usage = "Usage: %flow function_demotion [show|enable|disable|reset]"
+    line = line_.split()
+    setting = "show" if len(line) == 0 else line[0].lower()
+    profiler = tracer().function_profiler
+    if setting == "show":
+        return profiler.describe()
+    elif setting == "on" or setting.startswith("enable"):
+        flow().mut_settings.function_demotion_enabled = True
+    elif setting == "off" or setting.startswith("disable"):
+        flow().mut_settings.function_demotion_enabled = False
+    elif setting == "reset":
+        profiler.profile_by_code.clear()
+    else:
+        warn(usage)
+    return None
+
+
+def function_summaries(line_: str) -> None:
+    usage = "Usage: %flow function_summaries [enable|disable|verify|noverify]"
+    line = line_.split()
+    if len(line) != 1:
+        warn(usage)
+        return
+    setting = line[0].lower()
+    mut_settings = flow().mut_settings
+    if setting == "on" or setting.startswith("enable"):
+        mut_settings.function_summaries_enabled = True
+    elif setting == "off" or setting.startswith("disable"):
+        mut_settings.function_summaries_enabled = False
+    elif setting == "verify":
+        mut_settings.function_summaries_verify = True
+    elif setting == "noverify":
+        mut_settings.function_summaries_verify = False
+    else:
+        warn(usage)
+
+
+def cost_budget(line_: str) -> Optional[str]:
+    usage = "Usage: %flow cost_budget [show|off|<seconds>]"
+    line = line_.split()
+    setting = "show" if len(line) == 0 else line[0].lower()
+    mut_settings = flow().mut_settings
+    if setting == "show":
+        budget = mut_settings.reactive_cost_budget
+        return "no cost budget" if budget <= 0 else f"cost budget: {budget:g}s"
+    elif setting == "off" or setting.startswith("disable"):
+        mut_settings.reactive_cost_budget = 0.0
+        return None
+    try:
+        mut_settings.reactive_cost_budget = float(setting)
+    except ValueError:
+        warn(usage)
+    return None
+
+
+def capture_limit(line_: str) -> Optional[str]:
+    usage = "Usage: %flow capture_limit [show|off|<kb>] [spill|nospill] [--cell]"
+    line = line_.split()
+    this_cell_only = "--cell" in line
+    line = [token.lower() for token in line if token != "--cell"]
+    mut_settings = flow().mut_settings
+    capture_output_tee = OutputRecorder.capture_output_tee
+    limit = mut_settings.capture_output_limit
+    spill = mut_settings.capture_output_spill_enabled
+    if this_cell_only and capture_output_tee.stdout_buffer is not None:
+        limit = capture_output_tee.stdout_buffer.limit
+        spill = capture_output_tee.stdout_buffer.spill
+    if len(line) == 0 or line == ["show"]:
+        if limit <= 0:
+            return "no capture limit"
+        return "capture limit: %gKB at each end%s" % (
+            limit / 1024,
+            " (spilling to disk)" if spill else "",
+        )
+    for setting in line:
+        if setting == "off" or setting.startswith("disable"):
+            limit = 0
+        elif setting in ("spill", "nospill"):
+            spill = setting == "spill"
+        else:
+            try:
+                limit = int(float(setting) * 1024)
+            except ValueError:
+                warn(usage)
+                return None
+    if this_cell_only:
+        capture_output_tee.set_limits(limit, spill)
+    else:
+        mut_settings.capture_output_limit = limit
+        mut_settings.capture_output_spill_enabled = spill
+    return None
+
+
+def replay(line_: str) -> Optional[str]:
+    usage = "Usage: %flow replay [--script] <symbol> [<symbol> ...]"
+    line = line_.split()
+    show_script = "--script" in line
+    symbol_strs = [token for token in line if token != "--script"]
+    if len(symbol_strs) == 0:
+        warn(usage)
+        return None
+    syms = []
+    for symbol_str in symbol_strs:
+        sym = _resolve_symbol(symbol_str, usage)
+        if sym is None:
+            return None
+        syms.append(sym)
+    try:
+        if show_script:
+            return make_replay_script(syms, "replay.pkl")
+        values = replay_symbols(syms)
+    except (ReplayError, ValueError) as e:
+        warn(str(e))
+        return None
+    return "\n".join(f"{name} = {value!r}" for name, value in values.items())
+
+
+def checkpoint(line_: str) -> Optional[str]:
+    usage = "Usage: %flow checkpoint [show|enable|disable|take|clear|restore <cell_num>|budget <n>|min_cost <seconds>]"
+    line = line_.split()
+    setting = "show" if len(line) == 0 else line[0].lower()
+    flow_ = flow()
+    mut_settings = flow_.mut_settings
+    manager = flow_.checkpoints
+    if setting == "show":
+        if len(manager.checkpoints) == 0:
+            return "no checkpoints"
+        return "checkpoints before cells: %s" % ", ".join(
+            str(ckpt.cell_ctr) for ckpt in manager.checkpoints
+        )
+    elif setting == "on" or setting.startswith("enable"):
+        if not fork_checkpoints_supported():
+            warn("fork-based checkpoints are only supported on Linux")
+            return None
+        mut_settings.fork_checkpoints_enabled = True
+    elif setting == "off" or setting.startswith("disable"):
+        mut_settings.fork_checkpoints_enabled = False
+    elif setting == "take":
+        ckpt = manager.take(cells().exec_counter())
+        if ckpt is None:
+            warn("unable to take checkpoint")
+            return None
+        return f"took checkpoint before cell {ckpt.cell_ctr}"
+    elif setting == "clear":
+        manager.clear()
+    elif setting == "restore" and len(line) == 2 and line[1].isdigit():
+        result = manager.restore(int(line[1]))
+        if result is None:
+            warn(f"no checkpoint at or before cell {line[1]}")
+            return None
+        if len(result.unrestorable) > 0:
+            warn(
+                "unable to restore (so these keep their values from after the "
+                f"checkpoint): {', '.join(result.unrestorable)}"
+            )
+        return f"restored namespace to before cell {result.cell_ctr}"
+    elif setting in ("budget", "min_cost") and len(line) == 2:
+        try:
+            if setting == "budget":
+                mut_settings.fork_checkpoint_budget = int(line[1])
+            else:
+                mut_settings.fork_checkpoint_min_cost = float(line[1])
+        except ValueError:
+            warn(usage)
+    else:
+        warn(usage)
+    return None
+
+
+def stats(line_: str) -> Optional[str]:
+    usage = (
+        "Usage: %flow stats [show|json|reset|dump <path> [<interval_seconds>]|nodump]"
+    )
+    line = line_.split()
+    setting = "show" if len(line) == 0 else line[0].lower()
+    flow_ = flow()
+    mut_settings = flow_.mut_settings
+    if setting == "show":
+        return format_metrics(flow_.metrics.snapshot())
+    elif setting == "json":
+        return json.dumps(flow_.metrics.snapshot(), indent=2, default=str)
+    elif setting == "reset":
+        flow_.metrics.reset()
+    elif setting == "dump" and len(line) in (2, 3):
+        if len(line) == 3:
+            try:
+                mut_settings.metrics_dump_interval = float(line[2])
+            except ValueError:
+                warn(usage)
+                return None
+        mut_settings.metrics_dump_path = line[1]
+        flow_.metrics.dump(line[1])
+    elif setting == "nodump":
+        mut_settings.metrics_dump_path = None
+    else:
+        warn(usage)
+    return None
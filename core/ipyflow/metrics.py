@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+A lightweight registry of counters and histograms for keeping tabs on how
+ipyflow behaves under load. Recording a sample is a couple of additions and a
+bisect, so the registry is always on; anything expensive to compute (e.g.
+counting symbols or edges) is registered as a gauge and only gets evaluated
+when a snapshot is requested.
+"""
+import json
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+    def to_json(self) -> int:
+        return self.value
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        # the last bucket is for samples above the largest bound
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return 0.0 if self.count == 0 else self.total / self.count
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "max": self.max,
+            "buckets": {
+                **{
+                    str(bound): count
+                    for bound, count in zip(self.buckets, self.bucket_counts)
+                },
+                "inf": self.bucket_counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._last_dump_time = time.monotonic()
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = Counter()
+        return counter
+
+    def histogram(
+        self, name: str, buckets: Sequence[float] = DURATION_BUCKETS
+    ) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(buckets)
+        return histogram
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        self.counter(name).inc(amount)
+
+    def observe(
+        self, name: str, value: float, buckets: Sequence[float] = DURATION_BUCKETS
+    ) -> None:
+        self.histogram(name, buckets).observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def register_gauge(self, name: str, compute: Callable[[], Any]) -> None:
+        self._gauges[name] = compute
+
+    def _compute_gauges(self) -> Dict[str, Any]:
+        gauges: Dict[str, Any] = {}
+        for name, compute in self._gauges.items():
+            try:
+                gauges[name] = compute()
+            except Exception:
+                logger.exception("unable to compute gauge %s", name)
+                gauges[name] = None
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "timestamp": time.time(),
+            "counters": {name: c.to_json() for name, c in self.counters.items()},
+            "histograms": {name: h.to_json() for name, h in self.histograms.items()},
+            "gauges": self._compute_gauges(),
+        }
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def dump(self, path: str) -> None:
+        with open(path, "a") as f:
+            f.write(json.dumps(self.snapshot(), default=str))
+            f.write("\n")
+
+    def maybe_dump(self, path: Optional[str], interval: float) -> bool:
+        """
+        Appends a snapshot to the JSON-lines file at `path` if at least
+        `interval` seconds have passed since the last one.
+        """
+        if path is None:
+            return False
+        now = time.monotonic()
+        if now - self._last_dump_time < interval:
+            return False
+        self._last_dump_time = now
+        try:
+            self.dump(path)
+        except OSError:
+            logger.exception("unable to dump metrics to %s", path)
+            return False
+        return True
+
+
+def format_metrics(snapshot: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for name, value in sorted(snapshot["gauges"].items()):
+        lines.append(f"{name}: {value}")
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"{name}: {value}")
+    for name, hist in sorted(snapshot["histograms"].items()):
+        lines.append(
+            "%s: count=%d mean=%.4g max=%.4g total=%.4g"
+            % (name, hist["count"], hist["mean"], hist["max"], hist["total"])
+        )
+    return "\n".join(lines)
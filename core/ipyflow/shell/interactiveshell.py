@@ -3,6 +3,7 @@ import inspect
 import logging
 import os
 import sys
+import time
 from contextlib import contextmanager, suppress
 from types import FrameType
 from typing import Callable, Generator, List, Optional, Tuple, Type, Union
@@ -30,6 +31,10 @@ from ipyflow.tracing.flow_ast_rewriter import DataflowAstRewriter
 from ipyflow.tracing.interrupt_tracer import InterruptTracer
 from ipyflow.tracing.ipyflow_tracer import DataflowTracer, StackFrameManager
 from ipyflow.tracing.output_recorder import OutputRecorder
+from ipyflow.tracing.sys_monitoring import (
+    SYS_MONITORING_AVAILABLE,
+    SysMonitoringBackend,
+)
 from ipyflow.utils.ipython_utils import (
     ast_transformer_context,
     input_transformer_context,
@@ -65,10 +70,14 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
         self.syntax_transforms_enabled: bool = True
         self.syntax_transforms_only: bool = False
         self._saved_meta_path_entries: List[TraceFinder] = []
+        # set while a batch of cells runs back to back so that tracing
+        # state doesn't get torn down and rebuilt in between them
+        self.keep_tracing_warm = False
         self._has_cell_id: bool = (
             "cell_id" in inspect.signature(super()._run_cell).parameters
         )
         self._should_capture_output = False
+        self.sys_monitoring_backend = SysMonitoringBackend()
         for qualified_tracer_cls_name in reversed(
             getattr(self.config.ipyflow, "extra_pyccolo_tracers", [])
         ):
@@ -241,6 +250,13 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
         while self._saved_meta_path_entries:
             sys.meta_path.insert(0, self._saved_meta_path_entries.pop())
 
+    def stash_meta_path_entries(self) -> None:
+        # remove pyccolo meta path entries when not executing as they seem to
+        # mess up completions
+        while len(sys.meta_path) > 0 and isinstance(sys.meta_path[0], TraceFinder):
+            self._saved_meta_path_entries.append(sys.meta_path[0])
+            sys.meta_path.pop(0)
+
     @contextmanager
     def _tracing_context(self, syntax_transforms_enabled: bool):
         self.before_enter_tracing_context()
@@ -275,9 +291,23 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
                 tracer.reset()
             if DataflowTracer.instance() in all_tracers:
                 DataflowTracer.instance().init_symtab()
-            with pyc.multi_context(
-                [self._patch_tracer_filters(tracer) for tracer in all_tracers]
+            tracing_patches = [
+                self._patch_tracer_filters(tracer) for tracer in all_tracers
+            ]
+            if (
+                SYS_MONITORING_AVAILABLE
+                and singletons.flow().mut_settings.sys_monitoring_enabled
             ):
+                tracing_patches.append(
+                    self.sys_monitoring_backend.dispatching_to(
+                        [
+                            tracer
+                            for tracer in all_tracers
+                            if isinstance(tracer, StackFrameManager)
+                        ]
+                    )
+                )
+            with pyc.multi_context(tracing_patches):
                 if len(self.tracer_cleanup_callbacks) == 0:
                     for idx, tracer in enumerate(all_tracers):
                         self.tracer_cleanup_callbacks.append(
@@ -313,13 +343,8 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
                 else:
                     for tracer in reversed(all_tracers):
                         tracer._disable_tracing(check_enabled=False)
-                    # remove pyccolo meta path entries when not executing as they seem to
-                    # mess up completions
-                    while len(sys.meta_path) > 0 and isinstance(
-                        sys.meta_path[0], TraceFinder
-                    ):
-                        self._saved_meta_path_entries.append(sys.meta_path[0])
-                        sys.meta_path.pop(0)
+                    if not self.keep_tracing_warm:
+                        self.stash_meta_path_entries()
         except Exception:
             logger.exception("encountered an exception")
             raise
@@ -429,6 +454,8 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
                     kwargs["transformed_cell"] = transformed_cell
                 # discard any previous transformations that were done
                 cell = Cell.current_cell()
+                start_wall_time = time.perf_counter()
+                start_cpu_time = time.process_time()
                 ret = await super().run_cell_async(
                     cell.raw_cell if has_transformed_cell else transformed_cell,
                     store_history=store_history,
@@ -436,6 +463,8 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
                     shell_futures=shell_futures,
                     **kwargs,
                 )  # pragma: no cover
+                wall_time = time.perf_counter() - start_wall_time
+                cpu_time = time.process_time() - start_cpu_time
                 cell.error_in_exec = ret.error_in_exec
                 if is_already_recording_output:
                     outvar = (
@@ -445,12 +474,20 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
                     singletons.flow().global_scope.upsert_symbol_for_name(
                         outvar, get_ipython().user_ns.get(outvar)
                     )
+            metrics = singletons.flow().metrics
+            metrics.inc("cells_executed")
             # Stage 3:  Run post-execute hook
             if should_trace:
-                self.after_run_cell(raw_cell)
+                metrics.observe("traced_execution_seconds", wall_time)
+                with metrics.timer("after_run_cell_seconds"):
+                    self.after_run_cell(raw_cell)
+                metrics.maybe_dump(
+                    settings.metrics_dump_path, settings.metrics_dump_interval
+                )
             elif cell.prev_cell is not None:
                 cell.raw_static_parents = cell.prev_cell.raw_static_parents
                 cell.raw_dynamic_parents = cell.prev_cell.raw_dynamic_parents
+            cell.record_execution_cost(wall_time, cpu_time)
         except Exception as e:
             if settings.is_dev_mode:
                 logger.exception("exception occurred")
@@ -490,7 +527,12 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             with singletons.tracer().dataflow_tracing_disabled_patch(
                 InteractiveShell, "run_cell_magic"
             ):
-                yield
+                if singletons.flow().mut_settings.thread_aware_tracing_enabled:
+                    worker_thread_effects = singletons.tracer().worker_thread_effects
+                    with worker_thread_effects.patching_tracer_loop():
+                        yield
+                else:
+                    yield
 
     def _get_content_for_memoized_run(self, cell: Cell) -> Optional[str]:
         prev_cell = cell.prev_cell
@@ -560,6 +602,12 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
         if flow_._saved_debug_message is not None:  # pragma: no cover
             logger.error(flow_._saved_debug_message)
             flow_._saved_debug_message = None
+        # edits analyzed in the background get joined before the graph changes again
+        flow_.comm_manager.join_static_analyses(wait=True)
+        # executions that the batch executor didn't start preempt its cascade
+        batch_executor = flow_.comm_manager.batch_executor
+        if batch_executor.is_active and not batch_executor.is_running_cell:
+            batch_executor.cancel()
 
         if cell_id is not None:
             flow_.active_cell_id = cell_id
@@ -590,6 +638,9 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
         if not flow_.mut_settings.dataflow_enabled:
             return None
 
+        # the namespace is still as of the end of the previous cell at this point
+        flow_.checkpoints.maybe_take(cell.cell_ctr)
+
         memoized_run_content = self._get_content_for_memoized_run(cell)
         if memoized_run_content is not None:
             return memoized_run_content
@@ -597,7 +648,8 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
         # Stage 1: Precheck.
         if DataflowTracer in self.registered_tracers:
             try:
-                flow_._safety_precheck_cell(cell)
+                with flow_.metrics.timer("precheck_seconds"):
+                    flow_._safety_precheck_cell(cell)
             except Exception:
                 logger.exception("exception occurred during precheck")
 
@@ -656,19 +708,12 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             and prev_cell.captured_output is not None
         ):
             prev_cell.captured_output.show()
-        if prev_cell is not None:
-            captured = prev_cell.captured_output
-            if captured is not None and (
-                sum(
-                    sum(len(datum) for datum in output.data.values())
-                    for output in captured.outputs
-                )
-                + len(captured.stdout)
-                + len(captured.stderr)
-                > _CAPTURE_OUTPUT_SAVE_LIMIT
-            ):
-                # don't save potentially large outputs for previous versions
-                prev_cell.captured_output = None
+        if (
+            prev_cell is not None
+            and prev_cell.captured_output_size > _CAPTURE_OUTPUT_SAVE_LIMIT
+        ):
+            # don't save potentially large outputs for previous versions
+            prev_cell.captured_output = None
         if cell.captured_output is None:
             cell.captured_output = self.tee_output_tracer.capture_output
 
@@ -692,12 +737,15 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             sym._is_dangling_on_edges = False
         flow_._resync_symbols(this_cell_symbols)
         self._handle_memoization()
+        flow_.value_store.record_symbols(this_cell_symbols)
         flow_._remove_dangling_parent_edges(this_cell_dangling_symbols)
-        flow_.gc()
+        with flow_.metrics.timer("gc_seconds"):
+            flow_.gc()
         # run the checker again to record edges for any implicit symbols introduced during execution of the cell
-        flow_._safety_precheck_cell(
-            Cell.current_cell(), clear_updated_reactive_symbols=False
-        )
+        with flow_.metrics.timer("post_execution_precheck_seconds"):
+            flow_._safety_precheck_cell(
+                Cell.current_cell(), clear_updated_reactive_symbols=False
+            )
 
     def on_exception(self, e: Union[None, str, Exception]) -> None:
         singletons.flow().get_and_set_exception_raised_during_execution(e)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import ast
 import builtins
+import functools
 import logging
 import sys
 import textwrap
@@ -13,37 +14,35 @@ from typing import (
     Optional,
     Sequence,
     Set,
+    Tuple,
     Type,
     TypeVar,
     Union,
 )
 
-import black
 import pyccolo as pyc
 
 from ipyflow.analysis.live_refs import compute_live_dead_symbol_refs
 from ipyflow.config import Interface
+from ipyflow.data_model.cell_graph import iter_bits
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.models import cells
 from ipyflow.singletons import flow, shell, tracer
 from ipyflow.slicing.context import SlicingContext, slicing_ctx_var
 from ipyflow.types import IdType, TimestampOrCounter
 
-try:
-    from ipywidgets import HTML
-except Exception:
-    HTML = str
-
 if sys.version_info >= (3, 8):
     from typing import Protocol
 else:
     Protocol = object
 
 if TYPE_CHECKING:
+    from ipywidgets import HTML
+
     from ipyflow.data_model.symbol import Symbol
 
 
-FormatType = TypeVar("FormatType", HTML, str)
+FormatType = TypeVar("FormatType", "HTML", str)
 SliceRefType = Union["SliceableMixin", IdType, Timestamp]
 
 
@@ -51,6 +50,22 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
+@functools.lru_cache(maxsize=None)
+def get_html_widget_class() -> Type[Any]:
+    # ipywidgets is slow to import and only needed to render slices as widgets
+    try:
+        from ipywidgets import HTML
+    except Exception:
+        return str
+    return HTML
+
+
+def _blacken(content: str) -> str:
+    import black
+
+    return black.format_str(content, mode=black.FileMode())
+
+
 class Slice:
     FUNC_PREFIX = f"{pyc.PYCCOLO_BUILTIN_PREFIX}_ipyflow_slice_func_"
     _func_counter = 0
@@ -68,7 +83,7 @@ class Slice:
             if self.iface in (Interface.IPYTHON, Interface.UNKNOWN):
                 fmt: Type[FormatType] = str  # type: ignore
             else:
-                fmt = HTML
+                fmt = get_html_widget_class()
         else:
             fmt = format_type  # type: ignore
         self.format_type: Type[FormatType] = fmt  # type: ignore
@@ -82,8 +97,9 @@ class Slice:
             for cell_num, content in sorted(self.raw_slice.items())
         ).strip()
 
-    def _make_slice_widget(self) -> HTML:
-        if HTML is str:
+    def _make_slice_widget(self) -> "HTML":
+        html_widget_class = get_html_widget_class()
+        if html_widget_class is str:
             raise ValueError("ipywidgets not available")
         slice_text = self._get_slice_text_from_slice()
         slice_text_linked_cells = []
@@ -119,16 +135,14 @@ class Slice:
             content for _cell_num, content in sorted(self.raw_slice.items())
         )
         if self.blacken:
-            slice_text_no_cells = black.format_str(
-                slice_text_no_cells, mode=black.FileMode()
-            ).strip()
+            slice_text_no_cells = _blacken(slice_text_no_cells).strip()
         if self.iface == Interface.JUPYTER:
             classes = "output_subarea output_text output_stream output_stdout"
         elif self.iface == Interface.JUPYTERLAB:
             classes = "lm-Widget p-Widget jp-RenderedText jp-OutputArea-output"
         else:
             classes = ""
-        return HTML(
+        return html_widget_class(
             textwrap.dedent(
                 """
             <div class="{classes}">
@@ -157,7 +171,7 @@ class Slice:
     def _repr_mimebundle_(self, **kwargs) -> Dict[str, Any]:
         if self.format_type is str:
             return {"text/plain": self._get_slice_text_from_slice()}
-        elif self.format_type is HTML:
+        elif self.format_type is get_html_widget_class():
             return self._make_slice_widget()._repr_mimebundle_(**kwargs)
         else:
             raise ValueError(f"Unknown format type {self.format_type}")
@@ -197,6 +211,43 @@ class Slice:
         )
 
 
+class _SliceClosureCache:
+    """
+    Memoized ancestor closures for one kind of sliceable, stored as bitsets
+    over a dense numbering of the sliceables visited so far. Everything gets
+    dropped once the key changes, i.e. once there is a new timestamp (which
+    can mean new versions to resolve parents to), an edge was added or
+    removed, or the slicing contexts in use changed.
+    """
+
+    def __init__(self) -> None:
+        self.key: Optional[Tuple[Any, ...]] = None
+        self.nodes: List["SliceableMixin"] = []
+        self.idx_by_node: Dict["SliceableMixin", int] = {}
+        self.parents_by_idx: Dict[int, List[int]] = {}
+        self.closure_by_idx: Dict[int, int] = {}
+
+    def reset_if_stale(self, key: Tuple[Any, ...]) -> None:
+        if key == self.key:
+            return
+        self.key = key
+        self.nodes.clear()
+        self.idx_by_node.clear()
+        self.parents_by_idx.clear()
+        self.closure_by_idx.clear()
+
+    def index(self, node: "SliceableMixin") -> int:
+        idx = self.idx_by_node.get(node)
+        if idx is None:
+            idx = len(self.nodes)
+            self.idx_by_node[node] = idx
+            self.nodes.append(node)
+        return idx
+
+    def to_nodes(self, mask: int) -> List["SliceableMixin"]:
+        return [self.nodes[idx] for idx in iter_bits(mask)]
+
+
 class SliceableMixin(Protocol):
     """
     Common slicing functionality shared between CodeCell and Statement
@@ -288,6 +339,14 @@ class SliceableMixin(Protocol):
     # end abstract section
     #############
 
+    # bumped whenever an edge gets added or removed, for cache invalidation
+    _edge_version: int = 0
+    _slice_closure_caches: Dict[type, _SliceClosureCache] = {}
+
+    @classmethod
+    def _bump_edge_version(cls) -> None:
+        SliceableMixin._edge_version += 1
+
     @classmethod
     def _from_ref(cls, parent_ref: SliceRefType) -> "SliceableMixin":
         if isinstance(parent_ref, Timestamp):
@@ -306,6 +365,7 @@ class SliceableMixin(Protocol):
             return
         if pid == self.id:
             # in this case, inherit the previous parents, if any
+            self._bump_edge_version()
             if self.prev is not None:
                 for prev_pid, prev_syms in self.prev.raw_parents.items():
                     common = syms & prev_syms
@@ -314,6 +374,7 @@ class SliceableMixin(Protocol):
             return
         self.raw_parents.setdefault(pid, set()).update(syms)
         parent.raw_children.setdefault(self.id, set()).update(syms)
+        self._bump_edge_version()
 
     def add_parent_edge(self, parent_ref: SliceRefType, sym: "Symbol") -> None:
         self.add_parent_edges(parent_ref, {sym})
@@ -325,6 +386,7 @@ class SliceableMixin(Protocol):
             return
         parent = self._from_ref(parent_ref)
         pid = parent.id
+        self._bump_edge_version()
         for edges, eid in ((self.raw_parents, pid), (parent.raw_children, self.id)):
             sym_edges = edges.get(eid, set())
             if not sym_edges:
@@ -341,6 +403,7 @@ class SliceableMixin(Protocol):
     ) -> None:
         prev_parent = self._from_ref(prev_parent_ref)
         new_parent = self._from_ref(new_parent_ref)
+        self._bump_edge_version()
         syms = self.raw_parents.pop(prev_parent.id)
         prev_parent.raw_children.pop(self.id)
         self.raw_parents.setdefault(new_parent.id, set()).update(syms)
@@ -351,6 +414,7 @@ class SliceableMixin(Protocol):
     ) -> None:
         prev_child = self._from_ref(prev_child_ref)
         new_child = self._from_ref(new_child_ref)
+        self._bump_edge_version()
         syms = self.raw_children.pop(prev_child.id)
         prev_child.raw_parents.pop(self.id)
         self.raw_children.setdefault(new_child.id, set()).update(syms)
@@ -418,10 +482,8 @@ class SliceableMixin(Protocol):
         else:
             assert False
 
-    def _make_slice_helper(self, closure: Set["SliceableMixin"]) -> None:
-        if self in closure:
-            return
-        closure.add(self)
+    def _resolve_parents(self) -> List["SliceableMixin"]:
+        parents: List["SliceableMixin"] = []
         for _ in flow().mut_settings.iter_slicing_contexts():
             for pid in self.raw_parents.keys():
                 parent = self.from_id(pid)
@@ -429,7 +491,83 @@ class SliceableMixin(Protocol):
                     if getattr(parent, "override", False):
                         break
                     parent = parent.prev  # type: ignore[assignment]
-                parent._make_slice_helper(closure)
+                parents.append(parent)
+        return parents
+
+    @classmethod
+    def _get_slice_closure_cache(cls) -> _SliceClosureCache:
+        cache = SliceableMixin._slice_closure_caches.get(cls)
+        if cache is None:
+            cache = SliceableMixin._slice_closure_caches[cls] = _SliceClosureCache()
+        cache.reset_if_stale(
+            (
+                Timestamp.current(),
+                SliceableMixin._edge_version,
+                tuple(flow().mut_settings.slicing_contexts()),
+            )
+        )
+        return cache
+
+    @classmethod
+    def _compute_closure_mask(
+        cls, seed: "SliceableMixin", cache: _SliceClosureCache
+    ) -> Optional[int]:
+        """
+        Post-order walk over the ancestors of `seed` with an explicit stack,
+        memoizing the closure of every ancestor along the way. Parents never
+        have a later timestamp than their children, so the parent graph is a
+        DAG modulo self edges; if we somehow find a cycle anyway, give up and
+        return None, since closures computed around it would be incomplete.
+        """
+        closure_by_idx = cache.closure_by_idx
+        parents_by_idx = cache.parents_by_idx
+        seed_idx = cache.index(seed)
+        expanded: Set[int] = set()
+        stack = [seed_idx]
+        while len(stack) > 0:
+            idx = stack[-1]
+            if idx in closure_by_idx:
+                stack.pop()
+                continue
+            parent_idxs = parents_by_idx.get(idx)
+            if parent_idxs is None:
+                parent_idxs = parents_by_idx[idx] = [
+                    parent_idx
+                    for parent_idx in map(
+                        cache.index, cache.nodes[idx]._resolve_parents()
+                    )
+                    if parent_idx != idx
+                ]
+            pending = [
+                parent_idx
+                for parent_idx in parent_idxs
+                if parent_idx not in closure_by_idx
+            ]
+            if len(pending) > 0:
+                if idx in expanded or any(
+                    parent_idx in expanded for parent_idx in pending
+                ):
+                    return None
+                expanded.add(idx)
+                stack.extend(pending)
+                continue
+            mask = 1 << idx
+            for parent_idx in parent_idxs:
+                mask |= closure_by_idx[parent_idx]
+            closure_by_idx[idx] = mask
+            expanded.discard(idx)
+            stack.pop()
+        return closure_by_idx[seed_idx]
+
+    def _make_slice_helper(self, closure: Set["SliceableMixin"]) -> None:
+        # uncached fallback; iterative to stay clear of the recursion limit
+        stack: List["SliceableMixin"] = [self]
+        while len(stack) > 0:
+            sliceable = stack.pop()
+            if sliceable in closure:
+                continue
+            closure.add(sliceable)
+            stack.extend(sliceable._resolve_parents())
 
     def make_slice(self) -> List["SliceableMixin"]:
         return self.make_multi_slice([self])
@@ -441,14 +579,22 @@ class SliceableMixin(Protocol):
         seed_only: bool = False,
     ) -> List["SliceableMixin"]:
         closure: Set["SliceableMixin"] = set()
+        cache = None if seed_only else cls._get_slice_closure_cache()
+        closure_mask = 0
         for seed in seeds:
             slice_seed = (
                 cls.at_timestamp(seed) if isinstance(seed, (Timestamp, int)) else seed
             )
-            if seed_only:
+            if cache is None:
                 closure.add(slice_seed)
-            else:
+                continue
+            seed_mask = cls._compute_closure_mask(slice_seed, cache)
+            if seed_mask is None:
                 slice_seed._make_slice_helper(closure)
+            else:
+                closure_mask |= seed_mask
+        if cache is not None:
+            closure.update(cache.to_nodes(closure_mask))
         return sorted(closure, key=lambda dep: dep.timestamp)
 
     @staticmethod
@@ -540,9 +686,7 @@ def format_slice(
     if blacken:
         for cell_num, content in list(raw_slice.items()):
             try:
-                raw_slice[cell_num] = black.format_str(
-                    content, mode=black.FileMode()
-                ).strip()
+                raw_slice[cell_num] = _blacken(content).strip()
             except Exception as e:
                 logger.info("call to black failed with exception: %s", e)
     return Slice(
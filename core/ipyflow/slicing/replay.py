@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Out-of-kernel recovery of symbol values. The dynamic slice for each requested
+symbol gets lowered to a standalone script (outermost statements only, deduped,
+with imports hoisted to the top) that runs in a fresh interpreter and pickles
+the requested values back. Symbols whose slices share no statements get
+replayed in separate processes concurrently.
+"""
+import ast
+import logging
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set
+
+from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.models import statements
+
+if TYPE_CHECKING:
+    from ipyflow.data_model.statement import Statement
+    from ipyflow.data_model.symbol import Symbol
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_RESULT_VAR = "_ipyflow_replay_result"
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _replay_name(sym: "Symbol") -> str:
+    if not sym.is_user_accessible:
+        raise ValueError("symbol %s is not accessible from the notebook" % sym)
+    return sym.readable_name
+
+
+def compute_replay_closure(syms: Iterable["Symbol"]) -> List["Statement"]:
+    seeds: Set[Timestamp] = set()
+    for sym in syms:
+        seeds |= sym._get_timestamps_for_version(version=-1)
+    seeds = statements()._process_memoized_seeds(seeds)  # type: ignore
+    return statements().make_multi_slice(seeds)  # type: ignore
+
+
+def _make_script_body(closure: List["Statement"]) -> List[str]:
+    imports: List[str] = []
+    body: List[str] = []
+    seen_node_ids: Set[int] = set()
+    seen_imports: Set[str] = set()
+    # the closure is in timestamp order, so the first statement that maps to a
+    # given outermost statement also determines where that one goes
+    for stmt in closure:
+        node = stmt.module_stmt_node
+        if id(node) in seen_node_ids:
+            continue
+        seen_node_ids.add(id(node))
+        text = stmt.module_stmt_text
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if text not in seen_imports:
+                seen_imports.add(text)
+                imports.append(text)
+        else:
+            body.append(text)
+    return imports + body
+
+
+def make_replay_script(syms: Iterable["Symbol"], output_path: str) -> str:
+    """
+    Generates a standalone script that recomputes the given symbols from
+    their slice and pickles their values to `output_path`.
+    """
+    syms = list(syms)
+    names = [_replay_name(sym) for sym in syms]
+    lines = _make_script_body(compute_replay_closure(syms))
+    lines.append(
+        "%s = {%s}"
+        % (_RESULT_VAR, ", ".join("%r: %s" % (name, name) for name in names))
+    )
+    lines.append("import pickle as _ipyflow_pickle")
+    lines.append(
+        "with open(%r, 'wb') as _ipyflow_f:\n    _ipyflow_pickle.dump(%s, _ipyflow_f)"
+        % (output_path, _RESULT_VAR)
+    )
+    return "\n".join(lines) + "\n"
+
+
+def group_independent_slices(syms: Iterable["Symbol"]) -> List[List["Symbol"]]:
+    """
+    Partitions symbols so that no two groups share a slice statement, merging
+    any groups whose slices overlap.
+    """
+    groups: List[List["Symbol"]] = []
+    stmt_ids_by_group: List[Set[int]] = []
+    for sym in syms:
+        stmt_ids = {id(stmt) for stmt in compute_replay_closure([sym])}
+        merged = [sym]
+        remaining_groups: List[List["Symbol"]] = []
+        remaining_stmt_ids: List[Set[int]] = []
+        for group, group_stmt_ids in zip(groups, stmt_ids_by_group):
+            if stmt_ids.isdisjoint(group_stmt_ids):
+                remaining_groups.append(group)
+                remaining_stmt_ids.append(group_stmt_ids)
+            else:
+                merged = group + merged
+                stmt_ids |= group_stmt_ids
+        groups = remaining_groups + [merged]
+        stmt_ids_by_group = remaining_stmt_ids + [stmt_ids]
+    return groups
+
+
+def _run_replay_script(
+    script: str, script_path: str, output_path: str, timeout: Optional[float]
+) -> Dict[str, Any]:
+    with open(script_path, "w") as f:
+        f.write(script)
+    try:
+        proc = subprocess.run(
+            [sys.executable, script_path],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=os.getcwd(),
+        )
+    except subprocess.TimeoutExpired:
+        raise ReplayError("replay timed out after %ss" % timeout)
+    if proc.returncode != 0:
+        raise ReplayError(
+            "replay exited with code %d:\n%s" % (proc.returncode, proc.stderr)
+        )
+    with open(output_path, "rb") as f:
+        return pickle.load(f)
+
+
+def replay_symbols(
+    syms: Iterable["Symbol"],
+    timeout: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Recomputes the values of the given symbols in fresh interpreters, running
+    each independent slice in its own process. Values come back keyed by the
+    name under which each symbol is reachable from the notebook.
+    """
+    groups = group_independent_slices(syms)
+    if len(groups) == 0:
+        return {}
+    with tempfile.TemporaryDirectory(prefix="ipyflow-replay-") as tmpdir:
+        jobs = []
+        for idx, group in enumerate(groups):
+            output_path = os.path.join(tmpdir, "replay_%d.pkl" % idx)
+            script_path = os.path.join(tmpdir, "replay_%d.py" % idx)
+            jobs.append(
+                (
+                    make_replay_script(group, output_path),
+                    script_path,
+                    output_path,
+                    timeout,
+                )
+            )
+        results: Dict[str, Any] = {}
+        if len(jobs) == 1:
+            results.update(_run_replay_script(*jobs[0]))
+            return results
+        num_workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            # each worker thread just babysits its own interpreter process
+            for group_results in executor.map(
+                lambda job: _run_replay_script(*job), jobs
+            ):
+                results.update(group_results)
+        return results
@@ -2,25 +2,80 @@
 import ast
 import logging
 from types import FunctionType, ModuleType
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Optional, Tuple, Type
 
 # force handler registration by exec()ing the handler modules here
 import ipyflow.tracing.external_calls.base_handlers  # noqa: F401
+import ipyflow.tracing.external_calls.frame_handlers  # noqa: F401
 import ipyflow.tracing.external_calls.list_handlers  # noqa: F401
 from ipyflow.singletons import flow
 from ipyflow.tracing.external_calls.base_handlers import (
+    MODULES_AWAITING_IMPORT,
+    MODULES_PENDING_HANDLER_COMPILATION,
     REGISTERED_HANDLER_BY_FUNCTION,
-    REGISTERED_HANDLER_BY_METHOD,
     ExternalCallHandler,
     MutatingMethodEventNotYetImplemented,
     NoopCallHandler,
     StandardMutation,
+    defer_handler_compilation_for_newly_imported_modules,
+    resolve_method_handler,
 )
 
 if TYPE_CHECKING:
     from ipyflow.data_model.symbol import Symbol
 
 
+def _compile_pending_handlers(module: Optional[ModuleType] = None) -> None:
+    # deferred to avoid a circular import
+    from ipyflow.annotations.compiler import compile_pending_handlers
+
+    compile_pending_handlers(module)
+
+
+def _compile_pending_handlers_for_callee(
+    caller_self: Optional[Any], function_or_method: Optional[FunctionType]
+) -> None:
+    module_names = {getattr(function_or_method, "__module__", None)}
+    if caller_self is not None:
+        module_names |= {
+            getattr(cls, "__module__", None) for cls in type(caller_self).__mro__
+        }
+    for module_name in module_names:
+        if not isinstance(module_name, str):
+            continue
+        # stubs are registered under the public module name, e.g. `pandas`
+        # for classes defined in `pandas.core.frame`
+        parts = module_name.split(".")
+        for idx in range(len(parts), 0, -1):
+            pending_module = MODULES_PENDING_HANDLER_COMPILATION.get(
+                ".".join(parts[:idx])
+            )
+            if pending_module is not None:
+                _compile_pending_handlers(pending_module)
+
+
+def _lookup_registered_handler(
+    module: Optional[ModuleType],
+    caller_self: Optional[Any],
+    function_or_method: Optional[FunctionType],
+    method: Optional[str],
+) -> Tuple[Optional[Type[ExternalCallHandler]], Optional[ModuleType]]:
+    if function_or_method is None:
+        external_call_type = None
+    else:
+        external_call_type = REGISTERED_HANDLER_BY_FUNCTION.get(function_or_method)
+    if (
+        external_call_type is None
+        and caller_self is not None
+        and method is not None
+        and not isinstance(caller_self, type)
+    ):
+        external_call_type, cls = resolve_method_handler(caller_self.__class__, method)
+        if cls is not None:
+            module = getattr(cls, "__module__", module)
+    return external_call_type, module
+
+
 def resolve_external_call(
     module: Optional[ModuleType],
     caller_self: Optional[Any],
@@ -64,24 +119,22 @@ def resolve_external_call(
     if isinstance(caller_self, ModuleType):
         caller_self = None
 
+    if len(MODULES_AWAITING_IMPORT) > 0:
+        defer_handler_compilation_for_newly_imported_modules()
+    if len(MODULES_PENDING_HANDLER_COMPILATION) > 0 and module is not None:
+        _compile_pending_handlers(module)
     try:
-        if function_or_method is None:
-            external_call_type = None
-        else:
-            external_call_type = REGISTERED_HANDLER_BY_FUNCTION.get(function_or_method)
+        external_call_type, module = _lookup_registered_handler(
+            module, caller_self, function_or_method, method
+        )
+        if external_call_type is None and len(MODULES_PENDING_HANDLER_COMPILATION) > 0:
+            # the handler may live in a module other than the one we were given
+            _compile_pending_handlers_for_callee(caller_self, function_or_method)
+            external_call_type, module = _lookup_registered_handler(
+                module, caller_self, function_or_method, method
+            )
     except TypeError:
         return None
-    if (
-        external_call_type is None
-        and caller_self is not None
-        and method is not None
-        and not isinstance(caller_self, type)
-    ):
-        for cls in caller_self.__class__.mro():
-            external_call_type = REGISTERED_HANDLER_BY_METHOD.get((cls, method))
-            if external_call_type is not None:
-                module = getattr(cls, "__module__", module)
-                break
     if external_call_type is None:
         if use_standard_default:
             external_call_type = StandardMutation
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import ast
 import logging
+import sys
 from types import ModuleType
 from typing import (
     TYPE_CHECKING,
@@ -217,6 +218,87 @@ class ExternalCallHandler(metaclass=HasGetitem):
 external_call_handler_by_name: Dict[str, Type[ExternalCallHandler]] = {}
 REGISTERED_HANDLER_BY_FUNCTION: Dict[Callable, Type[ExternalCallHandler]] = {}
 REGISTERED_HANDLER_BY_METHOD: Dict[Tuple[type, str], Type[ExternalCallHandler]] = {}
+# imported modules whose handlers (if annotated) are not compiled yet
+MODULES_PENDING_HANDLER_COMPILATION: Dict[str, ModuleType] = {}
+# annotated modules that were not yet imported when their annotations were registered
+MODULES_AWAITING_IMPORT: Set[str] = set()
+# modules with registered annotation specs; None until the annotation compiler
+# has registered any, in which case every imported module is deferred
+_annotated_module_names: Optional[Set[str]] = None
+_num_modules_at_last_import_check = 0
+# (concrete type, method name) -> (handler, class in the mro that registered it);
+# filled lazily from REGISTERED_HANDLER_BY_METHOD, with misses cached as (None, None)
+_METHOD_HANDLER_DISPATCH_TABLE: Dict[
+    Tuple[type, str], Tuple[Optional[Type[ExternalCallHandler]], Optional[type]]
+] = {}
+
+
+def register_method_handler(
+    clazz: type, method: str, handler: Type[ExternalCallHandler]
+) -> None:
+    REGISTERED_HANDLER_BY_METHOD[clazz, method] = handler
+    invalidate_method_handler_dispatch_table()
+
+
+def invalidate_method_handler_dispatch_table() -> None:
+    _METHOD_HANDLER_DISPATCH_TABLE.clear()
+
+
+def resolve_method_handler(
+    concrete_type: type, method: str
+) -> Tuple[Optional[Type[ExternalCallHandler]], Optional[type]]:
+    """
+    Returns the handler registered for `method` on the nearest class in the
+    mro of `concrete_type`, along with that class. The mro is walked at most
+    once per (type, method) until the dispatch table is next invalidated.
+    """
+    key = (concrete_type, method)
+    resolved = _METHOD_HANDLER_DISPATCH_TABLE.get(key)
+    if resolved is not None:
+        return resolved
+    resolved = (None, None)
+    for cls in concrete_type.mro():
+        handler = REGISTERED_HANDLER_BY_METHOD.get((cls, method))
+        if handler is not None:
+            resolved = (handler, cls)
+            break
+    _METHOD_HANDLER_DISPATCH_TABLE[key] = resolved
+    return resolved
+
+
+def register_annotated_module_names(module_names: Iterable[str]) -> None:
+    global _annotated_module_names
+    if _annotated_module_names is None:
+        _annotated_module_names = set()
+    _annotated_module_names.update(module_names)
+    for module_name in list(MODULES_PENDING_HANDLER_COMPILATION.keys()):
+        if module_name not in _annotated_module_names:
+            del MODULES_PENDING_HANDLER_COMPILATION[module_name]
+
+
+def defer_handler_compilation_for_module(module: ModuleType) -> None:
+    # checking for annotations here would mean loading the annotation
+    # compiler (and parsing stubs) at import time, so until it has registered
+    # its specs, every module gets deferred
+    module_name = getattr(module, "__name__", None)
+    if module_name is None:
+        return
+    if _annotated_module_names is None or module_name in _annotated_module_names:
+        MODULES_PENDING_HANDLER_COMPILATION[module_name] = module
+        MODULES_AWAITING_IMPORT.discard(module_name)
+
+
+def defer_handler_compilation_for_newly_imported_modules() -> None:
+    # catches annotated modules imported outside of traced code, which
+    # never pass through the tracer's after_import handler
+    global _num_modules_at_last_import_check
+    if len(sys.modules) == _num_modules_at_last_import_check:
+        return
+    _num_modules_at_last_import_check = len(sys.modules)
+    for module_name in [
+        name for name in MODULES_AWAITING_IMPORT if name in sys.modules
+    ]:
+        defer_handler_compilation_for_module(sys.modules[module_name])
 
 
 class NoopCallHandler(ExternalCallHandler):
@@ -280,6 +362,18 @@ class CallerMutation(ExternalCallHandler):
         self.mutate_caller(should_propagate=True)
 
 
+class InplaceCallerMutation(ExternalCallHandler):
+    """
+    For methods (e.g. in pandas) that only mutate the caller when passed `inplace=True`
+    (or `in_place=True`, as polars spells it).
+    """
+
+    def handle(self) -> None:
+        inplace = self.kwargs.get("inplace", self.kwargs.get("in_place"))
+        if inplace is not None and inplace[0] is True:
+            self.mutate_caller(should_propagate=True)
+
+
 class CallerUpsert(ExternalCallHandler):
     def handle(self) -> None:
         for module_sym in flow().aliases.get(id(self.caller_self), []):
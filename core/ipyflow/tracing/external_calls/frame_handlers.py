@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from typing import TYPE_CHECKING, Any, List, Optional
+
+from ipyflow.data_model import is_dataframe
+from ipyflow.singletons import flow, tracer
+from ipyflow.tracing.external_calls.base_handlers import ExternalCallHandler
+
+if TYPE_CHECKING:
+    from ipyflow.data_model.namespace import Namespace
+
+
+def _as_column_labels(labels: Any) -> Optional[List[Any]]:
+    if isinstance(labels, (str, int)):
+        return [labels]
+    if isinstance(labels, (list, tuple, set)) and all(
+        isinstance(label, (str, int)) for label in labels
+    ):
+        return list(labels)
+    return None
+
+
+class DataFrameMethod(ExternalCallHandler):
+    def get_arg(self, pos: Optional[int], kw: str) -> Any:
+        if kw in self.kwargs:
+            return self.kwargs[kw][0]
+        elif pos is not None and pos < len(self.args):
+            return self.args[pos][0]
+        else:
+            return self.not_yet_defined
+
+    def is_inplace(self) -> bool:
+        inplace = self.kwargs.get("inplace")
+        return inplace is not None and inplace[0] is True
+
+    def changed_columns(self) -> Optional[List[Any]]:
+        """
+        Returns the columns that differ between the caller and the frame
+        this method derives from it, or None if unknown.
+        """
+        return None
+
+    def handle_namespace(self, namespace: "Namespace", columns: List[Any]) -> None:
+        pass
+
+    def handle(self) -> None:
+        columns = self.changed_columns()
+        if not self.is_inplace():
+            if columns is not None and is_dataframe(self.return_value):
+                tracer().frame_column_lineage[id(self.return_value)] = (
+                    id(self.caller_self),
+                    set(columns),
+                )
+            return
+        mutated_sym = flow().get_first_full_symbol(self.caller_self_obj_id or -1)
+        namespace = None if mutated_sym is None else mutated_sym.namespace
+        if columns is None or namespace is None:
+            self.mutate_caller(should_propagate=True)
+            return
+        self.handle_namespace(namespace, columns)
+        self.mutate_caller(should_propagate=False)
+
+
+class DataFrameAssign(DataFrameMethod):
+    def changed_columns(self) -> Optional[List[Any]]:
+        if len(self.args) > 0:
+            # e.g. polars expressions, whose output names are not known here
+            return None
+        return list(self.kwargs.keys())
+
+
+class DataFrameColumnRemoval(DataFrameMethod):
+    def handle_namespace(self, namespace: "Namespace", columns: List[Any]) -> None:
+        for column in columns:
+            for is_subscript in (True, False):
+                sym = namespace.lookup_symbol_by_name_this_indentation(
+                    column, is_subscript=is_subscript
+                )
+                if sym is None:
+                    continue
+                # bump the namespace timestamp so that users of the whole frame
+                # (including of the removed column) are marked as stale
+                sym.refresh()
+                namespace.delete_symbol_for_name(column, is_subscript=is_subscript)
+
+
+class DataFrameDrop(DataFrameColumnRemoval):
+    def changed_columns(self) -> Optional[List[Any]]:
+        columns = self.get_arg(None, "columns")
+        if columns is self.not_yet_defined:
+            labels = self.get_arg(0, "labels")
+            axis = self.get_arg(1, "axis")
+            if labels is self.not_yet_defined or axis not in (1, "columns"):
+                return None
+            columns = labels
+        return _as_column_labels(columns)
+
+
+class DataFrameDropInPlace(DataFrameColumnRemoval):
+    def is_inplace(self) -> bool:
+        return True
+
+    def changed_columns(self) -> Optional[List[Any]]:
+        # `item` for pandas' `pop`; `name` for polars' `drop_in_place`
+        column = self.get_arg(0, "item")
+        if column is self.not_yet_defined:
+            column = self.get_arg(0, "name")
+        return _as_column_labels(column)
+
+
+class PolarsDataFrameDrop(DataFrameColumnRemoval):
+    def is_inplace(self) -> bool:
+        return False
+
+    def changed_columns(self) -> Optional[List[Any]]:
+        if "columns" in self.kwargs:
+            return _as_column_labels(self.kwargs["columns"][0])
+        columns: List[Any] = []
+        for arg, _ in self.args:
+            labels = _as_column_labels(arg)
+            if labels is None:
+                return None
+            columns.extend(labels)
+        return columns
@@ -2,17 +2,243 @@
 import ast
 import logging
 import traceback
-from typing import cast
+from types import FrameType
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 
 import pyccolo as pyc
+from pyccolo.extra_builtins import make_guard_name
 
 from ipyflow.data_model.cell import cells
-from ipyflow.singletons import flow
+from ipyflow.singletons import flow, tracer, tracer_initialized
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
+# builtins that do not mutate their arguments, and which only call back into
+# notebook code via dunders (e.g. `__lt__` for `max`) when their arguments do
+# not have builtin types
+_SIDE_EFFECT_FREE_BUILTINS = frozenset(
+    {
+        "abs",
+        "all",
+        "any",
+        "bool",
+        "chr",
+        "divmod",
+        "enumerate",
+        "float",
+        "frozenset",
+        "hash",
+        "int",
+        "isinstance",
+        "len",
+        "max",
+        "min",
+        "ord",
+        "range",
+        "reversed",
+        "round",
+        "set",
+        "sorted",
+        "str",
+        "sum",
+        "tuple",
+        "zip",
+    }
+)
+
+# NamedExpr is only available on 3.8+
+_SIDE_EFFECTING_EXPR_TYPES = tuple(
+    getattr(ast, name)
+    for name in ("NamedExpr", "Await", "Yield", "YieldFrom")
+    if hasattr(ast, name)
+)
+
+_BUILTIN_SCALAR_TYPES = frozenset(
+    {type(None), bool, int, float, complex, str, bytes, range}
+)
+_BUILTIN_SEQUENCE_TYPES = frozenset({list, tuple, set, frozenset})
+_MAX_BUILTIN_TYPE_CHECK_DEPTH = 2
+
+Comprehension = Union[ast.DictComp, ast.GeneratorExp, ast.ListComp, ast.SetComp]
+
+
+def _has_builtin_type(value: Any, depth: int = 0) -> bool:
+    # exact type checks, since subclasses can override dunders
+    value_type = type(value)
+    if value_type in _BUILTIN_SCALAR_TYPES:
+        return True
+    elif depth >= _MAX_BUILTIN_TYPE_CHECK_DEPTH:
+        return False
+    elif value_type in _BUILTIN_SEQUENCE_TYPES:
+        return all(_has_builtin_type(elt, depth + 1) for elt in value)
+    elif value_type is dict:
+        return all(
+            _has_builtin_type(k, depth + 1) and _has_builtin_type(v, depth + 1)
+            for k, v in value.items()
+        )
+    else:
+        return False
+
+
+class OpaqueComprehension(NamedTuple):
+    """
+    The guards that select the uninstrumented version of a comprehension's
+    fields, along with the names whose values need builtin types at runtime
+    for it to be safe to activate them.
+    """
+
+    guards: List[str]
+    builtin_typed_names: FrozenSet[str]
+
+    def can_run_untraced(self, frame: FrameType) -> bool:
+        f_locals = frame.f_locals
+        for name in self.builtin_typed_names:
+            if name in f_locals:
+                value = f_locals[name]
+            elif name in frame.f_globals:
+                value = frame.f_globals[name]
+            else:
+                return False
+            if not _has_builtin_type(value):
+                return False
+        return True
+
+
+class OpaqueComprehensionFinder(ast.NodeVisitor):
+    """
+    Finds comprehensions that cannot mutate tracked objects, and which can
+    therefore run without per-element tracing. For each one, records the
+    comprehension fields whose guards select the uninstrumented version, and
+    the names that must have builtin types at runtime, keyed by the id of the
+    enclosing statement.
+    """
+
+    def __init__(self) -> None:
+        self.comprehensions_by_stmt_id: Dict[
+            int, List[Tuple[List[ast.expr], FrozenSet[str]]]
+        ] = {}
+        self._stmt_stack: List[ast.stmt] = []
+
+    def generic_visit(self, node: ast.AST) -> None:
+        if not isinstance(node, ast.stmt):
+            super().generic_visit(node)
+            return
+        self._stmt_stack.append(node)
+        try:
+            super().generic_visit(node)
+        finally:
+            self._stmt_stack.pop()
+
+    @staticmethod
+    def _is_side_effect_free_builtin_call(node: ast.Call) -> bool:
+        return (
+            isinstance(node.func, ast.Name)
+            and node.func.id in _SIDE_EFFECT_FREE_BUILTINS
+            and flow().global_scope.lookup_symbol_by_name(node.func.id) is None
+            # e.g. `sorted(..., key=f)` calls back into `f`
+            and all(keyword.arg != "key" for keyword in node.keywords)
+        )
+
+    @staticmethod
+    def _get_guarded_fields(node: Comprehension) -> List[ast.expr]:
+        if isinstance(node, ast.DictComp):
+            fields = [node.key, node.value]
+        else:
+            fields = [node.elt]
+        for gen in node.generators:
+            fields.extend(gen.ifs)
+        return fields
+
+    @staticmethod
+    def _get_free_names(node: Comprehension, exprs: List[ast.expr]) -> Set[str]:
+        bound_names = {
+            child.id
+            for child in ast.walk(node)
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store)
+        }
+        called_func_ids = {
+            id(child.func)
+            for expr in exprs
+            for child in ast.walk(expr)
+            if isinstance(child, ast.Call)
+        }
+        return {
+            child.id
+            for expr in exprs
+            for child in ast.walk(expr)
+            if isinstance(child, ast.Name)
+            and isinstance(child.ctx, ast.Load)
+            and id(child) not in called_func_ids
+        } - bound_names
+
+    def _get_builtin_typed_names(self, node: Comprehension) -> Optional[FrozenSet[str]]:
+        """
+        Returns the names whose values need builtin types at runtime for the
+        comprehension to run untraced (empty if no builtins get called), or
+        None if it can never run untraced.
+        """
+        for idx, gen in enumerate(node.generators):
+            if gen.is_async:
+                return None
+            # only the first iterable gets evaluated (and traced) in the enclosing
+            # scope; the others are not guarded, so they must not emit any events
+            if idx > 0 and not isinstance(gen.iter, ast.Name):
+                return None
+        fields = self._get_guarded_fields(node)
+        has_builtin_calls = False
+        for field in fields:
+            for child in ast.walk(field):
+                if isinstance(child, _SIDE_EFFECTING_EXPR_TYPES):
+                    return None
+                if isinstance(child, ast.Call):
+                    if not self._is_side_effect_free_builtin_call(child):
+                        return None
+                    has_builtin_calls = True
+        if not has_builtin_calls:
+            return frozenset()
+        first_iter = node.generators[0].iter
+        if not isinstance(first_iter, ast.Name) and not (
+            isinstance(first_iter, ast.Call)
+            and isinstance(first_iter.func, ast.Name)
+            and first_iter.func.id == "range"
+        ):
+            # the types of the elements we iterate over cannot be checked
+            return None
+        iters = [gen.iter for gen in node.generators]
+        return frozenset(self._get_free_names(node, fields + iters))
+
+    def visit_generic_comprehension(self, node: Comprehension) -> None:
+        builtin_typed_names = (
+            None if len(self._stmt_stack) == 0 else self._get_builtin_typed_names(node)
+        )
+        if builtin_typed_names is None:
+            self.generic_visit(node)
+            return
+        # any nested comprehensions live inside the guarded fields, so no need to recurse
+        self.comprehensions_by_stmt_id.setdefault(id(self._stmt_stack[-1]), []).append(
+            (self._get_guarded_fields(node), builtin_typed_names)
+        )
+        # the first iterable is still evaluated (and traced) normally
+        self.visit(node.generators[0].iter)
+
+    visit_DictComp = visit_GeneratorExp = visit_ListComp = visit_SetComp = (
+        visit_generic_comprehension
+    )
+
+
 class DataflowAstRewriter(pyc.AstRewriter):
     # we do our own garbage collection
     gc_bookkeeping = False
@@ -35,6 +261,7 @@ class DataflowAstRewriter(pyc.AstRewriter):
             ret = super().visit(node)
             # after call to super().visit(...), orig_to_copy_mapping should be set
             assert self.orig_to_copy_mapping is not None
+            self._register_opaque_comprehensions(self.orig_to_copy_mapping[id(node)])
             cells().current_cell().to_ast(
                 override=cast(ast.Module, self.orig_to_copy_mapping[id(node)])
             )
@@ -48,3 +275,18 @@ class DataflowAstRewriter(pyc.AstRewriter):
             flow().get_and_set_exception_raised_during_execution(e)
             traceback.print_exc()
             raise e
+
+    def _register_opaque_comprehensions(self, node: ast.AST) -> None:
+        if not tracer_initialized():
+            return
+        finder = OpaqueComprehensionFinder()
+        finder.visit(node)
+        guards_by_stmt_id = tracer().opaque_comprehensions_by_stmt_id
+        for stmt_id, comprehensions in finder.comprehensions_by_stmt_id.items():
+            # the guard names need to match those generated during instrumentation
+            guards_by_stmt_id[stmt_id] = [
+                OpaqueComprehension(
+                    [make_guard_name(field) for field in fields], builtin_typed_names
+                )
+                for fields, builtin_typed_names in comprehensions
+            ]
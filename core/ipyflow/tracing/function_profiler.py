@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+import ast
+import builtins
+import inspect
+import logging
+import time
+from types import CodeType, FrameType, ModuleType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from ipyflow.analysis.live_refs import compute_live_dead_symbol_refs
+from ipyflow.singletons import flow
+
+if TYPE_CHECKING:
+    from ipyflow.data_model.symbol import Symbol
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+FunctionDefNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+_NON_DEMOTABLE_CODE_FLAGS = (
+    inspect.CO_GENERATOR
+    | inspect.CO_COROUTINE
+    | inspect.CO_ASYNC_GENERATOR
+    | inspect.CO_ITERABLE_COROUTINE
+)
+
+# bound the number of read-version keys remembered for any one function
+_MAX_SUMMARIES_PER_FUNCTION = 16
+
+# a summary gets used in lieu of tracing only after this many traced calls agree
+_MIN_SUMMARY_CONFIRMATIONS = 2
+
+
+ReadVersionsKey = Tuple[Tuple[str, Optional["Symbol"], Any], ...]
+
+
+def _base_names(node: ast.expr) -> Set[str]:
+    """
+    Returns the name at the base of an attribute / subscript chain, e.g.
+    `x` for `x.y[0]`, or of each element of a starred / tuple expression.
+    """
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Starred)):
+        node = node.value
+    if isinstance(node, ast.Name):
+        return {node.id}
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        return set().union(*(_base_names(elt) for elt in node.elts))
+    else:
+        return set()
+
+
+class FunctionSummary(NamedTuple):
+    """
+    The dataflow effects of a single call: the global symbols it writes
+    (excluding aliases of its arguments) and the names of the arguments
+    whose objects it mutates.
+    """
+
+    global_writes: FrozenSet["Symbol"]
+    mutated_arg_names: FrozenSet[str]
+
+    def union(self, other: "FunctionSummary") -> "FunctionSummary":
+        return FunctionSummary(
+            self.global_writes | other.global_writes,
+            self.mutated_arg_names | other.mutated_arg_names,
+        )
+
+    def is_covered_by(self, other: "FunctionSummary") -> bool:
+        return (
+            self.global_writes <= other.global_writes
+            and self.mutated_arg_names <= other.mutated_arg_names
+        )
+
+
+class _ActiveCall:
+    def __init__(
+        self,
+        frame: FrameType,
+        profile: "FunctionTracingProfile",
+        arg_obj_ids: Dict[str, int],
+        read_key: Optional[ReadVersionsKey],
+        expected_summary: Optional[FunctionSummary],
+    ) -> None:
+        self.frame = frame
+        self.profile = profile
+        self.arg_obj_ids = arg_obj_ids
+        self.read_key = read_key
+        self.expected_summary = expected_summary
+        self.writes: Set["Symbol"] = set()
+        self.mutated_arg_names: Set[str] = set()
+        self.start = time.perf_counter()
+
+    def make_summary(self) -> FunctionSummary:
+        mutated_obj_ids = {self.arg_obj_ids[name] for name in self.mutated_arg_names}
+        return FunctionSummary(
+            frozenset(sym for sym in self.writes if sym.obj_id not in mutated_obj_ids),
+            frozenset(self.mutated_arg_names),
+        )
+
+
+class FunctionTracingProfile:
+    """
+    Runtime tracing statistics for a single notebook function (identified
+    by its code object), along with the dependency summaries that get applied
+    in lieu of tracing once the function has been demoted, or when a call's
+    global reads match those of previously traced calls.
+    """
+
+    def __init__(self, code: CodeType, func_def_node: FunctionDefNode) -> None:
+        self.code = code
+        self.func_def_node = func_def_node
+        self.name: str = getattr(code, "co_qualname", code.co_name)
+        self.num_traced_calls = 0
+        self.num_untraced_calls = 0
+        self.num_demotions = 0
+        self.traced_seconds = 0.0
+        self.num_stable_calls = 0
+        self.summary: Optional[FunctionSummary] = None
+        self.known_global_writes: Set["Symbol"] = set()
+        self.is_demoted = False
+        self._global_read_names: Optional[Set[str]] = None
+        self._static_write_names: Optional[
+            Tuple[FrozenSet[str], FrozenSet[str], Dict[str, FrozenSet[str]]]
+        ] = None
+        self.demoted_reads: Dict[str, Tuple[Optional["Symbol"], int]] = {}
+        self.summaries_by_read_versions: Dict[
+            ReadVersionsKey, Tuple[FunctionSummary, int]
+        ] = {}
+        self.num_summary_hits = 0
+        self.num_verification_failures = 0
+        args = func_def_node.args
+        self.arg_names: Set[str] = {
+            arg.arg
+            for arg in getattr(args, "posonlyargs", [])
+            + args.args
+            + args.kwonlyargs
+            + [a for a in (args.vararg, args.kwarg) if a is not None]
+        }
+
+    @property
+    def global_read_names(self) -> Set[str]:
+        if self._global_read_names is None:
+            live_refs, *_ = compute_live_dead_symbol_refs(
+                self.func_def_node.body, init_killed=set(self.arg_names)
+            )
+            names: Set[str] = set()
+            for ref in live_refs:
+                chain = ref.ref.chain
+                if len(chain) == 0 or ref.is_killed:
+                    continue
+                atom = chain[0].value
+                if isinstance(atom, str) and not hasattr(builtins, atom):
+                    names.add(atom)
+            self._global_read_names = names
+        return self._global_read_names
+
+    def _resolve_global_read(self, name: str) -> Optional["Symbol"]:
+        func_sym = flow().statement_to_func_sym.get(id(self.func_def_node))
+        scope = (
+            flow().global_scope
+            if func_sym is None or func_sym.call_scope is None
+            else func_sym.call_scope
+        )
+        return scope.lookup_symbol_by_name(name)
+
+    def snapshot_global_reads(self) -> Dict[str, Tuple[Optional["Symbol"], int]]:
+        snapshot: Dict[str, Tuple[Optional["Symbol"], int]] = {}
+        for name in self.global_read_names:
+            sym = self._resolve_global_read(name)
+            snapshot[name] = (sym, -1 if sym is None else sym.obj_id)
+        return snapshot
+
+    def global_reads_unchanged(self) -> bool:
+        for name, (sym, obj_id) in self.demoted_reads.items():
+            cur_sym = self._resolve_global_read(name)
+            if cur_sym is not sym:
+                return False
+            if cur_sym is not None and cur_sym.obj_id != obj_id:
+                return False
+        return True
+
+    def read_versions_key(self) -> ReadVersionsKey:
+        key = []
+        for name in sorted(self.global_read_names):
+            sym = self._resolve_global_read(name)
+            if sym is None:
+                version: Any = None
+            elif sym in self.known_global_writes:
+                # the function's own writes bump this symbol's timestamp on every
+                # call, so only a rebinding to some other object counts as a change
+                version = sym.obj_id
+            else:
+                version = sym.timestamp
+            key.append((name, sym, version))
+        return tuple(key)
+
+    def get_cached_summary(self, key: ReadVersionsKey) -> Optional[FunctionSummary]:
+        summary, num_confirmations = self.summaries_by_read_versions.get(key, (None, 0))
+        if num_confirmations < _MIN_SUMMARY_CONFIRMATIONS:
+            return None
+        return summary
+
+    def cache_summary(self, key: ReadVersionsKey, summary: FunctionSummary) -> None:
+        prev_summary, num_confirmations = self.summaries_by_read_versions.pop(
+            key, (None, 0)
+        )
+        if prev_summary is None:
+            num_confirmations = 1
+        elif summary.is_covered_by(prev_summary):
+            summary = prev_summary
+            num_confirmations += 1
+        else:
+            # effects that depend on argument values get merged conservatively
+            summary = summary.union(prev_summary)
+            num_confirmations = 1
+        self.summaries_by_read_versions[key] = (summary, num_confirmations)
+        while len(self.summaries_by_read_versions) > _MAX_SUMMARIES_PER_FUNCTION:
+            del self.summaries_by_read_versions[
+                next(iter(self.summaries_by_read_versions))
+            ]
+
+    @property
+    def static_write_names(
+        self,
+    ) -> Tuple[FrozenSet[str], FrozenSet[str], Dict[str, FrozenSet[str]]]:
+        """
+        Conservatively approximates, from the function's AST, the globals it may
+        write and the arguments it may mutate, along every branch (not just the
+        ones taken by traced calls). Like StandardMutation, method calls only
+        mutate their receiver, unless that turns out to be a module, so the
+        names passed to methods get returned keyed by the receiver's name.
+        """
+        if self._static_write_names is None:
+            global_names: Set[str] = set()
+            mutated_names: Set[str] = set()
+            arg_names_by_receiver: Dict[str, Set[str]] = {}
+            for node in ast.walk(self.func_def_node):
+                if isinstance(node, ast.Global):
+                    global_names.update(node.names)
+                elif isinstance(node, (ast.Attribute, ast.Subscript)):
+                    if isinstance(node.ctx, (ast.Store, ast.Del)):
+                        mutated_names.update(_base_names(node.value))
+                elif isinstance(node, ast.Call):
+                    passed_names: Set[str] = set()
+                    for arg in node.args:
+                        passed_names.update(_base_names(arg))
+                    for keyword in node.keywords:
+                        passed_names.update(_base_names(keyword.value))
+                    if isinstance(node.func, ast.Attribute):
+                        receiver_names = _base_names(node.func.value)
+                        mutated_names.update(receiver_names)
+                        for receiver in receiver_names:
+                            arg_names_by_receiver.setdefault(receiver, set()).update(
+                                passed_names
+                            )
+                    else:
+                        # other callees may mutate their arguments
+                        mutated_names.update(passed_names)
+            global_names |= mutated_names & self.global_read_names
+            self._static_write_names = (
+                frozenset(global_names),
+                frozenset(mutated_names & self.arg_names),
+                {
+                    receiver: frozenset(names)
+                    for receiver, names in arg_names_by_receiver.items()
+                    if receiver in self.global_read_names
+                },
+            )
+        return self._static_write_names
+
+    def conservative_summary(self) -> Optional[FunctionSummary]:
+        """
+        Returns the union of all observed summaries with every global and argument
+        that the function could write, or None if some such global is undefined
+        (in which case an untraced call could create a symbol we never learn about).
+        """
+        if self.summary is None:
+            return None
+        global_names, arg_names, arg_names_by_receiver = self.static_write_names
+        global_names, arg_names = set(global_names), set(arg_names)
+        for receiver, passed_names in arg_names_by_receiver.items():
+            sym = flow().global_scope.lookup_symbol_by_name_this_indentation(receiver)
+            if sym is not None and isinstance(sym.obj, ModuleType):
+                # e.g. `np.copyto(dst, src)` may mutate `dst`
+                global_names |= passed_names & self.global_read_names
+                arg_names |= passed_names & self.arg_names
+        global_writes = set(self.summary.global_writes)
+        for name in global_names:
+            sym = flow().global_scope.lookup_symbol_by_name_this_indentation(name)
+            if sym is None:
+                return None
+            if isinstance(sym.obj, ModuleType):
+                # e.g. `np.sum(...)`, which does not mutate `np`
+                continue
+            global_writes.add(sym)
+        return FunctionSummary(
+            frozenset(global_writes), self.summary.mutated_arg_names | arg_names
+        )
+
+    def record_traced_call(self, elapsed: float, summary: FunctionSummary) -> None:
+        self.num_traced_calls += 1
+        self.traced_seconds += elapsed
+        self.known_global_writes |= summary.global_writes
+        if self.summary is not None and summary.is_covered_by(self.summary):
+            self.num_stable_calls += 1
+        else:
+            # effects that depend on argument values get merged conservatively
+            self.summary = (
+                summary if self.summary is None else summary.union(self.summary)
+            )
+            self.num_stable_calls = 1
+
+    def should_demote(self) -> bool:
+        mut_settings = flow().mut_settings
+        return (
+            not self.is_demoted
+            and self.num_stable_calls >= mut_settings.function_demotion_min_calls
+            and self.traced_seconds
+            >= mut_settings.function_demotion_min_overhead_seconds
+        )
+
+    def demote(self) -> None:
+        self.is_demoted = True
+        self.num_demotions += 1
+        self.demoted_reads = self.snapshot_global_reads()
+
+    def promote(self) -> None:
+        self.is_demoted = False
+        self.num_stable_calls = 0
+        self.traced_seconds = 0.0
+        self.demoted_reads = {}
+
+    def apply_summary(
+        self, summary: FunctionSummary, arg_obj_ids: Dict[str, int]
+    ) -> List["Symbol"]:
+        reads = []
+        for name in self.global_read_names:
+            sym = self._resolve_global_read(name)
+            if sym is not None and not sym.is_garbage:
+                reads.append(sym)
+        for sym in reads:
+            sym.update_usage_info()
+        writes = set(summary.global_writes)
+        for name in summary.mutated_arg_names:
+            obj_id = arg_obj_ids.get(name)
+            if obj_id is None:
+                continue
+            for alias in flow().aliases.get(obj_id, []):
+                if alias.is_globally_accessible and not alias.is_anonymous:
+                    writes.add(alias)
+        for sym in writes:
+            if sym.is_garbage:
+                continue
+            sym.resync_if_necessary(refresh=False)
+            sym.update_deps(set(reads), overwrite=False)
+        return reads
+
+    def describe(self) -> str:
+        state = "demoted" if self.is_demoted else "traced"
+        return (
+            f"{self.name}: {state}; traced calls: {self.num_traced_calls}; "
+            f"untraced calls: {self.num_untraced_calls}; "
+            f"summary cache hits: {self.num_summary_hits}; "
+            f"tracing overhead: {self.traced_seconds * 1000:.1f}ms; "
+            f"demotions: {self.num_demotions}"
+        )
+
+
+class FunctionProfiler:
+    """
+    Tracks per-function tracing overhead and dataflow summaries so that calls
+    to notebook functions can skip tracing, either because the function is hot
+    with stable read / write behavior (demotion), or because its global reads
+    are unchanged since previous traced calls (summary cache).
+    """
+
+    def __init__(self) -> None:
+        self.profile_by_code: Dict[CodeType, FunctionTracingProfile] = {}
+        self._active_calls: List[_ActiveCall] = []
+        self._pending_summaries: List[
+            Tuple[
+                FunctionTracingProfile, FunctionSummary, Dict[str, int], Optional[int]
+            ]
+        ] = []
+
+    @staticmethod
+    def is_enabled() -> bool:
+        mut_settings = flow().mut_settings
+        return (
+            mut_settings.function_demotion_enabled
+            or mut_settings.function_summaries_enabled
+        )
+
+    def get_profile(
+        self, frame: FrameType, stmt_node: ast.stmt
+    ) -> Optional[FunctionTracingProfile]:
+        code = frame.f_code
+        profile = self.profile_by_code.get(code)
+        if profile is not None:
+            return profile
+        if not isinstance(stmt_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return None
+        if code.co_flags & _NON_DEMOTABLE_CODE_FLAGS:
+            return None
+        profile = FunctionTracingProfile(code, stmt_node)
+        self.profile_by_code[code] = profile
+        return profile
+
+    @staticmethod
+    def _get_arg_obj_ids(
+        frame: FrameType, profile: FunctionTracingProfile
+    ) -> Dict[str, int]:
+        f_locals = frame.f_locals
+        return {
+            name: id(f_locals[name]) for name in profile.arg_names if name in f_locals
+        }
+
+    def _skip_call(
+        self,
+        frame: FrameType,
+        profile: FunctionTracingProfile,
+        summary: FunctionSummary,
+        call_node_id: Optional[int],
+    ) -> bool:
+        profile.num_untraced_calls += 1
+        self._pending_summaries.append(
+            (profile, summary, self._get_arg_obj_ids(frame, profile), call_node_id)
+        )
+        return True
+
+    def on_call(
+        self, frame: FrameType, stmt_node: ast.stmt, call_node_id: Optional[int]
+    ) -> bool:
+        """
+        Returns True if the call should run untraced, in which case a summary
+        of its effects gets applied once tracing resumes.
+        """
+        if not self.is_enabled():
+            return False
+        profile = self.get_profile(frame, stmt_node)
+        if profile is None:
+            return False
+        mut_settings = flow().mut_settings
+        if mut_settings.function_demotion_enabled and profile.is_demoted:
+            summary = profile.conservative_summary()
+            if summary is not None and profile.global_reads_unchanged():
+                return self._skip_call(frame, profile, summary, call_node_id)
+            logger.info(
+                "promote %s due to changed global reads or writes", profile.name
+            )
+            profile.promote()
+        read_key = None
+        expected_summary = None
+        if mut_settings.function_summaries_enabled:
+            read_key = profile.read_versions_key()
+            expected_summary = profile.get_cached_summary(read_key)
+            if expected_summary is not None:
+                profile.num_summary_hits += 1
+                # the key does not cover argument values, so the branch taken
+                # (and with it the writes) can differ from the cached calls'
+                conservative_summary = profile.conservative_summary()
+                if (
+                    conservative_summary is not None
+                    and not mut_settings.function_summaries_verify
+                ):
+                    return self._skip_call(
+                        frame,
+                        profile,
+                        expected_summary.union(conservative_summary),
+                        call_node_id,
+                    )
+        self._active_calls.append(
+            _ActiveCall(
+                frame,
+                profile,
+                self._get_arg_obj_ids(frame, profile),
+                read_key,
+                expected_summary,
+            )
+        )
+        return False
+
+    def on_traced_return(self, frame: FrameType) -> None:
+        while len(self._active_calls) > 0:
+            # frames above this one may have had their return events skipped
+            # (e.g. if tracing got disabled in the middle of them)
+            if self._finish_active_call() is frame:
+                break
+
+    def _finish_active_call(self) -> FrameType:
+        call = self._active_calls.pop()
+        profile = call.profile
+        summary = call.make_summary()
+        profile.record_traced_call(time.perf_counter() - call.start, summary)
+        if call.expected_summary is not None and not summary.is_covered_by(
+            call.expected_summary
+        ):
+            profile.num_verification_failures += 1
+            logger.warning(
+                "cached summary %s for %s does not cover traced effects %s",
+                call.expected_summary,
+                profile.name,
+                summary,
+            )
+        if call.read_key is not None:
+            profile.cache_summary(call.read_key, summary)
+        if flow().mut_settings.function_demotion_enabled and profile.should_demote():
+            logger.info("demote %s", profile.name)
+            profile.demote()
+        return call.frame
+
+    def record_writes(self, updated_symbols: Set["Symbol"]) -> None:
+        if len(self._active_calls) == 0:
+            return
+        writes = set()
+        local_writes = []
+        for sym in updated_symbols:
+            if sym.is_anonymous:
+                continue
+            # summarize at the granularity of top-level symbols so that, e.g.,
+            # appending to a global list gives the same summary on each call
+            top_level_sym = sym.get_top_level()
+            if top_level_sym is None or top_level_sym.is_anonymous:
+                continue
+            if top_level_sym.is_globally_accessible:
+                writes.add(top_level_sym)
+            else:
+                local_writes.append(top_level_sym)
+        for call in self._active_calls:
+            call.writes |= writes
+            for sym in local_writes:
+                # an argument whose symbol still points to the passed object got mutated
+                if call.arg_obj_ids.get(sym.name, -1) == sym.obj_id:
+                    call.mutated_arg_names.add(sym.name)
+
+    def apply_pending_summaries(self) -> Dict[int, List["Symbol"]]:
+        reads_by_call_node_id: Dict[int, List["Symbol"]] = {}
+        pending = self._pending_summaries
+        self._pending_summaries = []
+        for profile, summary, arg_obj_ids, call_node_id in pending:
+            reads = profile.apply_summary(summary, arg_obj_ids)
+            if call_node_id is not None:
+                reads_by_call_node_id.setdefault(call_node_id, []).extend(reads)
+        return reads_by_call_node_id
+
+    def finish_module_stmt(self) -> None:
+        while len(self._active_calls) > 0:
+            self._finish_active_call()
+
+    def describe(self) -> str:
+        profiles = sorted(
+            self.profile_by_code.values(),
+            key=lambda profile: (not profile.is_demoted, -profile.traced_seconds),
+        )
+        if len(profiles) == 0:
+            return "No notebook functions have been profiled yet."
+        return "\n".join(profile.describe() for profile in profiles)
@@ -28,19 +28,21 @@ from IPython import get_ipython
 
 from ipyflow.analysis.live_refs import compute_live_dead_symbol_refs
 from ipyflow.analysis.symbol_ref import resolve_slice_to_constant
-from ipyflow.annotations.compiler import compile_and_register_handlers_for_module
 from ipyflow.api.lift import code as api_code
 from ipyflow.api.lift import deps as api_deps
 from ipyflow.api.lift import has_tag as api_has_tag
 from ipyflow.api.lift import lift as api_lift
 from ipyflow.api.lift import mutate as api_mutate
 from ipyflow.api.lift import rdeps as api_rdeps
+from ipyflow.api.lift import replay as api_replay
 from ipyflow.api.lift import rusers as api_rusers
 from ipyflow.api.lift import set_tag as api_set_tag
 from ipyflow.api.lift import timestamp as api_timestamp
 from ipyflow.api.lift import unset_tag as api_unset_tag
 from ipyflow.api.lift import users as api_users
+from ipyflow.api.lift import value_at as api_value_at
 from ipyflow.api.lift import watchpoints as api_watchpoints
+from ipyflow.data_model import has_multiindex_columns, is_dataframe
 from ipyflow.data_model.cell import cells
 from ipyflow.data_model.namespace import Namespace
 from ipyflow.data_model.scope import Scope
@@ -51,11 +53,19 @@ from ipyflow.models import symbols as api_symbols
 from ipyflow.patches import apply_patches
 from ipyflow.singletons import SingletonBaseTracer, flow, shell
 from ipyflow.tracing.external_calls import resolve_external_call
-from ipyflow.tracing.external_calls.base_handlers import ExternalCallHandler
-from ipyflow.tracing.flow_ast_rewriter import DataflowAstRewriter
+from ipyflow.tracing.external_calls.base_handlers import (
+    ExternalCallHandler,
+    defer_handler_compilation_for_module,
+)
+from ipyflow.tracing.flow_ast_rewriter import (
+    DataflowAstRewriter,
+    OpaqueComprehension,
+)
+from ipyflow.tracing.function_profiler import FunctionProfiler
 from ipyflow.tracing.symbol_resolver import resolve_rval_symbols
 from ipyflow.tracing.uninstrument import uninstrument
 from ipyflow.tracing.utils import match_container_obj_or_namespace_with_literal_nodes
+from ipyflow.tracing.worker_threads import WorkerThreadEffects
 from ipyflow.types import SubscriptIndices, SupportedIndexType
 from ipyflow.utils.misc_utils import is_project_file
 
@@ -82,12 +92,18 @@ class StackFrameManager(SingletonBaseTracer):
     should_patch_meta_path = False
     # TODO: we should also provide a way to prevent threads from running on instrumented ASTs
     multiple_threads_allowed = False
+    # set while call / return / exception events come from sys.monitoring instead of settrace
+    sys_events_via_monitoring = False
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.call_depth = 0
         self.external_call_depth = 0
 
+    @property
+    def has_sys_trace_events(self) -> bool:
+        return not self.sys_events_via_monitoring and super().has_sys_trace_events
+
     @pyc.register_raw_handler((pyc.call, pyc.return_))
     def handle_first_ipython_frame(
         self,
@@ -175,6 +191,12 @@ class DataflowTracer(StackFrameManager):
             self.blocking_node_ids: Set[int] = self.augmented_node_ids_by_spec[
                 self.blocking_spec
             ]
+            self.function_profiler = FunctionProfiler()
+            self.worker_thread_effects = WorkerThreadEffects()
+        # only comprehensions instrumented for the current cell get tracked
+        self.opaque_comprehensions_by_stmt_id: Dict[
+            NodeId, List[OpaqueComprehension]
+        ] = {}
         self.tracing_disabled_since_last_stmt = False
         self.tracing_disabled_since_last_module_stmt = False
         self.guards_pending_deactivation: Set[str] = set()
@@ -192,6 +214,9 @@ class DataflowTracer(StackFrameManager):
         self.node_id_to_saved_dict_key: Dict[NodeId, Any] = {}
         self.this_stmt_updated_symbols: Set[Symbol] = set()
         self.pending_usage_updates_by_sym: Dict[Symbol, bool] = {}
+        # id of a dataframe derived this statement -> (id of the frame it was
+        # derived from, columns that differ from those of the original frame)
+        self.frame_column_lineage: Dict[int, Tuple[int, Set[Any]]] = {}
         self.cur_cell_symtab: Optional[symtable.SymbolTable] = None
 
         self.tracing_disabled_user_call_depth = -1
@@ -310,12 +335,14 @@ class DataflowTracer(StackFrameManager):
         self.prev_node_id_in_cur_frame = None
         self.saved_assign_rhs_obj = None
         flow().updated_symbols |= self.this_stmt_updated_symbols
+        self.function_profiler.record_writes(self.this_stmt_updated_symbols)
         self.this_stmt_updated_symbols.clear()
         self._seen_functions_ids.clear()
         self.calling_symbol = None
         for sym, exclude_ns in self.pending_usage_updates_by_sym.items():
             sym.update_usage_info(exclude_ns=exclude_ns)
         self.pending_usage_updates_by_sym.clear()
+        self.frame_column_lineage.clear()
         # don't clear the lexical stacks because line magics can
         # mess with when an 'after_stmt' gets emitted, and anyway
         # these should be pushed / popped appropriately by ast events
@@ -818,7 +845,7 @@ class DataflowTracer(StackFrameManager):
 
     @pyc.register_raw_handler(pyc.after_import)
     def after_import(self, *_, module: ModuleType, **__) -> None:
-        compile_and_register_handlers_for_module(module)
+        defer_handler_compilation_for_module(module)
         modname = getattr(module, "__name__", "")
         apply_patches(modname, module)
         if modname == "numpy":
@@ -972,7 +999,8 @@ class DataflowTracer(StackFrameManager):
             ).append(sym)
 
         try:
-            if isinstance(attr_or_subscript, list):
+            is_column_list = isinstance(attr_or_subscript, list)
+            if is_column_list:
                 attr_or_subscript = tuple(attr_or_subscript)
             if isinstance(attr_or_subscript, tuple):
                 if not all(
@@ -981,6 +1009,18 @@ class DataflowTracer(StackFrameManager):
                     return
             elif not isinstance(attr_or_subscript, SubscriptIndices.types):
                 return
+            if (
+                event == pyc.before_subscript_load
+                and isinstance(attr_or_subscript, tuple)
+                and isinstance(scope, Namespace)
+                and is_dataframe(obj)
+            ):
+                columns = attr_or_subscript
+                if not is_column_list and has_multiindex_columns(obj):
+                    # e.g. `df["a", "x"]` is the single column ("a", "x")
+                    columns = (attr_or_subscript,)
+                self._load_dataframe_column_symbols(scope, obj, columns, node)
+                return
             if "store" in event.value:
                 logger.warning(
                     "save store data for node id %d: %s, %s, %s, %s",
@@ -1047,6 +1087,45 @@ class DataflowTracer(StackFrameManager):
         finally:
             self.active_scope = scope
 
+    def _load_dataframe_column_symbols(
+        self,
+        namespace: Namespace,
+        obj: Any,
+        columns: Tuple[SupportedIndexType, ...],
+        node: ast.AST,
+    ) -> None:
+        # e.g. `df[["a", "b"]]` only uses columns "a" and "b", rather than all of `df`
+        if self.top_level_node_id_for_chain is None:
+            return
+        loaded_symbols = self.node_id_to_loaded_symbols.setdefault(
+            self.top_level_node_id_for_chain, []
+        )
+        for column in columns:
+            sym = namespace.lookup_symbol_by_name_this_indentation(
+                column, is_subscript=True
+            )
+            if sym is None:
+                if self.prev_trace_stmt_in_cur_frame is None:
+                    continue
+                try:
+                    column_obj = flow().retrieve_namespace_attr_or_sub(
+                        obj, column, is_subscript=True
+                    )
+                except Exception:
+                    continue
+                sym = namespace.upsert_symbol_for_name(
+                    column,
+                    column_obj,
+                    set(),
+                    self.prev_trace_stmt_in_cur_frame.stmt_node,
+                    is_subscript=True,
+                    propagate=False,
+                    implicit=True,
+                    symbol_node=node,
+                )
+            self.pending_usage_updates_by_sym.setdefault(sym, True)
+            loaded_symbols.append(sym)
+
     @pyc.register_raw_handler(pyc.after_load_complex_symbol)
     def after_complex_symbol(self, obj: Any, node_id: NodeId, *_, **__) -> None:
         try:
@@ -1081,12 +1160,14 @@ class DataflowTracer(StackFrameManager):
                 api_lift,
                 api_mutate,
                 api_rdeps,
+                api_replay,
                 api_rusers,
                 api_set_tag,
                 api_symbols,
                 api_timestamp,
                 api_unset_tag,
                 api_users,
+                api_value_at,
                 api_watchpoints,
             ):
                 return None
@@ -1554,6 +1635,10 @@ class DataflowTracer(StackFrameManager):
     def after_module_stmt(self, ret, stmt: ast.stmt, *_, **__) -> Optional[Any]:
         if self.is_tracing_enabled:
             assert self.cur_frame_original_scope.is_global
+        self.function_profiler.finish_module_stmt()
+        self._apply_function_summaries()
+        if self.worker_thread_effects.has_pending:
+            self._merge_worker_thread_effects()
         if self.tracing_disabled_since_last_module_stmt:
             self._handle_skipped_sub_statements(stmt)
         if ret is not None:
@@ -1582,6 +1667,16 @@ class DataflowTracer(StackFrameManager):
     @pyc.register_raw_handler(pyc.before_stmt)
     def before_stmt(self, _ret: None, stmt_id: int, frame: FrameType, *_, **__) -> None:
         self._deactivate_guards()
+        if self.worker_thread_effects.has_pending:
+            self._merge_worker_thread_effects()
+        if flow().mut_settings.opaque_comprehensions_enabled:
+            # run side-effect-free comprehensions untraced, starting from the first element
+            for comprehension in self.opaque_comprehensions_by_stmt_id.get(stmt_id, []):
+                if not comprehension.can_run_untraced(frame):
+                    continue
+                for guard in comprehension.guards:
+                    self.activate_guard(guard)
+                    self.guards_pending_deactivation.add(guard)
         self.next_stmt_node_id = stmt_id
         trace_stmt = self._get_or_make_trace_stmt(
             cast(ast.stmt, self.ast_node_by_id[stmt_id]), frame=frame
@@ -1660,8 +1755,31 @@ class DataflowTracer(StackFrameManager):
             # pop instead of clear to leave the top-level literal stack intact
             self.lexical_call_stack.pop()
         self._tracked_enable_tracing()
+        self._apply_function_summaries()
         return True
 
+    def _apply_function_summaries(self) -> None:
+        reads_by_call_node_id = self.function_profiler.apply_pending_summaries()
+        for call_node_id, reads in reads_by_call_node_id.items():
+            self.node_id_to_loaded_symbols.setdefault(call_node_id, []).extend(reads)
+
+    def _merge_worker_thread_effects(self) -> None:
+        flow_ = flow()
+        for call in self.worker_thread_effects.drain():
+            func_sym = flow_.statement_to_func_sym.get(call.function_id)
+            reads = set() if func_sym is None or func_sym.is_garbage else {func_sym}
+            # the call ran untraced, so conservatively assume it mutated each argument
+            for obj_id in call.arg_obj_ids:
+                for alias in list(flow_.aliases.get(obj_id, [])):
+                    if (
+                        alias.is_garbage
+                        or alias.is_anonymous
+                        or not alias.is_globally_accessible
+                    ):
+                        continue
+                    alias.resync_if_necessary(refresh=False)
+                    alias.update_deps(set(reads), overwrite=False, mutated=True)
+
     def _get_or_make_trace_stmt(
         self, stmt_node: ast.stmt, frame: FrameType
     ) -> Statement:
@@ -1765,6 +1883,14 @@ class DataflowTracer(StackFrameManager):
             self._tracked_disable_tracing(frame)
             return pyc.Null
         trace_stmt.node_id_for_last_call = prev_node_id_in_cur_frame_lexical
+        if self.function_profiler.on_call(
+            frame, stmt_node, prev_node_id_in_cur_frame_lexical
+        ):
+            # demoted or summarized function; its summary gets applied once tracing resumes
+            if flow().trace_messages_enabled:
+                self.EVENT_LOGGER.warning(" skip summarized function >>>")
+            self._tracked_disable_tracing(frame)
+            return pyc.Null
         self.state_transition_hook(event, trace_stmt, frame, ret_obj)
         return None
 
@@ -1791,6 +1917,8 @@ class DataflowTracer(StackFrameManager):
         trace_stmt = self._get_or_make_trace_stmt(stmt_node, frame)
         self._maybe_log_event(event, stmt_node, trace_stmt)
         self.state_transition_hook(event, trace_stmt, frame, ret_obj)
+        if event == pyc.return_:
+            self.function_profiler.on_traced_return(frame)
 
 
 reactive_spec = DataflowTracer.reactive_spec
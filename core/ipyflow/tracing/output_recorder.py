@@ -1,7 +1,11 @@
+import os
 import sys
+import tempfile
 import threading
-from io import StringIO, TextIOBase
-from typing import Any, Optional, Union
+import weakref
+from collections import deque
+from io import TextIOBase
+from typing import Any, Deque, List, Optional, Tuple, Union
 
 import pyccolo as pyc
 from IPython.core.displayhook import DisplayHook
@@ -9,7 +13,7 @@ from IPython.core.displaypub import CapturingDisplayPublisher, DisplayPublisher
 from IPython.core.interactiveshell import InteractiveShell
 from IPython.utils.capture import CapturedIO
 
-from ipyflow.singletons import shell
+from ipyflow.singletons import flow, shell
 
 
 class Tee:
@@ -74,9 +78,179 @@ class TeeDisplayPublisher:
             self.pub2.set_parent(*args, **kwargs)
 
 
+def _remove_spill_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class BoundedCaptureBuffer(TextIOBase):
+    """
+    StringIO-like capture buffer that keeps only the first and last `limit`
+    characters in memory (everything if `limit` is not positive). With `spill`,
+    the full stream is also appended to a temporary file once it outgrows memory,
+    and `getvalue()` reads it back from there.
+    """
+
+    def __init__(self, limit: int = 0, spill: bool = False) -> None:
+        super().__init__()
+        self.limit = limit
+        self.spill = spill
+        self.size = 0
+        self._head: List[str] = []
+        self._head_size = 0
+        self._tail: Deque[str] = deque()
+        self._tail_size = 0
+        self._spill_path: Optional[str] = None
+        self._spill_pending: List[str] = []
+        self._spill_pending_size = 0
+        self._remove_spill_file: Optional[weakref.finalize] = None
+
+    def set_limits(self, limit: int, spill: bool) -> None:
+        # only affects data written from here on
+        self.limit = limit
+        self.spill = spill
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        num_chars = len(data)
+        if num_chars == 0:
+            return 0
+        self.size += num_chars
+        if self._spill_path is not None:
+            self._spill(data)
+        if self.limit <= 0 or self._head_size < self.limit:
+            head_part = (
+                data if self.limit <= 0 else data[: self.limit - self._head_size]
+            )
+            self._head.append(head_part)
+            self._head_size += len(head_part)
+            data = data[len(head_part) :]
+            if len(data) == 0:
+                return num_chars
+        self._tail.append(data)
+        self._tail_size += len(data)
+        if self._tail_size > self.limit:
+            if self.spill and self._spill_path is None:
+                self._start_spilling()
+            self._trim_tail()
+        return num_chars
+
+    def _start_spilling(self) -> None:
+        # the file is closed between writes, so that cells with spilled
+        # outputs do not each hold on to an open file descriptor
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", prefix="ipyflow-output-", delete=False
+        ) as f:
+            f.write("".join(self._head))
+            f.write("".join(self._tail))
+            self._spill_path = f.name
+        self._remove_spill_file = weakref.finalize(
+            self, _remove_spill_file, self._spill_path
+        )
+
+    def _spill(self, data: str) -> None:
+        # batch up appends so that the file only gets reopened every `limit` chars
+        self._spill_pending.append(data)
+        self._spill_pending_size += len(data)
+        if self._spill_pending_size >= self.limit:
+            self._flush_spill()
+
+    def _flush_spill(self) -> None:
+        if self._spill_path is None or len(self._spill_pending) == 0:
+            return
+        with open(self._spill_path, "a", encoding="utf-8") as f:
+            f.write("".join(self._spill_pending))
+        self._spill_pending.clear()
+        self._spill_pending_size = 0
+
+    def _trim_tail(self) -> None:
+        while self._tail_size - len(self._tail[0]) >= self.limit:
+            self._tail_size -= len(self._tail.popleft())
+        excess = self._tail_size - self.limit
+        if excess > 0:
+            self._tail[0] = self._tail[0][excess:]
+            self._tail_size -= excess
+
+    @property
+    def num_truncated(self) -> int:
+        return self.size - self._head_size - self._tail_size
+
+    def getvalue(self) -> str:
+        if self._spill_path is not None:
+            self._flush_spill()
+            with open(self._spill_path, encoding="utf-8") as f:
+                return f.read()
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if self.num_truncated <= 0:
+            return head + tail
+        return f"{head}\n... [{self.num_truncated} characters truncated] ...\n{tail}"
+
+    def close(self) -> None:
+        if self._remove_spill_file is not None:
+            self._remove_spill_file()
+            self._remove_spill_file = None
+        self._spill_path = None
+        self._spill_pending.clear()
+        super().close()
+
+
 class TeeCompatibleCapturingDisplayPublisher(CapturingDisplayPublisher):
+    # total size of rich outputs to keep at each of the start and end of a cell's outputs
+    output_limit = 0
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._reset_output_sizes()
+
+    def _reset_output_sizes(self) -> None:
+        # running totals, so that trimming does not rescan all outputs each publish
+        self._num_head_outputs = 0
+        self._head_outputs_size = 0
+        self._is_head_full = False
+        self._tail_output_sizes: Deque[int] = deque()
+        self._tail_outputs_size = 0
+
+    def publish(self, *args, **kwargs) -> None:
+        num_prev_outputs = len(self.outputs)
+        super().publish(*args, **kwargs)
+        for output in self.outputs[num_prev_outputs:]:
+            self._add_output(sum(len(datum) for datum in output["data"].values()))
+
+    def _add_output(self, size: int) -> None:
+        limit = self.output_limit
+        if not self._is_head_full and (
+            limit <= 0 or self._head_outputs_size + size <= limit
+        ):
+            self._num_head_outputs += 1
+            self._head_outputs_size += size
+            return
+        self._is_head_full = True
+        self._tail_output_sizes.append(size)
+        self._tail_outputs_size += size
+        num_evicted = 0
+        while limit > 0 and self._tail_outputs_size > limit:
+            self._tail_outputs_size -= self._tail_output_sizes.popleft()
+            num_evicted += 1
+        # mutate in place, since the captured io references this list
+        del self.outputs[self._num_head_outputs : self._num_head_outputs + num_evicted]
+
     def clear_output(self, wait=False):
         self.outputs.clear()
+        self._reset_output_sizes()
+
+
+def _captured_stream_size(stream: Optional[TextIOBase]) -> int:
+    if stream is None:
+        return 0
+    elif isinstance(stream, BoundedCaptureBuffer):
+        return stream.size
+    else:
+        return len(stream.getvalue())  # type: ignore[attr-defined]
 
 
 class IPyflowCapturedIO(CapturedIO):
@@ -84,6 +258,18 @@ class IPyflowCapturedIO(CapturedIO):
         super().__init__(stdout, stderr, outputs=outputs)
         self._exec_ctr = exec_ctr
 
+    @property
+    def size(self) -> int:
+        # without reading back any output that was spilled to disk
+        return (
+            sum(
+                sum(len(datum) for datum in output["data"].values())
+                for output in self._outputs
+            )
+            + _captured_stream_size(self._stdout)
+            + _captured_stream_size(self._stderr)
+        )
+
     def show(self, render_out_expr: bool = True) -> None:
         super().show()
         if not render_out_expr:
@@ -137,8 +323,28 @@ class CaptureOutputTee:
         self.tee_sys_stdout: Optional[Tee] = None
         self.tee_sys_stderr: Optional[Tee] = None
         self.save_display_pub: Optional[DisplayPublisher] = None
+        self.stdout_buffer: Optional[BoundedCaptureBuffer] = None
+        self.stderr_buffer: Optional[BoundedCaptureBuffer] = None
+        self.capture_display_pub: Optional[TeeCompatibleCapturingDisplayPublisher] = (
+            None
+        )
         self._in_context = False
 
+    @staticmethod
+    def default_limits() -> Tuple[int, bool]:
+        settings = flow().mut_settings
+        return settings.capture_output_limit, settings.capture_output_spill_enabled
+
+    def set_limits(self, limit: int, spill: bool) -> None:
+        """
+        Overrides the capture limits for the output being captured currently.
+        """
+        for buf in (self.stdout_buffer, self.stderr_buffer):
+            if buf is not None:
+                buf.set_limits(limit, spill)
+        if self.capture_display_pub is not None:
+            self.capture_display_pub.output_limit = limit
+
     def __enter__(self) -> CapturedIO:
         if self.display:
             self.shell = shell()
@@ -146,20 +352,23 @@ class CaptureOutputTee:
                 self.save_display_pub = None
                 self.display = False
 
+        limit, spill = self.default_limits()
         stdout = stderr = outputs = None
         if self.stdout:
-            stdout = StringIO()
+            stdout = self.stdout_buffer = BoundedCaptureBuffer(limit, spill)
             stdout_tee = Tee(self.sys_stdout, stdout)
             self.tee_sys_stdout = stdout_tee
             # sys.stdout = stdout_tee  # type: ignore
         if self.stderr:
-            stderr = StringIO()
+            stderr = self.stderr_buffer = BoundedCaptureBuffer(limit, spill)
             stderr_tee = Tee(self.sys_stderr, stderr)
             self.tee_sys_stderr = stderr_tee
             # sys.stderr = stderr_tee  # type: ignore
         if self.display and self.shell is not None:
             self.save_display_pub = self.shell.display_pub
             capture_display_pub = TeeCompatibleCapturingDisplayPublisher()
+            capture_display_pub.output_limit = limit
+            self.capture_display_pub = capture_display_pub
             outputs = capture_display_pub.outputs
             tee_display_pub = TeeDisplayPublisher(
                 self.shell.display_pub, capture_display_pub
@@ -181,9 +390,12 @@ class CaptureOutputTee:
         if self.stdout:
             # sys.stdout = self.sys_stdout
             self.tee_sys_stdout = None
+            self.stdout_buffer = None
         if self.stderr:
             # sys.stderr = self.sys_stderr
             self.tee_sys_stderr = None
+            self.stderr_buffer = None
+        self.capture_display_pub = None
         if self.display and self.shell:
             self.shell.display_pub = self.save_display_pub
 
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Delivers the call / return / exception events that the stack frame manager and
+dataflow tracer otherwise get from sys.settrace via sys.monitoring (PEP 669) on
+Python 3.12+. Code objects from files that no tracer instruments get their
+events disabled after the first hit (until the tracers or the files they
+instrument change), so library code runs at (close to) native speed instead of
+paying for a trace function on every frame.
+"""
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+from types import CodeType, FrameType
+from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Set, Tuple
+
+import pyccolo as pyc
+
+if TYPE_CHECKING:
+    from ipyflow.tracing.ipyflow_tracer import StackFrameManager
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+SYS_MONITORING_AVAILABLE = sys.version_info >= (3, 12) and hasattr(sys, "monitoring")
+
+_TOOL_NAME = "ipyflow"
+
+
+class SysMonitoringBackend:
+    def __init__(self) -> None:
+        self.tool_id: Optional[int] = None
+        self._tracers: List["StackFrameManager"] = []
+        self._prev_tracer_ids: Tuple[int, ...] = ()
+        self._thread_id: Optional[int] = None
+        self._should_dispatch_by_filename: Dict[str, bool] = {}
+        # files with code whose events got disabled since the last restart
+        self._disabled_filenames: Set[str] = set()
+        # frames that, under settrace, would not have gotten a local trace function
+        self._untraced_frames: Set[FrameType] = set()
+
+    @property
+    def is_active(self) -> bool:
+        return len(self._tracers) > 0
+
+    def _claim_tool_id(self) -> Optional[int]:
+        if self.tool_id is not None:
+            return self.tool_id
+        monitoring = sys.monitoring
+        for tool_id in (3, 4, monitoring.PROFILER_ID):
+            if monitoring.get_tool(tool_id) is None:
+                monitoring.use_tool_id(tool_id, _TOOL_NAME)
+                break
+        else:
+            logger.warning("no free sys.monitoring tool id; falling back to settrace")
+            return None
+        events = monitoring.events
+        for event, callback in [
+            (events.PY_START, self._on_py_start),
+            (events.PY_RESUME, self._on_py_start),
+            (events.PY_RETURN, self._on_py_return),
+            (events.PY_YIELD, self._on_py_return),
+            (events.RAISE, self._on_raise),
+            (events.PY_UNWIND, self._on_py_unwind),
+        ]:
+            monitoring.register_callback(tool_id, event, callback)
+        self.tool_id = tool_id
+        return tool_id
+
+    def _should_dispatch_filename(self, filename: str) -> bool:
+        return any(
+            tracer._should_instrument_file_impl(filename) for tracer in self._tracers
+        )
+
+    def _should_dispatch(self, code: CodeType) -> bool:
+        filename = code.co_filename
+        should_dispatch = self._should_dispatch_by_filename.get(filename)
+        if should_dispatch is None:
+            should_dispatch = self._should_dispatch_filename(filename)
+            self._should_dispatch_by_filename[filename] = should_dispatch
+        return should_dispatch
+
+    def _disable(self, code: CodeType) -> Any:
+        self._disabled_filenames.add(code.co_filename)
+        return sys.monitoring.DISABLE
+
+    def _should_restart_events(self, tracer_ids: Tuple[int, ...]) -> bool:
+        if tracer_ids != self._prev_tracer_ids:
+            return True
+        # e.g. a file that started getting instrumented after its code ran once
+        return any(
+            self._should_dispatch_filename(filename)
+            for filename in self._disabled_filenames
+        )
+
+    def _dispatch(self, frame: FrameType, evt: str, arg: Any) -> bool:
+        """
+        Returns whether any tracer would have installed a local trace function.
+        """
+        is_traced = False
+        # mirror the composition order of pyccolo's settrace-based tracers,
+        # where the most recently enabled tracer sees each event first
+        for tracer in reversed(self._tracers):
+            if not tracer._is_tracing_enabled:
+                continue
+            ret = tracer._sys_tracer(frame, evt, arg)
+            if isinstance(ret, tuple) and len(ret) > 1 and ret[0] is pyc.SkipAll:
+                return True
+            is_traced = is_traced or ret is not None
+        return is_traced
+
+    def _is_foreign_thread(self) -> bool:
+        # settrace hooks are per-thread, so only deliver events for the cell's thread
+        return threading.get_ident() != self._thread_id
+
+    def _on_py_start(self, code: CodeType, _offset: int) -> Any:
+        if not self._should_dispatch(code):
+            return self._disable(code)
+        if self.is_active and not self._is_foreign_thread():
+            frame = sys._getframe(1)
+            if not self._dispatch(frame, "call", None):
+                self._untraced_frames.add(frame)
+        return None
+
+    def _on_py_return(self, code: CodeType, _offset: int, retval: Any) -> Any:
+        if not self._should_dispatch(code):
+            return self._disable(code)
+        if self.is_active and not self._is_foreign_thread():
+            frame = sys._getframe(1)
+            if frame in self._untraced_frames:
+                self._untraced_frames.discard(frame)
+            else:
+                self._dispatch(frame, "return", retval)
+        return None
+
+    def _on_raise(self, code: CodeType, _offset: int, exc: BaseException) -> None:
+        if not self.is_active or self._is_foreign_thread():
+            return
+        frame = sys._getframe(1)
+        if self._should_dispatch(code) and frame not in self._untraced_frames:
+            self._dispatch(frame, "exception", (type(exc), exc, exc.__traceback__))
+
+    def _on_py_unwind(self, code: CodeType, _offset: int, exc: BaseException) -> None:
+        if not self.is_active or self._is_foreign_thread():
+            return
+        frame = sys._getframe(1)
+        if frame in self._untraced_frames:
+            self._untraced_frames.discard(frame)
+        elif self._should_dispatch(code):
+            # settrace reports a frame exited via an exception as returning None
+            self._dispatch(frame, "return", None)
+        caller = frame.f_back
+        if (
+            caller is not None
+            and caller not in self._untraced_frames
+            and self._should_dispatch(caller.f_code)
+        ):
+            # ...and also reports the exception again in the frame it propagates to
+            self._dispatch(caller, "exception", (type(exc), exc, exc.__traceback__))
+
+    @contextmanager
+    def dispatching_to(
+        self, tracers: List["StackFrameManager"]
+    ) -> Generator[None, None, None]:
+        tool_id = self._claim_tool_id()
+        if tool_id is None or self.is_active:
+            yield
+            return
+        monitoring = sys.monitoring
+        events = monitoring.events
+        self._should_dispatch_by_filename.clear()
+        self._thread_id = threading.get_ident()
+        self._tracers = list(tracers)
+        tracer_ids = tuple(id(tracer) for tracer in tracers)
+        if self._should_restart_events(tracer_ids):
+            # code disabled for the previous set of instrumented files may be
+            # relevant now
+            self._prev_tracer_ids = tracer_ids
+            self._disabled_filenames.clear()
+            monitoring.restart_events()
+        for tracer in tracers:
+            tracer.sys_events_via_monitoring = True
+        monitoring.set_events(
+            tool_id,
+            events.PY_START
+            | events.PY_RESUME
+            | events.PY_RETURN
+            | events.PY_YIELD
+            | events.RAISE
+            | events.PY_UNWIND,
+        )
+        try:
+            yield
+        finally:
+            monitoring.set_events(tool_id, events.NO_EVENTS)
+            for tracer in tracers:
+                tracer.sys_events_via_monitoring = False
+            self._tracers = []
+            self._thread_id = None
+            self._untraced_frames.clear()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Thread-aware event emission for instrumented code. Notebook functions that run
+on threads other than the one executing the cell (thread pools, joblib's
+threading backend, callbacks from background threads) skip tracing after a
+single thread-identity check, and instead record a coarse "function F ran and
+may have mutated its arguments" effect that gets merged into the dataflow
+graph at the next statement boundary on the cell's thread.
+"""
+import inspect
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from types import CodeType, FrameType
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import pyccolo.emit_event as pyc_emit_event
+from pyccolo.trace_events import TraceEvent
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_FUNCTION_BODY_EVENTS = frozenset(
+    {TraceEvent.before_function_body.value, TraceEvent.before_lambda_body.value}
+)
+
+
+def _get_arg_obj_ids(frame: FrameType) -> Tuple[int, ...]:
+    code = frame.f_code
+    num_args = code.co_argcount + code.co_kwonlyargcount
+    has_varargs = bool(code.co_flags & inspect.CO_VARARGS)
+    has_varkw = bool(code.co_flags & inspect.CO_VARKEYWORDS)
+    f_locals = frame.f_locals
+    obj_ids = []
+    for idx, name in enumerate(code.co_varnames[: num_args + has_varargs + has_varkw]):
+        if name not in f_locals:
+            continue
+        obj = f_locals[name]
+        if idx < num_args:
+            obj_ids.append(id(obj))
+        elif has_varargs and idx == num_args:
+            obj_ids.extend(id(arg) for arg in obj)
+        else:
+            obj_ids.extend(id(kwarg) for kwarg in obj.values())
+    return tuple(obj_ids)
+
+
+class WorkerThreadCall(NamedTuple):
+    function_id: int
+    code: CodeType
+    arg_obj_ids: Tuple[int, ...]
+
+
+class WorkerThreadEffects:
+    def __init__(self) -> None:
+        self.tracing_thread_id: Optional[int] = None
+        self.num_worker_calls = 0
+        # deque appends / pops are atomic, so workers never need to take a lock
+        self._pending: Deque[WorkerThreadCall] = deque()
+        # dedupes repeated calls (e.g. from a thread pool map) between merges
+        self._seen: Dict[WorkerThreadCall, None] = {}
+
+    @property
+    def has_pending(self) -> bool:
+        return len(self._pending) > 0
+
+    def record_call(self, function_id: int, frame: FrameType) -> None:
+        self.num_worker_calls += 1
+        call = WorkerThreadCall(function_id, frame.f_code, _get_arg_obj_ids(frame))
+        if call in self._seen:
+            return
+        self._seen[call] = None
+        self._pending.append(call)
+
+    def drain(self) -> List[WorkerThreadCall]:
+        calls = []
+        while len(self._pending) > 0:
+            calls.append(self._pending.popleft())
+        self._seen.clear()
+        return calls
+
+    def _handle_event_for_worker(
+        self, event: str, node_id: int, frame: FrameType, kwargs: Dict[str, Any]
+    ) -> None:
+        if event in _FUNCTION_BODY_EVENTS:
+            try:
+                self.record_call(node_id, frame)
+            except Exception:
+                logger.exception("unable to record call from worker thread")
+            # select the uninstrumented copy of the function body
+            kwargs["ret"] = False
+
+    def make_tracer_loop(self, orig_tracer_loop: Callable[..., None]) -> Any:
+        """
+        Wraps the loop that pyccolo's ``_emit_event`` uses to dispatch each event
+        to the active tracers (after it has resolved the instrumented frame), so
+        that events from threads other than the tracing one skip the tracers.
+        """
+        get_ident = threading.get_ident
+        tracing_thread_id = self.tracing_thread_id
+        handle_for_worker = self._handle_event_for_worker
+
+        def emit_tracer_loop(event, node_id, frame, kwargs):
+            if get_ident() == tracing_thread_id:
+                orig_tracer_loop(event, node_id, frame, kwargs)
+            else:
+                handle_for_worker(event, node_id, frame, kwargs)
+
+        return emit_tracer_loop
+
+    @contextmanager
+    def patching_tracer_loop(self) -> Generator[None, None, None]:
+        orig_tracer_loop = pyc_emit_event._emit_tracer_loop
+        self.tracing_thread_id = threading.get_ident()
+        pyc_emit_event._emit_tracer_loop = self.make_tracer_loop(orig_tracer_loop)
+        try:
+            yield
+        finally:
+            pyc_emit_event._emit_tracer_loop = orig_tracer_loop
+            self.tracing_thread_id = None
@@ -69,6 +69,10 @@ def input_transformer_context(transformers) -> Generator[None, None, None]:
         yield
 
 
+def is_executing_cell() -> bool:
+    return _IPY.cell_counter is not None
+
+
 def cell_counter() -> int:
     if _IPY.cell_counter is None:
         raise ValueError("should be inside context manager here")
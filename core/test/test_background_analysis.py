@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import make_flow_fixture
+from typing import Dict, Set
+
+from ipyflow.config import FlowDirection
+from ipyflow.data_model.cell import cells
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test; cells in any-order
+# flows always get analyzed on the main thread
+_flow_fixture, run_cell = make_flow_fixture(
+    background_static_analysis_enabled=True, flow_direction=FlowDirection.IN_ORDER
+)
+
+
+def _notify_content_changed(content_by_cell_id: Dict[int, str]) -> None:
+    flow().comm_manager.handle_notify_content_changed(
+        {
+            "cell_metadata_by_id": {
+                cell_id: {"type": "code", "index": idx, "content": content}
+                for idx, (cell_id, content) in enumerate(content_by_cell_id.items())
+            }
+        }
+    )
+
+
+def _join() -> bool:
+    return flow().comm_manager.join_static_analyses(wait=True)
+
+
+def _live_names(cell_id: int) -> Set[str]:
+    result = cells().from_id(cell_id).last_check_result
+    assert result is not None
+    return {resolved.sym.readable_name for resolved in result.live}
+
+
+def _dead_names(cell_id: int) -> Set[str]:
+    result = cells().from_id(cell_id).last_check_result
+    assert result is not None
+    return {sym.readable_name for sym in result.dead}
+
+
+def test_edited_cell_analyzed_in_background():
+    run_cell("x = 0", 1)
+    run_cell("y = 1", 2)
+    run_cell("z = x + 1", 3)
+    _notify_content_changed({1: "x = 0", 2: "y = 1", 3: "z = x + y"})
+    _join()
+    assert cells().from_id(3).current_content == "z = x + y"
+    assert _live_names(3) == {"x", "y"}
+    assert flow().comm_manager.static_analyzer.num_submitted == 1
+
+
+def test_background_analysis_matches_synchronous_analysis():
+    content_by_cell_id = {
+        1: "lst = [1, 2, 3]",
+        2: "def f(v):\n    return v + len(lst)",
+        3: "w = 5",
+        4: "import math\nfor v in lst:\n    w += f(v) * math.pi\nq = [v for v in lst if v > w]",
+    }
+    for cell_id in range(1, 4):
+        run_cell(content_by_cell_id[cell_id], cell_id)
+    run_cell("q = 0", 4)
+    _notify_content_changed(content_by_cell_id)
+    _join()
+    background_live = _live_names(4)
+    flow().mut_settings.background_static_analysis_enabled = False
+    _notify_content_changed({**content_by_cell_id, 4: "q = w"})
+    _notify_content_changed(content_by_cell_id)
+    assert not flow().comm_manager.static_analyzer.has_pending
+    assert _live_names(4) == background_live
+    assert {"lst", "f", "w"} <= background_live
+
+
+def test_name_subscripts_analyzed_with_global_scope():
+    content_by_cell_id = {
+        1: 'd = {}\nd["a"] = 1\nd["b"] = 2',
+        2: 'k = "a"',
+        3: "d[k] = 5",
+    }
+    run_cell(content_by_cell_id[1], 1)
+    run_cell(content_by_cell_id[2], 2)
+    run_cell("z = 0", 3)
+    _notify_content_changed(content_by_cell_id)
+    _join()
+    assert cells().from_id(3).current_content == "d[k] = 5"
+    # `d[k]` only resolves to `d["a"]` given the value of `k` in the global scope
+    assert "d[a]" in _dead_names(3)
+    assert _live_names(3) == {"d", "k"}
+
+
+def test_stale_background_analysis_is_superseded():
+    run_cell("x = 0", 1)
+    run_cell("y = x", 2)
+    comm_manager = flow().comm_manager
+    for content in ["y = x + 1", "y = x + 2", "y = 42"]:
+        _notify_content_changed({1: "x = 0", 2: content})
+    _join()
+    assert comm_manager.static_analyzer.num_submitted >= 1
+    assert cells().from_id(2).current_content == "y = 42"
+    assert _live_names(2) == set()
+    assert not comm_manager.static_analyzer.has_pending
+
+
+def test_background_analysis_joined_before_next_execution():
+    run_cell("x = 0", 1)
+    run_cell("y = 1", 2)
+    run_cell("z = x", 3)
+    _notify_content_changed({1: "x = 0", 2: "y = 1", 3: "z = y"})
+    run_cell("y = 2", 2)
+    assert not flow().comm_manager.static_analyzer.has_pending
+    assert flow().check_and_link_multiple_cells().ready_cells == {3}
+
+
+def test_edited_cell_analyzed_synchronously_when_disabled():
+    flow().mut_settings.background_static_analysis_enabled = False
+    run_cell("x = 0", 1)
+    run_cell("y = 1", 2)
+    _notify_content_changed({1: "x = 0", 2: "y = x + 1"})
+    assert flow().comm_manager.static_analyzer.num_submitted == 0
+    assert _live_names(2) == {"x"}
+
+
+def test_augmented_syntax_analyzed_synchronously():
+    run_cell("x = 0", 1)
+    run_cell("y = 1", 2)
+    _notify_content_changed({1: "x = 0", 2: "y = $x + 1"})
+    assert cells().from_id(2).current_content == "y = $x + 1"
+    assert flow().comm_manager.static_analyzer.num_submitted == 0
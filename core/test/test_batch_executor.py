@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import logging
+import sys
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+from typing import Any, Callable, Dict, List
+
+from ipyflow.config import ExecutionMode
+from ipyflow.singletons import flow, shell
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(kernel_batch_execution_enabled=True)
+
+
+class _ManualIOLoop:
+    def __init__(self) -> None:
+        self.callbacks: List[Callable[[], None]] = []
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        self.callbacks.append(callback)
+
+    def run_one(self) -> None:
+        self.callbacks.pop(0)()
+
+
+def _metadata(content_by_cell_id: Dict[int, str]) -> Dict[int, Dict[str, Any]]:
+    return {
+        cell_id: {"type": "code", "index": cell_id, "content": content}
+        for cell_id, content in content_by_cell_id.items()
+    }
+
+
+def _execute_closure(cell_ids: List[int], content_by_cell_id: Dict[int, str]):
+    flow().mut_settings.exec_mode = ExecutionMode.REACTIVE
+    return flow().comm_manager.handle_execute_closure(
+        {"cell_ids": cell_ids, "cell_metadata_by_id": _metadata(content_by_cell_id)}
+    )
+
+
+def _run_cells(content_by_cell_id: Dict[int, str]) -> Dict[int, str]:
+    for cell_id, content in content_by_cell_id.items():
+        run_cell(content, cell_id)
+    return content_by_cell_id
+
+
+def test_closure_runs_in_one_request():
+    content_by_cell_id = _run_cells(
+        {1: "x = 0", 2: "y = x + 1", 3: "z = y + 1", 4: "w = 5"}
+    )
+    content_by_cell_id[1] = "x = 10"
+    run_cell(content_by_cell_id[1], 1)
+    response = _execute_closure([2], content_by_cell_id)
+    assert response["batch_executed_cells"] == [2, 3]
+    assert response["batch_cancelled_cells"] == []
+    assert lookup_symbol_by_name("y").obj == 11
+    assert lookup_symbol_by_name("z").obj == 12
+    assert set(response["ready_cells"]) == set()
+    assert not flow().comm_manager.batch_executor.is_active
+    assert not shell().keep_tracing_warm
+
+
+def test_newly_ready_cells_picked_up_from_schedule():
+    content_by_cell_id = _run_cells({1: "x = 0", 2: "y = x + 1", 3: "z = y + 1"})
+    content_by_cell_id[1] = "x = 10"
+    run_cell(content_by_cell_id[1], 1)
+    response = _execute_closure([], content_by_cell_id)
+    assert response["batch_executed_cells"] == [2, 3]
+    assert lookup_symbol_by_name("z").obj == 12
+
+
+def test_memoized_cells_rerun_to_restore_matching_outputs():
+    content_by_cell_id = _run_cells({1: "x = 0", 2: "%%memoize\ny = x + 1"})
+    run_cell("x = 1", 1)
+    run_cell(content_by_cell_id[2], 2)
+    assert lookup_symbol_by_name("y").obj == 2
+    run_cell(content_by_cell_id[1], 1)
+    response = _execute_closure([], content_by_cell_id)
+    assert response["batch_executed_cells"] == [2]
+    assert lookup_symbol_by_name("y").obj == 1
+
+
+def test_any_order_closure_runs_in_topological_order():
+    content_by_cell_id = _run_cells({3: "x = 0", 2: "y = x + 1", 1: "z = y + 1"})
+    content_by_cell_id[3] = "x = 5"
+    run_cell(content_by_cell_id[3], 3)
+    response = _execute_closure([2], content_by_cell_id)
+    assert response["batch_executed_cells"] == [2, 1]
+    assert lookup_symbol_by_name("z").obj == 7
+
+
+def test_error_cancels_remaining_cascade():
+    content_by_cell_id = _run_cells({1: "x = 1", 2: "y = 1 / x", 3: "z = y + 1"})
+    content_by_cell_id[1] = "x = 0"
+    run_cell(content_by_cell_id[1], 1)
+    try:
+        response = _execute_closure([2], content_by_cell_id)
+    finally:
+        sys.last_value = None
+        sys.last_traceback = None
+    assert response["batch_executed_cells"] == [2]
+    assert response["batch_cancelled_cells"] == [3]
+    assert response["last_execution_was_error"]
+    assert lookup_symbol_by_name("z").obj == 2
+
+
+def test_edits_cancel_remaining_cascade():
+    content_by_cell_id = _run_cells(
+        {1: "x = 0", 2: "y = x + 1", 3: "z = y + 1", 4: "w = 5"}
+    )
+    content_by_cell_id[1] = "x = 10"
+    run_cell(content_by_cell_id[1], 1)
+    comm_manager = flow().comm_manager
+    io_loop = comm_manager._io_loop = _ManualIOLoop()
+    try:
+        assert _execute_closure([2], content_by_cell_id) is comm_manager.NO_RESPONSE
+        io_loop.run_one()
+        comm_manager.handle_notify_content_changed(
+            {"cell_metadata_by_id": _metadata({**content_by_cell_id, 4: "w = 6"})}
+        )
+        io_loop.run_one()
+    finally:
+        comm_manager._io_loop = None
+    assert len(io_loop.callbacks) == 0
+    assert comm_manager.batch_executor.executed_cell_ids == [2]
+    assert comm_manager.batch_executor.cancelled_cell_ids == [3]
+    assert lookup_symbol_by_name("z").obj == 2
+
+
+def test_external_execution_preempts_cascade():
+    content_by_cell_id = _run_cells({1: "x = 0", 2: "y = x + 1", 3: "z = y + 1"})
+    content_by_cell_id[1] = "x = 10"
+    run_cell(content_by_cell_id[1], 1)
+    comm_manager = flow().comm_manager
+    io_loop = comm_manager._io_loop = _ManualIOLoop()
+    try:
+        _execute_closure([2], content_by_cell_id)
+        io_loop.run_one()
+        run_cell("q = 1", 4)
+        io_loop.run_one()
+    finally:
+        comm_manager._io_loop = None
+    assert comm_manager.batch_executor.executed_cell_ids == [2]
+    assert comm_manager.batch_executor.cancelled_cell_ids == [3]
+
+
+def test_kernel_batch_execution_can_be_disabled():
+    flow().mut_settings.kernel_batch_execution_enabled = False
+    content_by_cell_id = _run_cells({1: "x = 0", 2: "y = x + 1"})
+    response = _execute_closure([2], content_by_cell_id)
+    assert not response["success"]
+    assert flow().comm_manager.batch_executor.num_batches == 0
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import make_flow_fixture
+
+from ipyflow.config import ExecutionSchedule, FlowDirection
+from ipyflow.data_model.cell_graph import CellGraphIndex
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+def test_reachability_and_components():
+    graph = CellGraphIndex({1: [2], 2: [3, 4], 3: [2], 5: []}, cell_ids=[6])
+    assert len(graph) == 6
+    assert graph.reachable([1]) == {1, 2, 3, 4}
+    assert graph.reachable([1], inclusive=False) == {2, 3, 4}
+    assert graph.reachable([2], inclusive=False) == {2, 3, 4}
+    assert graph.reachable([4, 7]) == {4, 7}
+    components = [set(component) for component in graph.components]
+    assert {2, 3} in components
+    assert components.index({1}) < components.index({2, 3}) < components.index({4})
+
+
+def test_topological_order_breaks_ties_and_cycles_by_key():
+    graph = CellGraphIndex({3: [2], 2: [1], 4: [5], 5: [4]})
+    assert graph.topological_order([1, 2, 3, 6], key=lambda cid: cid) == [3, 2, 1, 6]
+    assert graph.topological_order([1, 2, 4, 5], key=lambda cid: cid) == [2, 1, 4, 5]
+    assert graph.topological_order([3, 1], key=lambda cid: cid) == [1, 3]
+
+
+def test_deep_graph_does_not_recurse():
+    num_cells = 10**4
+    graph = CellGraphIndex({idx: [idx + 1] for idx in range(num_cells)})
+    assert len(graph.reachable([0])) == num_cells + 1
+    assert len(graph.components) == num_cells + 1
+
+
+def test_exec_schedule_ships_only_direct_edges():
+    run_cell("x = 0", 1)
+    run_cell("y = x + 1", 2)
+    run_cell("z = y + 1", 3)
+    run_cell("w = 5", 4)
+    exec_schedule = flow().check_and_link_multiple_cells().to_json()
+    assert "cell_descendants" not in exec_schedule
+    assert exec_schedule["cell_children"] == {1: [2], 2: [3], 3: [], 4: []}
+
+
+def test_dag_waiters_propagate_transitively():
+    flow().mut_settings.exec_schedule = ExecutionSchedule.DAG_BASED
+    flow().mut_settings.flow_order = FlowDirection.IN_ORDER
+    run_cell("x = 0", 1)
+    run_cell("y = x + 1", 2)
+    run_cell("z = y + 1", 3)
+    run_cell("w = z + 1", 4)
+    run_cell("x = 42", 1)
+    result = flow().check_and_link_multiple_cells()
+    assert result.ready_cells == {2}
+    assert result.waiting_cells == {3, 4}
+    assert result.waiter_links[4] == {2}
+    assert result.ready_maker_links[2] == {3, 4}
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import logging
+import sys
+import threading
+from test.utils import make_flow_fixture
+
+import pytest
+
+from ipyflow.data_model.cell import cells
+from ipyflow.singletons import flow, shell
+
+logging.basicConfig(level=logging.ERROR)
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="fork checkpoints need linux"
+)
+
+
+def _clear_checkpoints():
+    yield
+    flow().checkpoints.clear()
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(
+    fork_checkpoints_enabled=True,
+    fork_checkpoint_min_cost=0.0,
+    extra_fixture=_clear_checkpoints,
+)
+
+
+def test_restore_namespace_to_before_cell():
+    run_cell("x = [1, 2]")
+    run_cell("y = len(x)")
+    ctr = cells().exec_counter() + 1
+    run_cell("x.append(3)")
+    run_cell("z = 42")
+    assert shell().user_ns["x"] == [1, 2, 3]
+    run_cell(f"%flow checkpoint restore {ctr}")
+    assert shell().user_ns["x"] == [1, 2]
+    assert "z" not in shell().user_ns
+    assert "z" not in flow().global_scope
+    # the rollback is an ordinary update as far as the dataflow graph goes
+    assert flow().global_scope["x"].timestamp.cell_num == cells().exec_counter()
+    run_cell("w = x + [4]")
+    assert shell().user_ns["w"] == [1, 2, 4]
+
+
+def test_restore_preserves_aliasing():
+    run_cell("a = [1]")
+    run_cell("b = a")
+    ctr = cells().exec_counter() + 1
+    run_cell("a = [2]")
+    run_cell(f"%flow checkpoint restore {ctr}")
+    user_ns = shell().user_ns
+    assert user_ns["a"] is user_ns["b"]
+    b_ts = flow().global_scope["b"].timestamp
+    run_cell("a.append(3)")
+    assert user_ns["b"] == [1, 3]
+    assert flow().global_scope["b"].timestamp > b_ts
+
+
+def test_checkpoint_budget_evicts_cheapest():
+    flow().mut_settings.fork_checkpoint_budget = 2
+    for idx in range(5):
+        run_cell(f"v{idx} = {idx}")
+    manager = flow().checkpoints
+    assert len(manager.checkpoints) == 2
+    assert manager.num_evictions > 0
+    assert manager.checkpoints[-1].cell_ctr == cells().exec_counter()
+
+
+def test_static_analysis_workers_joined_before_fork():
+    analyzer = flow().comm_manager.static_analyzer
+    run_cell("x = 0")
+    analyzer.submit("edited", "a = b + 1", "a = b + 1", 0)
+    run_cell("y = 0")
+    assert analyzer._executor is None
+    assert not any(
+        thread.name.startswith("ipyflow-static-analysis")
+        for thread in threading.enumerate()
+    )
+    # workers start back up for the next edit
+    analyzer.submit("edited", "a = b + 2", "a = b + 2", 0)
+    analyzer.wait()
+    assert analyzer._executor is not None
+    assert len(flow().checkpoints.checkpoints) > 0
+    flow().checkpoints.clear()
+    assert not flow().checkpoints._is_clear_registered_atexit
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import make_flow_fixture
+from typing import Any, Callable, Dict, List
+
+from ipyflow.comm_queue import CommRequestQueue
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+class _ManualIoLoop:
+    def __init__(self) -> None:
+        self.callbacks: List[Callable[[], None]] = []
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        self.callbacks.append(callback)
+
+    def run(self) -> None:
+        while len(self.callbacks) > 0:
+            self.callbacks.pop(0)()
+
+
+class _RecordingComm:
+    def __init__(self) -> None:
+        self.sent: List[Dict[str, Any]] = []
+
+    def send(self, msg: Dict[str, Any]) -> None:
+        self.sent.append(msg)
+
+
+def _pop_types(queue: CommRequestQueue) -> List[str]:
+    types = []
+    while True:
+        entry = queue.pop()
+        if entry is None:
+            return types
+        types.append(entry.request["type"])
+
+
+def test_interactive_requests_jump_the_queue():
+    queue = CommRequestQueue()
+    queue.push({"type": "compute_exec_schedule"})
+    queue.push({"type": "upsert_symbol"})
+    queue.push({"type": "get_code"})
+    queue.push({"type": "change_active_cell"})
+    assert _pop_types(queue) == [
+        "get_code",
+        "change_active_cell",
+        "upsert_symbol",
+        "compute_exec_schedule",
+    ]
+
+
+def test_superseded_requests_are_coalesced():
+    queue = CommRequestQueue()
+    queue.push({"type": "notify_content_changed", "version": 1})
+    queue.push({"type": "refresh_symbols", "symbols": ["a", "b"]})
+    queue.push({"type": "notify_content_changed", "version": 2})
+    queue.push({"type": "refresh_symbols", "symbols": ["b", "c"]})
+    assert len(queue) == 2
+    first = queue.pop()
+    assert first.request == {"type": "notify_content_changed", "version": 2}
+    assert queue.pop().request["symbols"] == ["a", "b", "c"]
+    assert queue.pop() is None
+    # once popped, a request of the same type queues up anew
+    queue.push({"type": "notify_content_changed", "version": 3})
+    assert len(queue) == 1
+    metrics = queue.latency_metrics()
+    assert metrics["notify_content_changed"]["count"] == 1
+    assert metrics["notify_content_changed"]["num_superseded"] == 1
+    assert metrics["refresh_symbols"]["num_superseded"] == 1
+
+
+def test_flood_handled_from_io_loop():
+    run_cell("x = 0", 1)
+    comm_manager = flow().comm_manager
+    io_loop = _ManualIoLoop()
+    comm = _RecordingComm()
+    comm_manager._io_loop = io_loop
+    try:
+        for _ in range(10):
+            comm_manager.enqueue({"type": "compute_exec_schedule"}, comm=comm)
+        comm_manager.enqueue({"type": "get_code", "symbol": "x"}, comm=comm)
+        assert comm.sent == []
+        io_loop.run()
+    finally:
+        comm_manager._io_loop = None
+    assert [msg["type"] for msg in comm.sent] == ["get_code", "compute_exec_schedule"]
+    assert len(comm_manager.request_queue) == 0
@@ -2,19 +2,32 @@
 import logging
 import os
 import sys
+import types
 from test.utils import (
     clear_registered_annotations,
     lookup_symbol_by_name,
     make_flow_fixture,
 )
 
-from ipyflow.annotations import register_annotations_directory
+from ipyflow.annotations import compiler, register_annotations_directory
 from ipyflow.annotations.compiler import (
+    ANNOTATIONS_CACHE_DIR_ENV_VAR,
     REGISTERED_CLASS_SPECS,
     REGISTERED_FUNCTION_SPECS,
     compile_and_register_handlers_for_module,
+    register_annotations_file,
+)
+from ipyflow.tracing.external_calls.base_handlers import (
+    MODULES_PENDING_HANDLER_COMPILATION,
+    REGISTERED_HANDLER_BY_FUNCTION,
+    REGISTERED_HANDLER_BY_METHOD,
+    CallerMutation,
+    NoopCallHandler,
+    defer_handler_compilation_for_module,
+    invalidate_method_handler_dispatch_table,
+    register_method_handler,
+    resolve_method_handler,
 )
-from ipyflow.tracing.external_calls.base_handlers import REGISTERED_HANDLER_BY_FUNCTION
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -97,6 +110,109 @@ def _test_annotation_registration():
         assert fun in REGISTERED_HANDLER_BY_FUNCTION, "%s not in there" % fun
 
 
+def test_handlers_compiled_lazily_on_first_call():
+    import fakelib
+
+    with clear_registered_annotations():
+        register_annotations_directory(os.path.dirname(__file__))
+        assert fakelib.__name__ in MODULES_PENDING_HANDLER_COMPILATION
+        assert fakelib.fun_for_testing_kwarg not in REGISTERED_HANDLER_BY_FUNCTION
+        run_cell("lst = []")
+        lst_sym = lookup_symbol_by_name("lst")
+        ts0 = lst_sym.timestamp
+        run_cell("import fakelib; fakelib.fun_for_testing_kwarg(None, lst)")
+        assert lst_sym.timestamp > ts0
+        assert fakelib.__name__ not in MODULES_PENDING_HANDLER_COMPILATION
+        assert fakelib.fun_for_testing_kwarg in REGISTERED_HANDLER_BY_FUNCTION
+
+
+def test_lookup_miss_only_compiles_callee_modules():
+    import fakelib
+
+    with clear_registered_annotations():
+        register_annotations_directory(os.path.dirname(__file__))
+        assert fakelib.__name__ in MODULES_PENDING_HANDLER_COMPILATION
+        run_cell("import math; y = math.floor(1.5)")
+        assert fakelib.__name__ in MODULES_PENDING_HANDLER_COMPILATION
+        run_cell("import fakelib; obj = fakelib.Foo()")
+        assert fakelib.__name__ not in MODULES_PENDING_HANDLER_COMPILATION
+
+
+def test_only_annotated_modules_deferred():
+    import fakelib
+
+    unannotated = types.ModuleType("module_without_annotations_for_testing")
+    with clear_registered_annotations():
+        register_annotations_directory(os.path.dirname(__file__))
+        defer_handler_compilation_for_module(unannotated)
+        defer_handler_compilation_for_module(fakelib)
+        assert unannotated.__name__ not in MODULES_PENDING_HANDLER_COMPILATION
+        assert fakelib.__name__ in MODULES_PENDING_HANDLER_COMPILATION
+
+
+def test_parsed_specs_cached_by_file_hash(tmp_path, monkeypatch):
+    monkeypatch.setenv(ANNOTATIONS_CACHE_DIR_ENV_VAR, str(tmp_path))
+    stub_filename = os.path.join(os.path.dirname(__file__), "fakelib.pyi")
+    with clear_registered_annotations():
+        modules = register_annotations_file(stub_filename)
+        assert len(os.listdir(tmp_path)) == 1
+        function_specs = dict(REGISTERED_FUNCTION_SPECS)
+        class_specs = dict(REGISTERED_CLASS_SPECS)
+    with clear_registered_annotations():
+
+        def _should_not_parse(*_, **__):
+            raise AssertionError("expected specs to come from the cache")
+
+        monkeypatch.setattr(compiler, "_collect_specs_from_source", _should_not_parse)
+        assert register_annotations_file(stub_filename) == modules
+        assert REGISTERED_FUNCTION_SPECS == function_specs
+        assert REGISTERED_CLASS_SPECS == class_specs
+
+
+def test_spec_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv(ANNOTATIONS_CACHE_DIR_ENV_VAR, raising=False)
+    assert compiler._spec_cache_path("", "fakelib.pyi") is None
+
+
+def test_method_handlers_resolved_through_mro_once_per_type():
+    class Base:
+        def fit(self):
+            pass
+
+    class Sub(Base):
+        pass
+
+    class SubSub(Sub):
+        pass
+
+    mro_walks = []
+
+    class CountingMeta(type):
+        def mro(cls):
+            mro_walks.append(cls)
+            return super().mro()
+
+    class Counted(SubSub, metaclass=CountingMeta):
+        pass
+
+    register_method_handler(Base, "fit", CallerMutation)
+    try:
+        assert resolve_method_handler(SubSub, "fit") == (CallerMutation, Base)
+        assert resolve_method_handler(SubSub, "predict") == (None, None)
+        del mro_walks[:]
+        for _ in range(3):
+            assert resolve_method_handler(Counted, "fit") == (CallerMutation, Base)
+        assert mro_walks == [Counted]
+        # registering a handler lower in the mro invalidates the cached entries
+        register_method_handler(Sub, "fit", NoopCallHandler)
+        assert resolve_method_handler(SubSub, "fit") == (NoopCallHandler, Sub)
+        assert resolve_method_handler(Base, "fit") == (CallerMutation, Base)
+    finally:
+        REGISTERED_HANDLER_BY_METHOD.pop((Base, "fit"), None)
+        REGISTERED_HANDLER_BY_METHOD.pop((Sub, "fit"), None)
+        invalidate_method_handler_dispatch_table()
+
+
 def test_mutation_by_kwarg():
     run_cell("lst = []")
     lst_sym = lookup_symbol_by_name("lst")
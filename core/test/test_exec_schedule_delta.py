@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import make_flow_fixture
+from typing import Any, Dict, List
+
+from ipyflow.frontend import apply_exec_schedule_delta, diff_exec_schedules
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+class _RecordingComm:
+    def __init__(self) -> None:
+        self.sent: List[Dict[str, Any]] = []
+
+    def send(self, msg: Dict[str, Any]) -> None:
+        self.sent.append(msg)
+
+
+_CELL_CONTENTS = {1: "x = 0", 2: "y = x + 1", 3: "z = y + 1"}
+
+
+def _request(ack_revision=None, **kwargs) -> Dict[str, Any]:
+    return {
+        "type": "compute_exec_schedule",
+        "cell_metadata_by_id": {
+            cell_id: {"type": "code", "index": cell_id, "content": content}
+            for cell_id, content in _CELL_CONTENTS.items()
+        },
+        "exec_schedule_deltas": True,
+        "ack_revision": ack_revision,
+        **kwargs,
+    }
+
+
+def _strip_meta(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value
+        for key, value in schedule.items()
+        if key not in ("revision", "base_revision", "is_delta")
+    }
+
+
+def test_diff_round_trips():
+    prev = {"a": [1], "b": {"1": [2], "2": [3]}, "c": 4, "gone": True}
+    cur = {"a": [1], "b": {"1": [2, 5], "3": []}, "c": 5, "new": None}
+    delta = diff_exec_schedules(prev, cur)
+    assert delta == {
+        "changed": {"c": 5, "new": None},
+        "patched": {"b": {"changed": {"1": [2, 5], "3": []}, "removed": ["2"]}},
+        "removed": ["gone"],
+    }
+    assert apply_exec_schedule_delta(prev, delta) == cur
+
+
+def test_exec_schedules_sent_as_deltas_after_first():
+    for cell_id, content in _CELL_CONTENTS.items():
+        run_cell(content, cell_id)
+    comm_manager = flow().comm_manager
+    comm = _RecordingComm()
+    comm_manager.handle(_request(), comm=comm)
+    first = comm.sent[-1]
+    assert not first["is_delta"]
+    assert "waiting_cells" in first
+    run_cell("x = 42", 1)
+    comm_manager.handle(_request(ack_revision=first["revision"]), comm=comm)
+    delta = comm.sent[-1]
+    assert delta["is_delta"]
+    assert delta["base_revision"] == first["revision"]
+    assert "settings" not in delta["changed"]
+    assert len(delta["changed"]) + len(delta["patched"]) < len(first)
+    # the patched state matches what a full snapshot would have been
+    comm_manager.handle(_request(full_snapshot=True), comm=comm)
+    full = comm.sent[-1]
+    assert not full["is_delta"]
+    assert _strip_meta(apply_exec_schedule_delta(first, delta)) == _strip_meta(full)
+
+
+def test_full_snapshot_after_frontend_loses_state():
+    run_cell("x = 0", 1)
+    comm_manager = flow().comm_manager
+    comm = _RecordingComm()
+    comm_manager.handle(_request(), comm=comm)
+    revision = comm.sent[-1]["revision"]
+    comm_manager.handle(_request(ack_revision=revision), comm=comm)
+    assert comm.sent[-1]["is_delta"]
+    comm_manager.handle(_request(ack_revision=None), comm=comm)
+    assert not comm.sent[-1]["is_delta"]
+    comm_manager.handle(
+        _request(ack_revision=comm.sent[-1]["revision"], full_snapshot=True),
+        comm=comm,
+    )
+    assert not comm.sent[-1]["is_delta"]
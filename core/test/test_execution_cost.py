@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import make_flow_fixture
+from typing import Any, Dict
+
+from ipyflow.config import ExecutionMode
+from ipyflow.data_model.cell import cells
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(
+    setup_stmts=["import time"],
+    exec_mode=ExecutionMode.REACTIVE,
+    kernel_batch_execution_enabled=True,
+)
+
+
+def _exec_schedule() -> Dict[str, Any]:
+    return flow().check_and_link_multiple_cells().to_json()
+
+
+def _run_slow_chain() -> None:
+    run_cell("x = 0", 1)
+    run_cell("time.sleep(0.05)\ny = x + 1", 2)
+    run_cell("z = y + 1", 3)
+    run_cell("x = 1", 1)
+
+
+def test_execution_cost_recorded_per_execution():
+    run_cell("time.sleep(0.05)", 1)
+    first_cost = cells().from_id(1).execution_cost
+    assert first_cost is not None
+    assert first_cost.wall_time >= 0.05
+    assert first_cost.cpu_time >= 0
+    run_cell("x = 42", 1)
+    cell = cells().from_id(1)
+    assert cell.execution_cost.wall_time < first_cost.wall_time
+    assert cell.prev_cell.execution_cost == first_cost
+
+
+def test_cascade_cost_included_in_exec_schedule():
+    _run_slow_chain()
+    exec_schedule = _exec_schedule()
+    assert exec_schedule["cascade_cost_by_cell"].keys() == {2, 3}
+    assert exec_schedule["cascade_cost_by_cell"][2] >= 0.05
+    assert exec_schedule["cascade_cost"] >= 0.05
+    assert not exec_schedule["cascade_paused"]
+
+
+def test_cascade_above_budget_paused():
+    flow().mut_settings.reactive_cost_budget = 0.01
+    _run_slow_chain()
+    exec_schedule = _exec_schedule()
+    assert exec_schedule["cascade_paused"]
+    assert set(exec_schedule["paused_cascade_cells"]) == {2, 3}
+    comm_manager = flow().comm_manager
+    cell_metadata_by_id = {
+        cell_id: {"type": "code", "index": cell_id, "content": content}
+        for cell_id, content in [
+            (1, "x = 1"),
+            (2, "time.sleep(0.05)\ny = x + 1"),
+            (3, "z = y + 1"),
+        ]
+    }
+    request = {"cell_ids": [], "cell_metadata_by_id": cell_metadata_by_id}
+    assert comm_manager.handle_execute_closure(request)["batch_executed_cells"] == []
+    response = comm_manager.handle_execute_closure(
+        {**request, "ignore_cost_budget": True}
+    )
+    assert response["batch_executed_cells"] == [2, 3]
+    assert flow().global_scope["z"].obj == 3
+
+
+def test_cells_with_unchanged_memoized_inputs_are_skippable():
+    run_cell("x = 0", 1)
+    run_cell("%%memoize\ny = x + 1", 2)
+    run_cell("x = 1", 1)
+    run_cell("%%memoize\ny = x + 1", 2)
+    run_cell("x = 0", 1)
+    exec_schedule = _exec_schedule()
+    assert exec_schedule["memoized_skippable_cells"] == [2]
+    assert 2 not in exec_schedule["cascade_cost_by_cell"]
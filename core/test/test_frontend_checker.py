@@ -513,6 +513,100 @@ def test_adhoc_pandas_series_update():
     assert response.ready_cells == {3}
 
 
+def _run_dataframe_column_cells(cells_to_run: Dict[int, str], update: str):
+    run_all_cells(
+        {
+            0: "import pandas as pd",
+            1: 'df = pd.DataFrame({"a": [1, 2], "b": [3, 4], "c": [5, 6]})',
+            **cells_to_run,
+        }
+    )
+    response = flow().check_and_link_multiple_cells()
+    assert response.waiting_cells == set()
+    assert response.ready_cells == set()
+    run_cell(update, 9)
+    response = flow().check_and_link_multiple_cells()
+    assert response.waiting_cells == set()
+    return response.ready_cells
+
+
+_DATAFRAME_COLUMN_CELLS = {
+    2: 'x = df["a"] + 1',
+    3: 'y = df["b"] + 1',
+    4: "z = df.sum()",
+}
+
+
+def test_dataframe_column_update_only_affects_users_of_that_column():
+    ready_cells = _run_dataframe_column_cells(
+        _DATAFRAME_COLUMN_CELLS, 'df["a"] = [7, 8]'
+    )
+    assert ready_cells == {2, 4}
+
+
+def test_dataframe_column_attribute_update():
+    cells_to_run = {**_DATAFRAME_COLUMN_CELLS, 3: "y = df.b + 1"}
+    ready_cells = _run_dataframe_column_cells(cells_to_run, "df.b = [7, 8]")
+    assert ready_cells == {3, 4}
+
+
+def test_dataframe_multi_column_subscript():
+    cells_to_run = {
+        2: 'x = df[["a", "c"]]',
+        3: 'y = df[["b"]]',
+    }
+    ready_cells = _run_dataframe_column_cells(cells_to_run, 'df["a"] = [7, 8]')
+    assert ready_cells == {2}
+
+
+def test_dataframe_multiindex_column_subscript():
+    cells_to_run = {
+        1: "df = pd.DataFrame([[1, 2, 3], [4, 5, 6]], "
+        'columns=pd.MultiIndex.from_tuples([("a", "x"), ("a", "y"), ("b", "x")]))',
+        2: 'x = df["a", "x"] + 1',
+        3: 'y = df["a", "y"] + 1',
+        4: "z = df.sum()",
+    }
+    ready_cells = _run_dataframe_column_cells(cells_to_run, 'df["a", "x"] = [7, 8]')
+    assert ready_cells == {2, 4}
+    # rather than the sub-frame df["a"] (and a nonexistent column "y")
+    assert [sym.name for sym in flow().global_scope["y"].parents] == [("a", "y")]
+
+
+def test_dataframe_assign_only_affects_assigned_columns():
+    ready_cells = _run_dataframe_column_cells(
+        _DATAFRAME_COLUMN_CELLS, "df = df.assign(a=[7, 8])"
+    )
+    assert ready_cells == {2, 4}
+
+
+def test_dataframe_reassignment_affects_all_columns():
+    ready_cells = _run_dataframe_column_cells(_DATAFRAME_COLUMN_CELLS, "df = df.copy()")
+    assert ready_cells == {2, 3, 4}
+
+
+def test_dataframe_assign_from_other_frame_affects_all_columns():
+    cells_to_run = {**_DATAFRAME_COLUMN_CELLS, 5: "df2 = df.copy()"}
+    ready_cells = _run_dataframe_column_cells(cells_to_run, "df = df2.assign(a=[7, 8])")
+    assert ready_cells == {2, 3, 4, 5}
+
+
+def test_dataframe_drop_columns():
+    # users of the dropped column would fail if rerun, so only the user
+    # of the whole frame is marked as ready
+    ready_cells = _run_dataframe_column_cells(
+        _DATAFRAME_COLUMN_CELLS, 'df = df.drop(columns=["a"])'
+    )
+    assert ready_cells == {4}
+
+
+def test_dataframe_drop_columns_inplace():
+    ready_cells = _run_dataframe_column_cells(
+        _DATAFRAME_COLUMN_CELLS, 'df.drop(columns=["a"], inplace=True)'
+    )
+    assert ready_cells == {4}
+
+
 def test_unsafe_order():
     cells_to_run = {
         0: "x = 0",
@@ -692,3 +786,28 @@ def test_dag_edge_changes():
         response = flow().check_and_link_multiple_cells()
         assert response.ready_cells == {2}
         assert response.waiting_cells == {3}
+
+
+def test_call_chain_live_refs_cached_per_definition():
+    cells_to_run = {
+        0: "y = 0",
+        1: "def f(): return y",
+        2: "def g(): return f() + 1",
+        3: "z = g()",
+        4: "y = 42",
+    }
+    run_all_cells(cells_to_run)
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == {3}
+    f_sym = flow().global_scope.lookup_symbol_by_name("f")
+    cached_live_refs = list(f_sym._funcall_live_symbols[1].values())
+    assert len(cached_live_refs) > 0
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == {3}
+    for live_refs in f_sym._funcall_live_symbols[1].values():
+        assert any(live_refs is cached for cached in cached_live_refs)
+    run_cell("def f(): return 5", 1)
+    run_cell("z = g()", 3)
+    run_cell("y = 43", 4)
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == set()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+from ipyflow.singletons import flow, tracer
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(
+    function_demotion_enabled=True,
+    function_demotion_min_calls=3,
+    function_demotion_min_overhead_seconds=0.0,
+)
+
+
+def _profile_for(name: str):
+    profiles = [
+        profile
+        for profile in tracer().function_profiler.profile_by_code.values()
+        if profile.name == name
+    ]
+    assert len(profiles) == 1, "got %s" % profiles
+    return profiles[0]
+
+
+def test_hot_function_gets_demoted():
+    run_cell("y = 10")
+    run_cell("def f(x): return x + y")
+    for i in range(5):
+        run_cell(f"z{i} = f({i})")
+    profile = _profile_for("f")
+    assert profile.is_demoted
+    assert profile.num_traced_calls == 3
+    assert profile.num_untraced_calls == 2
+    assert lookup_symbol_by_name("z4").obj == 14
+
+
+def test_demoted_function_summary_records_deps():
+    run_cell("y = 10")
+    run_cell("lst = []")
+    run_cell(
+        """
+        def f(x):
+            lst.append(x + y)
+            return x
+        """
+    )
+    for i in range(4):
+        run_cell(f"f({i})")
+    assert _profile_for("f").num_untraced_calls == 1
+    lst_sym = lookup_symbol_by_name("lst")
+    assert lst_sym.obj == [10, 11, 12, 13]
+    assert lst_sym.timestamp.cell_num == flow().cell_counter()
+    assert lookup_symbol_by_name("y") in lst_sym.parents
+
+
+def test_demoted_function_summary_covers_untaken_branches():
+    run_cell("x = 0", cell_id=0)
+    run_cell("y = 0", cell_id=1)
+    run_cell(
+        """
+        def g(flag):
+            global x, y
+            if flag:
+                x = 1
+            else:
+                y = 2
+        """,
+        cell_id=2,
+    )
+    run_cell("z = y + 1", cell_id=3)
+    for _ in range(30):
+        run_cell("g(True)", cell_id=4)
+    profile = _profile_for("g")
+    assert profile.is_demoted
+    num_untraced_calls = profile.num_untraced_calls
+    assert num_untraced_calls > 0
+    run_cell("g(False)", cell_id=5)
+    assert profile.num_untraced_calls == num_untraced_calls + 1
+    assert lookup_symbol_by_name("y").obj == 2
+    ready_cells = flow().check_and_link_multiple_cells().ready_cells
+    assert 3 in ready_cells
+
+
+def test_changed_global_read_promotes_function():
+    run_cell("y = 10")
+    run_cell("def f(x): return x + y")
+    for i in range(4):
+        run_cell(f"z{i} = f({i})")
+    profile = _profile_for("f")
+    assert profile.is_demoted
+    run_cell("y = 20")
+    run_cell("z = f(0)")
+    assert not profile.is_demoted
+    assert profile.num_traced_calls == 4
+    assert lookup_symbol_by_name("z").obj == 20
+
+
+def test_redefined_function_is_traced():
+    run_cell("def f(x): return x + 1")
+    for i in range(4):
+        run_cell(f"z{i} = f({i})")
+    assert _profile_for("f").is_demoted
+    run_cell("def f(x): return x + 2")
+    run_cell("z = f(0)")
+    profiles = [
+        profile
+        for profile in tracer().function_profiler.profile_by_code.values()
+        if profile.name == "f"
+    ]
+    assert len(profiles) == 2
+    assert sum(profile.is_demoted for profile in profiles) == 1
+
+
+def test_function_demotion_can_be_disabled():
+    run_cell("%flow function_demotion disable")
+    run_cell("def f(x): return x + 1")
+    for i in range(5):
+        run_cell(f"z{i} = f({i})")
+    assert len(tracer().function_profiler.profile_by_code) == 0
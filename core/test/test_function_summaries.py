@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+from ipyflow.singletons import flow, tracer
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(
+    function_demotion_enabled=False,
+    function_summaries_enabled=True,
+    function_summaries_verify=False,
+)
+
+
+def _profile_for(name: str):
+    profiles = [
+        profile
+        for profile in tracer().function_profiler.profile_by_code.values()
+        if profile.name == name
+    ]
+    assert len(profiles) == 1, "got %s" % profiles
+    return profiles[0]
+
+
+def test_summary_applied_when_global_reads_unchanged():
+    run_cell("y = 10")
+    run_cell("def f(x): return x + y")
+    for i in range(4):
+        run_cell(f"z{i} = f({i})")
+    profile = _profile_for("f")
+    assert profile.num_traced_calls == 2
+    assert profile.num_untraced_calls == 2
+    assert lookup_symbol_by_name("z3").obj == 13
+    assert lookup_symbol_by_name("y") in lookup_symbol_by_name("z3").parents
+
+
+def test_updated_global_read_falls_back_to_tracing():
+    run_cell("y = 10")
+    run_cell("def f(x): return x + y")
+    for i in range(3):
+        run_cell(f"z{i} = f({i})")
+    profile = _profile_for("f")
+    assert profile.num_untraced_calls == 1
+    run_cell("y = 20")
+    run_cell("z = f(0)")
+    assert profile.num_traced_calls == 3
+    assert lookup_symbol_by_name("z").obj == 20
+
+
+def test_summary_records_global_writes():
+    run_cell("y = 10")
+    run_cell("lst = []")
+    run_cell(
+        """
+        def f(x):
+            lst.append(x + y)
+            return x
+        """
+    )
+    for i in range(4):
+        run_cell(f"f({i})")
+    assert _profile_for("f").num_untraced_calls > 0
+    lst_sym = lookup_symbol_by_name("lst")
+    assert lst_sym.obj == [10, 11, 12, 13]
+    assert lst_sym.timestamp.cell_num == flow().cell_counter()
+    assert lookup_symbol_by_name("y") in lst_sym.parents
+
+
+def test_summary_records_mutated_args():
+    run_cell("y = 10")
+    run_cell("a = []")
+    run_cell("b = []")
+    run_cell(
+        """
+        def f(l):
+            l.append(y)
+        """
+    )
+    for _ in range(3):
+        run_cell("f(a)")
+    profile = _profile_for("f")
+    assert profile.num_untraced_calls == 1
+    assert profile.summary.mutated_arg_names == {"l"}
+    assert len(profile.summary.global_writes) == 0
+    b_ts = lookup_symbol_by_name("b").timestamp
+    run_cell("f(b)")
+    assert profile.num_untraced_calls == 2
+    b_sym = lookup_symbol_by_name("b")
+    assert b_sym.obj == [10]
+    assert b_sym.timestamp > b_ts
+    assert lookup_symbol_by_name("y") in b_sym.parents
+    assert lookup_symbol_by_name("a").timestamp.cell_num < flow().cell_counter()
+
+
+def test_verification_mode_cross_checks_summaries():
+    flow().mut_settings.function_summaries_verify = True
+    run_cell("y = 10")
+    run_cell("lst = []")
+    run_cell(
+        """
+        def f(x):
+            lst.append(x + y)
+            return x
+        """
+    )
+    for i in range(5):
+        run_cell(f"f({i})")
+    profile = _profile_for("f")
+    assert profile.num_untraced_calls == 0
+    assert profile.num_summary_hits > 0
+    assert profile.num_verification_failures == 0
+
+
+def test_argument_dependent_writes_are_merged():
+    flow().mut_settings.function_summaries_verify = True
+    run_cell("a = []")
+    run_cell("b = []")
+    run_cell(
+        """
+        def f(flag):
+            if flag:
+                a.append(1)
+            else:
+                b.append(1)
+        """
+    )
+    for _ in range(3):
+        run_cell("f(True)")
+    profile = _profile_for("f")
+    assert profile.num_summary_hits == 0
+    run_cell("f(False)")
+    assert profile.num_summary_hits == 1
+    assert profile.num_verification_failures == 1
+    for flag in [False, True, True, False, True]:
+        run_cell(f"f({flag})")
+    assert profile.num_verification_failures == 1
+    (summary, _), *_ = reversed(profile.summaries_by_read_versions.values())
+    assert {sym.name for sym in summary.global_writes} == {"a", "b"}
+
+
+def test_cached_summary_covers_untaken_branches():
+    run_cell("a = []", cell_id=0)
+    run_cell("b = []", cell_id=1)
+    run_cell(
+        """
+        def f(flag):
+            if flag:
+                a.append(1)
+            else:
+                b.append(1)
+        """,
+        cell_id=2,
+    )
+    run_cell("logb = len(b)", cell_id=3)
+    for _ in range(3):
+        run_cell("f(True)", cell_id=4)
+    profile = _profile_for("f")
+    assert profile.num_untraced_calls == 0
+    # the summary cached for `f(True)` gets applied, but must still cover `b`
+    run_cell("f(False)", cell_id=5)
+    assert profile.num_untraced_calls == 1
+    assert lookup_symbol_by_name("b").obj == [1]
+    assert 3 in flow().check_and_link_multiple_cells().ready_cells
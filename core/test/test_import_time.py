@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+from typing import Set
+
+_DEFERRED_MODULES = {
+    "black",
+    "ipywidgets",
+    "ipyflow.annotations.compiler",
+    "ipyflow.experimental.dag",
+}
+
+
+def _modules_imported_by(stmt: str) -> Set[str]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:"):
+            modules.add(line.split("|")[-1].strip())
+    return modules
+
+
+def test_import_ipyflow_is_lightweight():
+    modules = _modules_imported_by("import ipyflow")
+    assert "ipyflow" in modules
+    for heavy_module in ("IPython", "pyccolo", "ipyflow.api", "ipyflow.flow"):
+        assert heavy_module not in modules, heavy_module
+
+
+def test_kernel_stack_defers_rarely_used_modules():
+    modules = _modules_imported_by(
+        "import ipyflow.kernel, ipyflow.shell, ipyflow.line_magics"
+    )
+    assert "ipyflow.flow" in modules
+    assert len(modules & _DEFERRED_MODULES) == 0, modules & _DEFERRED_MODULES
+
+
+def test_lazy_attributes_resolve_to_singleton_accessors():
+    # importing the submodules with the same names first must not shadow them
+    stmt = "; ".join(
+        [
+            "import types",
+            "import ipyflow.flow, ipyflow.kernel, ipyflow.shell",
+            "from ipyflow import code, flow, kernel, shell, uninstrument",
+            "assert not any(isinstance(f, types.ModuleType) for f in (flow, kernel, shell))",
+            "from ipyflow import *",
+            "assert callable(code) and callable(uninstrument) and callable(cells)",
+        ]
+    )
+    subprocess.run([sys.executable, "-c", stmt], check=True)
+
+
+def test_static_all_matches_api():
+    import ipyflow
+    from ipyflow.api import __all__ as api_all
+
+    assert set(api_all) <= set(ipyflow.__all__)
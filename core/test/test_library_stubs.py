@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import logging
+from importlib.util import find_spec
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+import pytest
+
+logging.basicConfig(level=logging.ERROR)
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+# checked without importing, since handlers are only compiled for modules imported in cells
+requires_pandas = pytest.mark.skipif(find_spec("pandas") is None, reason="needs pandas")
+requires_numpy = pytest.mark.skipif(find_spec("numpy") is None, reason="needs numpy")
+requires_polars = pytest.mark.skipif(find_spec("polars") is None, reason="needs polars")
+
+
+def _timestamps(*names):
+    return [lookup_symbol_by_name(name).timestamp for name in names]
+
+
+@requires_pandas
+def test_pandas_non_mutating_methods_do_not_propagate():
+    run_cell("import io; import pandas as pd")
+    run_cell('df = pd.DataFrame({"a": [1, 2], "b": [3, 4]})')
+    run_cell("total = df.a.sum()")
+    ts = _timestamps("df", "total")
+    run_cell("buf = io.StringIO()")
+    run_cell("df.info(buf=buf)")
+    run_cell("df.to_csv(buf)")
+    run_cell('dropped = df.drop(columns=["a"])')
+    run_cell('renamed = df.rename(columns={"b": "c"}, inplace=False)')
+    assert _timestamps("df", "total") == ts
+
+
+@requires_pandas
+def test_pandas_inplace_methods_mutate():
+    run_cell("import pandas as pd")
+    run_cell('df = pd.DataFrame({"a": [1, 2], "b": [3, 4]})')
+    (ts0,) = _timestamps("df")
+    run_cell('df.drop(columns=["a"], inplace=True)')
+    (ts1,) = _timestamps("df")
+    assert ts1 > ts0
+    run_cell('df.insert(0, "c", [5, 6])')
+    (ts2,) = _timestamps("df")
+    assert ts2 > ts1
+
+
+@requires_numpy
+def test_numpy_out_arguments_mutate_only_out():
+    run_cell("import io; import numpy as np")
+    run_cell("arr = np.arange(4.0)")
+    run_cell("out = np.zeros(())")
+    arr_ts, out_ts = _timestamps("arr", "out")
+    run_cell("arr.sum(out=out)")
+    run_cell("np.save(io.BytesIO(), arr)")
+    run_cell("flat = arr.ravel()")
+    arr_ts2, out_ts2 = _timestamps("arr", "out")
+    assert arr_ts2 == arr_ts
+    assert out_ts2 > out_ts
+    run_cell("arr.sort()")
+    (arr_ts3,) = _timestamps("arr")
+    assert arr_ts3 > arr_ts2
+    run_cell("dst = np.zeros(4)")
+    (dst_ts,) = _timestamps("dst")
+    run_cell("np.copyto(dst, arr)")
+    assert _timestamps("arr", "dst") > [arr_ts3, dst_ts]
+    assert _timestamps("arr")[0] == arr_ts3
+
+
+@requires_polars
+def test_polars_in_place_sort_mutates():
+    run_cell("import polars as pl")
+    run_cell("s = pl.Series([3, 1, 2])")
+    (ts0,) = _timestamps("s")
+    run_cell("ordered = s.sort()")
+    assert _timestamps("s") == [ts0]
+    run_cell("s.sort(in_place=True)")
+    (ts1,) = _timestamps("s")
+    assert ts1 > ts0
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from test.utils import make_flow_fixture
+from typing import Any, Dict, List
+
+from ipyflow.metrics import MetricsRegistry
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+class _RecordingComm:
+    def __init__(self) -> None:
+        self.sent: List[Dict[str, Any]] = []
+
+    def send(self, msg: Dict[str, Any]) -> None:
+        self.sent.append(msg)
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry()
+    for value in (0.0005, 0.002, 0.002, 100.0):
+        registry.observe("latency", value)
+    hist = registry.snapshot()["histograms"]["latency"]
+    assert hist["count"] == 4
+    assert hist["max"] == 100.0
+    assert hist["buckets"]["0.001"] == 1
+    assert hist["buckets"]["0.005"] == 2
+    assert hist["buckets"]["inf"] == 1
+
+
+def test_cell_metrics_and_get_metrics_request():
+    run_cell("x = 0")
+    run_cell("y = x + 1")
+    comm = _RecordingComm()
+    flow().comm_manager.handle({"type": "get_metrics"}, comm=comm)
+    response = comm.sent[-1]
+    assert response["success"]
+    metrics = response["metrics"]
+    assert metrics["counters"]["cells_executed"] >= 2
+    for name in (
+        "precheck_seconds",
+        "post_execution_precheck_seconds",
+        "traced_execution_seconds",
+        "after_run_cell_seconds",
+        "gc_seconds",
+    ):
+        assert metrics["histograms"][name]["count"] >= 2, name
+    gauges = metrics["gauges"]
+    assert gauges["num_symbols"] >= 2
+    assert gauges["num_edges"] >= 1
+    assert gauges["bookkeeping_bytes"] > 0
+
+
+def test_comm_message_sizes_are_sampled():
+    comm = _RecordingComm()
+    for _ in range(20):
+        flow().comm_manager.handle({"type": "get_last_updated_cell_id"}, comm=comm)
+    metrics = flow().metrics.snapshot()
+    assert metrics["counters"]["comm_messages_sent"] == 20
+    assert metrics["histograms"]["comm_message_bytes"]["count"] == 2
+
+
+def test_periodic_dump(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    flow().mut_settings.metrics_dump_path = path
+    flow().mut_settings.metrics_dump_interval = 0.0
+    run_cell("x = 0")
+    run_cell("y = x + 1")
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) >= 2
+    assert lines[-1]["gauges"]["num_symbols"] >= 2
+
+
+def test_stats_line_magic(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    run_cell("x = 0")
+    run_cell(f"%flow stats dump {path} 3600")
+    assert flow().mut_settings.metrics_dump_path == path
+    assert flow().mut_settings.metrics_dump_interval == 3600
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+    run_cell("%flow stats nodump")
+    assert flow().mut_settings.metrics_dump_path is None
+    run_cell("%flow stats reset")
+    # only the cell that did the reset has been counted since
+    assert flow().metrics.counters["cells_executed"].value == 1
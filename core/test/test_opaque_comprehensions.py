@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+from typing import Any, List, Set, Tuple
+
+import pytest
+
+from ipyflow.singletons import flow, tracer
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+# "$" gets replaced with a per-scenario suffix
+_SETUP_CELLS = [
+    "class A$:\n    def __init__(self, a): self.a = a",
+    "lst$ = [A$(i) for i in range(5)]",
+    "d$ = {i: i * i for i in range(5)}",
+    "y$ = 2",
+]
+
+_COMPREHENSIONS = [
+    "z$ = [x.a + y$ for x in lst$ if x.a > 1]",
+    "z$ = {k: v + y$ for k, v in d$.items() if v > y$}",
+    "z$ = sorted({len(str(x.a)) for x in lst$})",
+    "z$ = sum(x.a * y$ for x in lst$)",
+    "z$ = [[x.a + i for i in range(y$)] for x in lst$]",
+    "z$ = [(i, j) for i in d$ for j in d$ if j < i + y$]",
+]
+
+_UPDATES = [
+    "y$ = 3",
+    "lst$[3].a = 10",
+    "lst$[0].a = 10",
+    "lst$.append(A$(7))",
+    "d$[2] = 42",
+]
+
+
+def _is_opaque(stmt_node) -> bool:
+    return id(stmt_node) in tracer().opaque_comprehensions_by_stmt_id
+
+
+def _run_scenario(
+    comprehension: str, opaque: bool, suffix: str, first_cell: int
+) -> Tuple[Any, List[Set[int]]]:
+    flow().mut_settings.opaque_comprehensions_enabled = opaque
+
+    def _run(cell: str, offset: int) -> None:
+        run_cell(cell.replace("$", suffix), first_cell + offset)
+
+    for offset, cell in enumerate(_SETUP_CELLS):
+        _run(cell, offset)
+    comp_offset = len(_SETUP_CELLS)
+    ready_offsets = []
+    for update in _UPDATES:
+        _run(comprehension, comp_offset)
+        _run(update, comp_offset + 1)
+        ready_cells = flow().check_and_link_multiple_cells().ready_cells
+        ready_offsets.append(
+            {cell - first_cell for cell in ready_cells if cell >= first_cell}
+        )
+    _run(comprehension, comp_offset)
+    z_sym = lookup_symbol_by_name(f"z{suffix}")
+    if opaque:
+        assert _is_opaque(z_sym.stmt_node)
+    return z_sym.obj, ready_offsets
+
+
+@pytest.mark.parametrize("comprehension", _COMPREHENSIONS)
+def test_opaque_comprehension_equivalent_to_full_tracing(comprehension):
+    traced_result = _run_scenario(comprehension, False, "_traced", 0)
+    opaque_result = _run_scenario(comprehension, True, "_opaque", 100)
+    assert opaque_result == traced_result
+
+
+def test_opaque_comprehension_skips_per_element_tracing():
+    run_cell("class A:\n    def __init__(self, a): self.a = a")
+    run_cell("lst = [A(i) for i in range(5)]")
+    run_cell("y = 2")
+    run_cell("z = [x.a + y for x in lst]")
+    assert _is_opaque(lookup_symbol_by_name("z").stmt_node)
+    z_parents = {sym.name for sym in lookup_symbol_by_name("z").parents}
+    # the attribute of the first element only gets resolved with full tracing
+    assert z_parents == {"lst", "y"}
+    flow().mut_settings.opaque_comprehensions_enabled = False
+    run_cell("w = [x.a + y for x in lst]")
+    w_parents = {sym.name for sym in lookup_symbol_by_name("w").parents}
+    assert w_parents == {"a", "lst", "y"}
+
+
+@pytest.mark.parametrize(
+    "comprehension",
+    [
+        "z = [f(x) for x in lst]",
+        "z = [lst2.append(x) for x in lst]",
+        "z = [(w := x) for x in lst]",
+        "z = [y for x in lst for y in x.items]",
+        "z = [sorted(lst, key=f) for x in lst]",
+    ],
+)
+def test_comprehensions_with_possible_side_effects_are_traced(comprehension):
+    run_cell("lst2 = []")
+    run_cell("def f(x): return x")
+    run_cell(
+        """
+        class Items:
+            items = [1]
+        """
+    )
+    run_cell("lst = [Items()]" if "items" in comprehension else "lst = [0, 1, 2]")
+    run_cell(comprehension)
+    assert not _is_opaque(lookup_symbol_by_name("z").stmt_node)
+
+
+def test_traced_comprehension_records_mutation():
+    run_cell("lst = [0, 1, 2]")
+    run_cell("lst2 = []")
+    run_cell("_ = [lst2.append(x) for x in lst]")
+    lst2_sym = lookup_symbol_by_name("lst2")
+    assert lst2_sym.obj == [0, 1, 2]
+    assert lst2_sym.timestamp.cell_num == flow().cell_counter()
+
+
+def test_builtins_dispatching_to_dunders_traced_for_non_builtin_types():
+    run_cell(
+        """
+        class A:
+            def __init__(self, a): self.a = a
+            def __str__(self): return str(self.a)
+        """
+    )
+    run_cell("lst = [A(i) for i in range(3)]")
+    run_cell("z = [str(x) for x in lst]")
+    z_parents = {sym.name for sym in lookup_symbol_by_name("z").parents}
+    # `str` calls back into `A.__str__`, so the comprehension must be traced
+    assert z_parents == {"a", "lst"}
+    run_cell("nums = [0, 1, 2]")
+    run_cell("w = [str(x) for x in nums]")
+    assert lookup_symbol_by_name("w").obj == ["0", "1", "2"]
+    comprehensions = tracer().opaque_comprehensions_by_stmt_id[
+        id(lookup_symbol_by_name("w").stmt_node)
+    ]
+    assert [comp.builtin_typed_names for comp in comprehensions] == [
+        frozenset({"nums"})
+    ]
+    run_cell("v = 0")
+    assert not _is_opaque(lookup_symbol_by_name("w").stmt_node)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+from test.utils import make_flow_fixture
+
+from ipyflow.api import stdout
+from ipyflow.data_model.cell import cells
+from ipyflow.singletons import flow
+from ipyflow.tracing.output_recorder import (
+    BoundedCaptureBuffer,
+    TeeCompatibleCapturingDisplayPublisher,
+)
+
+logging.basicConfig(level=logging.ERROR)
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+def _write_chunks(buf: BoundedCaptureBuffer, data: str, chunk_size: int) -> None:
+    for start in range(0, len(data), chunk_size):
+        buf.write(data[start : start + chunk_size])
+
+
+def test_bounded_buffer_keeps_head_and_tail():
+    buf = BoundedCaptureBuffer(limit=4)
+    _write_chunks(buf, "abcdefghijkl", 3)
+    assert buf.size == 12
+    assert buf.num_truncated == 4
+    assert buf.getvalue() == "abcd\n... [4 characters truncated] ...\nijkl"
+
+
+def test_bounded_buffer_within_limit_is_untouched():
+    buf = BoundedCaptureBuffer(limit=4)
+    _write_chunks(buf, "abcdefgh", 5)
+    assert buf.getvalue() == "abcdefgh"
+    unbounded = BoundedCaptureBuffer()
+    _write_chunks(unbounded, "abcdefgh" * 100, 7)
+    assert unbounded.getvalue() == "abcdefgh" * 100
+
+
+def test_bounded_buffer_spills_to_disk():
+    buf = BoundedCaptureBuffer(limit=4, spill=True)
+    data = "".join(str(i % 10) for i in range(1000))
+    _write_chunks(buf, data, 7)
+    assert buf.num_truncated == 992
+    assert buf.getvalue() == data
+    buf.write("more")
+    assert buf.getvalue() == data + "more"
+    spill_path = buf._spill_path
+    assert spill_path is not None and os.path.exists(spill_path)
+    buf.close()
+    assert not os.path.exists(spill_path)
+
+
+def test_display_outputs_keep_head_and_tail():
+    pub = TeeCompatibleCapturingDisplayPublisher()
+    pub.output_limit = 4
+    for i in range(10):
+        pub.publish({"text/plain": str(i) * 2})
+    assert [output["data"]["text/plain"] for output in pub.outputs] == [
+        "00",
+        "11",
+        "88",
+        "99",
+    ]
+    pub.clear_output()
+    pub.publish({"text/plain": "ab"})
+    assert len(pub.outputs) == 1
+
+
+def test_capture_limit_line_magic():
+    run_cell("%flow capture_limit 0.01")
+    assert flow().mut_settings.capture_output_limit == 10
+    assert not flow().mut_settings.capture_output_spill_enabled
+    run_cell("for i in range(100): print(i)")
+    captured = stdout(cells().exec_counter())
+    assert captured.startswith("0\n1\n2\n3\n4\n")
+    assert "characters truncated" in captured
+    assert captured.endswith("98\n99\n")
+    assert cells().current_cell().captured_output_size == len(
+        "".join(f"{i}\n" for i in range(100))
+    )
+    run_cell("%flow capture_limit spill")
+    assert flow().mut_settings.capture_output_spill_enabled
+    run_cell("for i in range(100): print(i)")
+    assert stdout(cells().exec_counter()) == "".join(f"{i}\n" for i in range(100))
+    run_cell("%flow capture_limit off nospill")
+    assert flow().mut_settings.capture_output_limit == 0
+    assert not flow().mut_settings.capture_output_spill_enabled
+
+
+def test_capture_limit_for_single_cell():
+    run_cell("%flow capture_limit --cell 0.01\nfor i in range(100): print(i)")
+    assert "characters truncated" in stdout(cells().exec_counter())
+    run_cell("for i in range(100): print(i)")
+    assert stdout(cells().exec_counter()) == "".join(f"{i}\n" for i in range(100))
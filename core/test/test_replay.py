@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+from ipyflow.data_model.cell import cells
+from ipyflow.slicing.replay import group_independent_slices, make_replay_script
+
+logging.basicConfig(level=logging.ERROR)
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(
+    setup_stmts=["from ipyflow.api import replay"]
+)
+
+
+def test_replay_script_hoists_imports_and_dedupes_outer_statements():
+    run_cell("lst = []")
+    run_cell("for i in range(3):\n    lst.append(i)")
+    run_cell("import math")
+    run_cell("def f(v):\n    return math.floor(v) + len(lst)")
+    run_cell("import math\ny = f(2.5)")
+    script = make_replay_script([lookup_symbol_by_name("y")], "out.pkl")
+    lines = script.splitlines()
+    assert lines[0] == "import math"
+    assert script.count("import math") == 1
+    assert script.count("for i in range(3):") == 1
+    assert script.index("lst = []") < script.index("for i in range(3):")
+    assert script.index("def f(v):") < script.index("y = f(2.5)")
+
+
+def test_replay_api_recovers_value():
+    run_cell("x = 20")
+    run_cell("unrelated = 1 / 0 if False else 5")
+    run_cell("y = x * 2 + 2")
+    run_cell("x = 'changed'")
+    # the slice for y is as of its last update, so it sees the original x
+    run_cell("assert replay(y) == 42")
+
+
+def test_replay_independent_slices_magic():
+    run_cell("a = 1")
+    run_cell("b = [2]")
+    run_cell("c = a + 1")
+    groups = group_independent_slices(
+        [lookup_symbol_by_name(name) for name in ("c", "b", "a")]
+    )
+    assert sorted(sorted(sym.readable_name for sym in group) for group in groups) == [
+        ["a", "c"],
+        ["b"],
+    ]
+    run_cell("%flow replay c b")
+    captured = cells().current_cell().captured_output
+    assert sorted(captured.stdout.strip().splitlines()) == ["b = [2]", "c = 2"]
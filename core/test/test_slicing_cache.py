@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import ast
+import logging
+import time
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+from ipyflow.data_model.statement import Statement
+from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.slicing.context import dynamic_slicing_context
+from ipyflow.slicing.mixin import SliceableMixin
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+def _slice_texts(name: str):
+    stmt = Statement.at_timestamp(lookup_symbol_by_name(name).timestamp)
+    return [sliceable.text for sliceable in stmt.make_slice()]
+
+
+def test_statement_text_taken_from_source():
+    run_cell("x  =  [1,\n      2]  # comment")
+    run_cell("def f(v):\n    w = v +  1\n    return w")
+    run_cell("y = f(x[0])")
+    assert _slice_texts("x") == ["x  =  [1,\n      2]"]
+    stmt = Statement.at_timestamp(lookup_symbol_by_name("y").timestamp)
+    assert stmt.text == "y = f(x[0])"
+    assert stmt.text is stmt.text
+
+
+def test_memoized_closures_invalidated_by_new_edges():
+    run_cell("x = 0")
+    run_cell("y = x + 1")
+    assert _slice_texts("y") == ["x = 0", "y = x + 1"]
+    edge_version = SliceableMixin._edge_version
+    run_cell("z = y + 1")
+    assert SliceableMixin._edge_version > edge_version
+    assert _slice_texts("z") == ["x = 0", "y = x + 1", "z = y + 1"]
+    run_cell("y = 42")
+    assert _slice_texts("y") == ["y = 42"]
+    assert _slice_texts("z") == ["x = 0", "y = x + 1", "z = y + 1"]
+
+
+def test_long_session_slice_benchmark():
+    # tracing a real 10k statement session takes minutes, so build the
+    # statement graph that it would produce directly
+    run_cell("x = 0")
+    sym = lookup_symbol_by_name("x")
+    num_stmts = 10**4
+    prev_stmt = None
+    with dynamic_slicing_context():
+        for idx in range(num_stmts):
+            stmt = Statement.create_and_track(
+                ast.parse(f"x{idx} = x{idx - 1} + 1" if idx > 0 else "x0 = 0").body[0],
+                timestamp=Timestamp(2, idx),
+            )
+            if prev_stmt is not None:
+                stmt.add_parent_edge(prev_stmt, sym)
+            prev_stmt = stmt
+    start = time.perf_counter()
+    closure = stmt.make_slice()
+    elapsed = time.perf_counter() - start
+    logger.info("sliced %d statements in %.3fs", num_stmts, elapsed)
+    assert len(closure) == num_stmts
+    assert closure[0].text == "x0 = 0"
+    # the second slice comes straight from the memoized closures
+    assert Statement.make_multi_slice([stmt, closure[num_stmts // 2]]) == closure
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import sys
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+import pytest
+
+from ipyflow.singletons import flow, shell, tracer
+from ipyflow.tracing.sys_monitoring import SYS_MONITORING_AVAILABLE
+
+logging.basicConfig(level=logging.ERROR)
+
+pytestmark = pytest.mark.skipif(
+    not SYS_MONITORING_AVAILABLE, reason="sys.monitoring requires Python 3.12+"
+)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(sys_monitoring_enabled=True)
+
+
+def test_sys_events_delivered_via_monitoring():
+    run_cell("from ipyflow.singletons import tracer")
+    run_cell("via_monitoring = tracer().sys_events_via_monitoring")
+    assert lookup_symbol_by_name("via_monitoring").obj
+    run_cell("y = 10")
+    run_cell(
+        """
+        def f(x):
+            return x + y
+        """
+    )
+    run_cell("z = f(5)")
+    assert lookup_symbol_by_name("z").obj == 15
+    assert lookup_symbol_by_name("y") in lookup_symbol_by_name("z").parents
+
+
+def test_library_code_not_dispatched():
+    run_cell("import json")
+    run_cell("s = json.dumps({'a': [1, 2, 3]})")
+    backend = shell().sys_monitoring_backend
+    assert backend.tool_id is not None
+    assert not backend.is_active
+    assert backend._should_dispatch_by_filename.get(json.__file__) is False
+    assert lookup_symbol_by_name("s").obj == '{"a": [1, 2, 3]}'
+
+
+def test_events_restarted_when_instrumented_files_change(monkeypatch):
+    restarts = []
+    restart_events = sys.monitoring.restart_events
+    monkeypatch.setattr(
+        sys.monitoring,
+        "restart_events",
+        lambda: restarts.append(None) or restart_events(),
+    )
+    run_cell("import json")
+    run_cell("s = json.dumps([1])")
+    backend = shell().sys_monitoring_backend
+    assert json.__file__ in backend._disabled_filenames
+    num_restarts = len(restarts)
+    run_cell("t = 1")
+    assert len(restarts) == num_restarts
+    tracer()._tracing_enabled_files.add(json.__file__)
+    try:
+        run_cell("u = 2")
+        assert len(restarts) == num_restarts + 1
+        assert json.__file__ not in backend._disabled_filenames
+    finally:
+        tracer()._tracing_enabled_files.discard(json.__file__)
+
+
+def test_exception_propagation_through_functions():
+    run_cell("y = 1")
+    run_cell(
+        """
+        def g():
+            raise ValueError(y)
+        """
+    )
+    run_cell(
+        """
+        def f():
+            try:
+                g()
+            except ValueError:
+                return y + 1
+        """
+    )
+    z_cell = run_cell("z = f()")
+    run_cell("w = z + 1")
+    assert lookup_symbol_by_name("w").obj == 3
+    run_cell("y = 2")
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == {z_cell}
+
+
+def test_settrace_fallback_when_disabled():
+    flow().mut_settings.sys_monitoring_enabled = False
+    run_cell("from ipyflow.singletons import tracer")
+    run_cell("via_monitoring = tracer().sys_events_via_monitoring")
+    assert not lookup_symbol_by_name("via_monitoring").obj
+    run_cell("y = 10")
+    run_cell("def f(x): return x + y")
+    run_cell("z = f(5)")
+    assert lookup_symbol_by_name("y") in lookup_symbol_by_name("z").parents
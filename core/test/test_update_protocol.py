@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+from typing import List
+
+from ipyflow.data_model.symbol import Symbol, SymbolType
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+def _add_dependent(parent: Symbol, name: str) -> Symbol:
+    child = Symbol(name, SymbolType.DEFAULT, object(), flow().global_scope)
+    flow().global_scope.put(name, child)
+    parent.children[child] = []
+    child.parents[parent] = []
+    return child
+
+
+def _make_fan_out(root: Symbol, num_children: int) -> List[Symbol]:
+    return [_add_dependent(root, f"child_{idx}") for idx in range(num_children)]
+
+
+def _make_chain(root: Symbol, length: int) -> List[Symbol]:
+    chain = [root]
+    for idx in range(length):
+        chain.append(_add_dependent(chain[-1], f"link_{idx}"))
+    return chain[1:]
+
+
+def test_deep_chain_propagates_without_recursion():
+    run_cell("x = 0", 1)
+    chain = _make_chain(lookup_symbol_by_name("x"), 10**4)
+    run_cell("x = 1", 1)
+    assert chain[0].is_waiting
+    assert chain[-1].is_waiting
+
+
+def test_symbols_visited_once_per_update():
+    run_cell("x = 0", 1)
+    run_cell("y = x + 1", 2)
+    x_sym = lookup_symbol_by_name("x")
+    y_sym = lookup_symbol_by_name("y")
+    # diamond: both y and w feed into z
+    w_sym = _add_dependent(x_sym, "w")
+    z_sym = _add_dependent(y_sym, "z")
+    w_sym.children[z_sym] = []
+    z_sym.parents[w_sym] = []
+    run_cell("x = 1", 1)
+    assert z_sym.is_waiting
+    assert z_sym._update_generation == y_sym._update_generation
+    assert z_sym.fresher_ancestors == {x_sym}
+    run_cell("y = x + 1", 2)
+    assert not y_sym.is_waiting
+    assert y_sym._update_generation > w_sym._update_generation
+
+
+def test_fan_out_propagation_visits_each_child_once():
+    run_cell("x = 0", 1)
+    x_sym = lookup_symbol_by_name("x")
+    children = _make_fan_out(x_sym, 10**3)
+    run_cell("x = 1", 1)
+    generation = children[0]._update_generation
+    for child in children:
+        assert child.is_waiting
+        assert child._update_generation == generation
+        assert child.fresher_ancestors == {x_sym}
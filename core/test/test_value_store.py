@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+import numpy as np
+import pytest
+
+from ipyflow.data_model.value_store import estimate_num_bytes, make_value_snapshot
+from ipyflow.singletons import flow
+
+logging.basicConfig(level=logging.ERROR)
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture(
+    setup_stmts=["from ipyflow.api import set_tag, value_at"]
+)
+
+
+def test_value_at_tagged_symbol():
+    run_cell("lst = [1]")
+    run_cell("set_tag(lst, 'versioned')")
+    first_ctr = run_cell("lst.append(2)")
+    run_cell("lst.append(3)")
+    run_cell(f"assert value_at(lst, {first_ctr}) == [1, 2]")
+    run_cell("assert value_at(lst, 100) == [1, 2, 3]")
+    run_cell("y = 5")
+    assert flow().value_store.timestamps(lookup_symbol_by_name("y")) == []
+
+
+def test_value_store_enabled_for_all_symbols():
+    flow().mut_settings.value_store_enabled = True
+    run_cell("import numpy as np")
+    first_ctr = run_cell("arr = np.zeros(3)")
+    run_cell("arr[0] = 7")
+    run_cell("x = 'hello'")
+    run_cell(f"assert value_at(arr, {first_ctr}).tolist() == [0, 0, 0]")
+    run_cell("assert value_at(arr, 100).tolist() == [7, 0, 0]")
+    run_cell("assert value_at(x, 100) == 'hello'")
+
+
+def test_lru_eviction_keeps_store_within_budget():
+    flow().mut_settings.value_store_enabled = True
+    flow().mut_settings.value_store_byte_budget = 3 * 8000 + 1000
+    run_cell("import numpy as np")
+    for idx in range(5):
+        run_cell(f"arr{idx} = np.zeros(1000)")
+    store = flow().value_store
+    assert store.num_bytes <= flow().mut_settings.value_store_byte_budget
+    assert store.num_evictions >= 2
+    assert store.timestamps(lookup_symbol_by_name("arr0")) == []
+    assert len(store.timestamps(lookup_symbol_by_name("arr4"))) == 1
+
+
+def test_unstored_versions_do_not_fall_back_to_older_ones():
+    flow().mut_settings.value_store_enabled = True
+    first_ctr = run_cell("x = 1")
+    second_ctr = run_cell("x = [1, 2]")
+    x_sym = lookup_symbol_by_name("x")
+    store = flow().value_store
+    assert store.value_at(x_sym, first_ctr) == 1
+    with pytest.raises(KeyError):
+        store.value_at(x_sym, second_ctr)
+    run_cell("import numpy as np")
+    flow().mut_settings.value_store_byte_budget = 2 * 8000 + 1000
+    old_ctr = run_cell("arr = np.zeros(1000)")
+    new_ctr = run_cell("arr = np.ones(1000)")
+    # touching the older version makes the newer one the first to be evicted
+    assert store.value_at(lookup_symbol_by_name("arr"), old_ctr).sum() == 0
+    run_cell("other = np.zeros(1000)")
+    assert store.num_evictions > 0
+    with pytest.raises(KeyError):
+        store.value_at(lookup_symbol_by_name("arr"), new_ctr)
+
+
+def test_snapshot_strategies():
+    assert make_value_snapshot((1, "a")).payload == (1, "a")
+    arr = np.arange(4)
+    snapshot = make_value_snapshot(arr)
+    arr[0] = 100
+    assert snapshot.materialize(snapshot.payload).tolist() == [0, 1, 2, 3]
+    assert snapshot.num_bytes == arr.nbytes
+    snapshot = make_value_snapshot({"k": [1]})
+    assert isinstance(snapshot.payload, bytes)
+    assert snapshot.materialize(snapshot.payload) == {"k": [1]}
+    assert make_value_snapshot(lambda: 0) is not None
+    assert make_value_snapshot(i for i in range(3)) is None
+
+
+def test_oversized_values_are_rejected_before_insertion():
+    flow().mut_settings.value_store_enabled = True
+    flow().mut_settings.value_store_byte_budget = 2 * 8000 + 1000
+    run_cell("import numpy as np")
+    run_cell("small = np.zeros(1000)")
+    run_cell("big = np.zeros(100000)")
+    store = flow().value_store
+    assert store.timestamps(lookup_symbol_by_name("big")) == []
+    assert len(store.timestamps(lookup_symbol_by_name("small"))) == 1
+    assert store.num_evictions == 0
+
+
+def test_untagged_values_are_not_pickled():
+    flow().mut_settings.value_store_enabled = True
+    run_cell("d = {'k': [1]}")
+    assert flow().value_store.timestamps(lookup_symbol_by_name("d")) == []
+    run_cell("set_tag(d, 'versioned')")
+    run_cell("d['k'].append(2)")
+    run_cell("assert value_at(d, 100) == {'k': [1, 2]}")
+
+
+def test_size_estimate_accounts_for_nested_values():
+    nested = [[0.5] * 1000 for _ in range(10)]
+    assert estimate_num_bytes(nested) > 10 * 1000 * 8
+    assert make_value_snapshot(nested, max_bytes=1000) is None
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import logging
+from test.utils import lookup_symbol_by_name, make_flow_fixture
+
+from ipyflow.singletons import flow, tracer
+
+logging.basicConfig(level=logging.ERROR)
+
+
+# Reset dependency graph before each test
+_flow_fixture, run_cell = make_flow_fixture()
+
+
+def test_worker_thread_mutation_merged_on_main_thread():
+    run_cell("from concurrent.futures import ThreadPoolExecutor")
+    run_cell("a = []")
+    run_cell("b = []")
+    run_cell(
+        """
+        def fill(lst):
+            for i in range(3):
+                lst.append(i)
+        """
+    )
+    run_cell(
+        """
+        with ThreadPoolExecutor(max_workers=4) as ex:
+            list(ex.map(fill, [a, b] * 4))
+        """
+    )
+    for name in ["a", "b"]:
+        sym = lookup_symbol_by_name(name)
+        assert sym.obj == [0, 1, 2] * 4
+        assert sym.timestamp.cell_num == flow().cell_counter()
+        assert lookup_symbol_by_name("fill") in sym.parents
+    assert tracer().worker_thread_effects.num_worker_calls == 8
+    assert not tracer().worker_thread_effects.has_pending
+
+
+def test_worker_thread_mutation_makes_dependent_cells_stale():
+    run_cell("import threading")
+    run_cell("data = []")
+    run_cell("def work(lst): lst.append(1)")
+    run_cell("n = len(data)")
+    run_cell(
+        """
+        t = threading.Thread(target=work, args=(data,))
+        t.start()
+        t.join()
+        """
+    )
+    assert lookup_symbol_by_name("data").obj == [1]
+    assert 4 in flow().check_and_link_multiple_cells().ready_cells
+
+
+def test_main_thread_still_traced_alongside_workers():
+    run_cell("from concurrent.futures import ThreadPoolExecutor")
+    run_cell("y = 2")
+    run_cell("def f(x): return x + y")
+    run_cell(
+        """
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            results = list(ex.map(f, range(4)))
+        z = f(5)
+        """
+    )
+    assert lookup_symbol_by_name("results").obj == [2, 3, 4, 5]
+    z_parents = {sym.name for sym in lookup_symbol_by_name("z").parents}
+    assert {"f", "y"} <= z_parents
+
+
+def test_thread_aware_tracing_can_be_disabled():
+    flow().mut_settings.thread_aware_tracing_enabled = False
+    run_cell("import threading")
+    run_cell("data = []")
+    run_cell("def work(lst): lst.append(1)")
+    run_cell(
+        """
+        t = threading.Thread(target=work, args=(data,))
+        t.start()
+        t.join()
+        """
+    )
+    assert lookup_symbol_by_name("data").obj == [1]
+    assert tracer().worker_thread_effects.num_worker_calls == 0
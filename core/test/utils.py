@@ -19,7 +19,10 @@ from ipyflow.data_model.symbol import Symbol
 from ipyflow.flow import NotebookFlow
 from ipyflow.shell import IPyflowInteractiveShell
 from ipyflow.singletons import flow, shell
-from ipyflow.tracing.external_calls.base_handlers import REGISTERED_HANDLER_BY_FUNCTION
+from ipyflow.tracing.external_calls.base_handlers import (
+    MODULES_PENDING_HANDLER_COMPILATION,
+    REGISTERED_HANDLER_BY_FUNCTION,
+)
 from ipyflow.tracing.ipyflow_tracer import DataflowTracer
 
 
@@ -42,19 +45,23 @@ def clear_registered_annotations(clear_afterwards=False):
     orig_class_specs = dict(REGISTERED_CLASS_SPECS)
     orig_function_specs = dict(REGISTERED_FUNCTION_SPECS)
     orig_handlers = dict(REGISTERED_HANDLER_BY_FUNCTION)
+    orig_pending = dict(MODULES_PENDING_HANDLER_COMPILATION)
     try:
         REGISTERED_CLASS_SPECS.clear()
         REGISTERED_FUNCTION_SPECS.clear()
         REGISTERED_HANDLER_BY_FUNCTION.clear()
+        MODULES_PENDING_HANDLER_COMPILATION.clear()
         yield
     finally:
         if clear_afterwards:
             REGISTERED_CLASS_SPECS.clear()
             REGISTERED_FUNCTION_SPECS.clear()
             REGISTERED_HANDLER_BY_FUNCTION.clear()
+            MODULES_PENDING_HANDLER_COMPILATION.clear()
         REGISTERED_CLASS_SPECS.update(orig_class_specs)
         REGISTERED_FUNCTION_SPECS.update(orig_function_specs)
         REGISTERED_HANDLER_BY_FUNCTION.update(orig_handlers)
+        MODULES_PENDING_HANDLER_COMPILATION.update(orig_pending)
 
 
 def lookup_symbol_by_name(name: str) -> Symbol:
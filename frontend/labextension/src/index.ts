@@ -479,6 +479,7 @@ const connectToComm = (
     safeSend({
       type: 'notify_content_changed',
       cell_metadata_by_id,
+      ...state.execScheduleSyncFields(),
     });
   }, 500);
 
@@ -780,7 +781,7 @@ const connectToComm = (
   }, 200);
 
   state.comm.onMsg = (msg) => {
-    const payload = msg.content.data;
+    let payload = msg.content.data;
     if (disconnected || !(payload.success ?? true)) {
       return;
     }
@@ -802,8 +803,21 @@ const connectToComm = (
     } else if (payload.type === 'set_exec_mode') {
       state.numAltModeExecutes = 0;
       state.settings.exec_mode = payload.exec_mode as string;
+    } else if (payload.type === 'batch_cell_executed') {
+      state.handleBatchCellExecuted(payload);
     } else if (payload.type === 'compute_exec_schedule') {
+      const schedule = state.applyExecSchedulePayload(payload);
+      if (schedule === null) {
+        return;
+      }
+      payload = schedule;
       state.settings = payload.settings as { [key: string]: string };
+      for (const cellId of (payload.batch_executed_cells ?? []) as string[]) {
+        state.executedReactiveReadyCells.add(cellId);
+      }
+      state.clearPendingPrompts(
+        (payload.batch_cancelled_cells ?? []) as string[]
+      );
       const ipyflow_metadata =
         (notebook.model as any).getMetadata?.('ipyflow') ?? ({} as any);
       const parentsFromMetadata = ipyflow_metadata?.cell_parents ?? {};
@@ -920,15 +934,28 @@ const connectToComm = (
             .sort((a, b) => state.orderIdxById[a] - state.orderIdxById[b])
             .map((id) => state.cellsById[id]);
         }
+        const cascadePaused = (payload.cascade_paused as boolean) ?? false;
         if (reactiveCells.length === 0) {
           doneReactivelyExecuting = true;
+        } else if (
+          cascadePaused &&
+          !state.confirmCascade(
+            reactiveCells.length,
+            payload.cascade_cost as number
+          )
+        ) {
+          doneReactivelyExecuting = true;
         } else {
           state.isReactivelyExecuting = true;
-          state.executedReactiveReadyCells = new Set([
-            ...state.executedReactiveReadyCells,
-            ...reactiveCells.map((cell) => cell.model.id),
-          ]);
-          state.executeCells(reactiveCells);
+          if (state.settings.kernel_batch_execution_enabled) {
+            state.executeCellsInKernel(reactiveCells, cascadePaused);
+          } else {
+            state.executedReactiveReadyCells = new Set([
+              ...state.executedReactiveReadyCells,
+              ...reactiveCells.map((cell) => cell.model.id),
+            ]);
+            state.executeCells(reactiveCells);
+          }
         }
       } else if (state.settings.reactivity_mode === 'incremental') {
         let lastExecutedCellIdSeen = false;
@@ -57,6 +57,8 @@ export class IpyflowSessionState {
   settings: { [key: string]: string } = {};
   lastCellMetadataMap: CellMetadataMap | null = null;
   inProgressExecs = 0;
+  lastExecSchedule: { [key: string]: any } | null = null;
+  execScheduleRevision: number | null = null;
 
   gatherCellMetadataAndContent() {
     const cell_metadata_by_id: CellMetadataMap = {};
@@ -71,14 +73,63 @@ export class IpyflowSessionState {
     return cell_metadata_by_id;
   }
 
-  requestComputeExecSchedule() {
+  execScheduleSyncFields(): { [key: string]: JSONValue } {
+    return {
+      exec_schedule_deltas: true,
+      ack_revision: this.execScheduleRevision,
+    };
+  }
+
+  requestComputeExecSchedule(fullSnapshot = false) {
     (this.safeSend ?? this.comm.send)({
       type: 'compute_exec_schedule',
       cell_metadata_by_id: this.gatherCellMetadataAndContent(),
       is_reactively_executing: this.isReactivelyExecuting,
+      full_snapshot: fullSnapshot,
+      ...this.execScheduleSyncFields(),
     });
   }
 
+  // turns a (possibly delta-encoded) exec schedule into a full one, or returns
+  // null and asks for a full snapshot if the delta is against some other state
+  applyExecSchedulePayload(payload: {
+    [key: string]: any;
+  }): { [key: string]: any } | null {
+    if (!(payload.is_delta ?? false)) {
+      this.lastExecSchedule = payload;
+      this.execScheduleRevision = (payload.revision as number) ?? null;
+      return payload;
+    }
+    if (
+      this.lastExecSchedule === null ||
+      payload.base_revision !== this.execScheduleRevision
+    ) {
+      this.lastExecSchedule = null;
+      this.execScheduleRevision = null;
+      this.requestComputeExecSchedule(true);
+      return null;
+    }
+    const schedule = { ...this.lastExecSchedule };
+    for (const key of payload.removed as string[]) {
+      delete schedule[key];
+    }
+    Object.assign(schedule, payload.changed);
+    for (const [key, patch] of Object.entries(
+      payload.patched as { [key: string]: any }
+    )) {
+      const patched = { ...(schedule[key] ?? {}) };
+      for (const subKey of patch.removed as string[]) {
+        delete patched[subKey];
+      }
+      schedule[key] = Object.assign(patched, patch.changed);
+    }
+    schedule.type = payload.type;
+    schedule.success = payload.success;
+    this.lastExecSchedule = schedule;
+    this.execScheduleRevision = payload.revision as number;
+    return schedule;
+  }
+
   isBatchReactive() {
     return (
       (this.isIpyflowCommConnected ?? false) &&
@@ -112,6 +163,58 @@ export class IpyflowSessionState {
     }
   }
 
+  confirmCascade(numCells: number, estimatedSeconds: number): boolean {
+    return window.confirm(
+      `Reactively rerunning ${numCells} cell(s) is estimated to take ` +
+        `${Math.round(estimatedSeconds)}s, which exceeds the cost budget. Continue?`
+    );
+  }
+
+  executeCellsInKernel(
+    cells: Cell<ICellModel>[],
+    ignoreCostBudget = false
+  ): void {
+    if (cells.length === 0) {
+      return;
+    }
+    for (const cell of cells) {
+      cell.setPrompt('*');
+    }
+    this.isReactivelyExecuting = true;
+    (this.safeSend ?? this.comm.send)({
+      type: 'execute_closure',
+      cell_ids: cells.map((cell) => cell.model.id),
+      executed_cell_ids: Array.from(this.executedReactiveReadyCells),
+      ignore_cost_budget: ignoreCostBudget,
+      cell_metadata_by_id: this.gatherCellMetadataAndContent(),
+      ...this.execScheduleSyncFields(),
+    });
+  }
+
+  handleBatchCellExecuted(payload: { [key: string]: any }): void {
+    const cell = this.cellsById[payload.cell_id as string];
+    if (cell === undefined || cell.model.type !== 'code') {
+      return;
+    }
+    const model = (cell as CodeCell).model;
+    model.outputs.clear();
+    for (const output of payload.outputs ?? []) {
+      model.outputs.add(output);
+    }
+    model.executionCount = (payload.execution_count as number) ?? null;
+    this.executedCells.add(cell.model.id);
+    this.executedReactiveReadyCells.add(cell.model.id);
+  }
+
+  clearPendingPrompts(cellIds: string[]): void {
+    for (const cellId of cellIds) {
+      const cell = this.cellsById[cellId];
+      if (cell?.promptNode?.textContent?.includes('[*]')) {
+        cell.setPrompt('');
+      }
+    }
+  }
+
   executeClosure(cells: Cell<ICellModel>[]) {
     if (cells.length === 0) {
       return;
@@ -284,6 +387,14 @@ export class IpyflowSessionState {
     inclusive = true,
     parents = false
   ): Set<string> {
+    if (!parents && !(this.settings.pull_reactive_updates ?? false)) {
+      // plain reachability, so a worklist over direct edges suffices
+      return this.computeRawTransitiveClosureIteratively(
+        startCellIds,
+        this.cellChildren,
+        inclusive
+      );
+    }
     let cellIds = startCellIds;
     const closure = new Set(cellIds);
     while (true) {
@@ -334,6 +445,30 @@ export class IpyflowSessionState {
     return closure;
   }
 
+  computeRawTransitiveClosureIteratively(
+    startCellIds: string[],
+    edges: { [id: string]: string[] },
+    inclusive = true
+  ): Set<string> {
+    const closure = new Set(startCellIds);
+    const worklist = [...startCellIds];
+    while (worklist.length > 0) {
+      const cellId = worklist.pop() as string;
+      for (const related of edges[cellId] ?? []) {
+        if (!closure.has(related)) {
+          closure.add(related);
+          worklist.push(related);
+        }
+      }
+    }
+    if (!inclusive) {
+      for (const cellId of startCellIds) {
+        closure.delete(cellId);
+      }
+    }
+    return closure;
+  }
+
   computeTransitiveClosure(
     startCellIds: string[],
     inclusive = true,
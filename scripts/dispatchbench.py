@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for resolving annotation handlers of method calls, comparing
+the precomputed dispatch table against walking the mro on every call. Run
+from the repository root, e.g.:
+
+    ./scripts/dispatchbench.py --calls 100000
+
+The sklearn benchmark is skipped when sklearn is not installed.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "core"))
+
+from ipyflow.annotations.compiler import (  # noqa: E402
+    compile_pending_handlers,
+    register_annotations_directory,
+)
+from ipyflow.tracing.external_calls.base_handlers import (  # noqa: E402
+    REGISTERED_HANDLER_BY_METHOD,
+    resolve_method_handler,
+)
+
+
+def walk_mro(concrete_type, method):
+    for cls in concrete_type.mro():
+        handler = REGISTERED_HANDLER_BY_METHOD.get((cls, method))
+        if handler is not None:
+            return handler, cls
+    return None, None
+
+
+def pandas_calls():
+    import pandas as pd
+
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]})
+    calls = []
+    for method in ("assign", "query", "groupby", "sort_values", "reset_index"):
+        calls.append((type(df), method))
+    for method in ("sum", "mean", "fillna", "astype", "rename"):
+        calls.append((type(df["a"]), method))
+    return calls
+
+
+def sklearn_calls():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    class UserScaler(StandardScaler):
+        pass
+
+    pipeline = Pipeline([("scale", UserScaler()), ("clf", LogisticRegression())])
+    calls = []
+    for _, step in pipeline.steps:
+        for method in ("fit", "fit_transform", "transform", "predict"):
+            calls.append((type(step), method))
+    for method in ("fit", "predict", "score"):
+        calls.append((type(pipeline), method))
+    return calls
+
+
+def bench(name, calls, num_calls):
+    rounds = max(1, num_calls // len(calls))
+
+    def run(resolve):
+        for concrete_type, method in calls:
+            resolve(concrete_type, method)
+
+    for concrete_type, method in calls:
+        assert resolve_method_handler(concrete_type, method) == walk_mro(
+            concrete_type, method
+        )
+    walk_s = min(timeit.repeat(lambda: run(walk_mro), number=rounds, repeat=3))
+    table_s = min(
+        timeit.repeat(lambda: run(resolve_method_handler), number=rounds, repeat=3)
+    )
+    per_call = float(rounds * len(calls))
+    print(
+        f"{name}: mro walk {walk_s / per_call * 1e9:.0f}ns/call, "
+        f"dispatch table {table_s / per_call * 1e9:.0f}ns/call "
+        f"({walk_s / table_s:.1f}x)"
+    )
+
+
+def main(args):
+    register_annotations_directory(
+        os.path.join(
+            os.path.dirname(__file__), os.pardir, "core", "ipyflow", "annotations"
+        )
+    )
+    for name, make_calls in (("pandas", pandas_calls), ("sklearn", sklearn_calls)):
+        try:
+            calls = make_calls()
+        except ImportError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        compile_pending_handlers()
+        bench(name, calls, args.calls)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Handler dispatch benchmark for ipyflow."
+    )
+    parser.add_argument(
+        "--calls",
+        type=int,
+        default=100000,
+        help="number of lookups to time per benchmark",
+    )
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Measures how long importing ipyflow takes using `python -X importtime`, and
+fails if it exceeds a budget. Run from the repository root, e.g.:
+
+    ./scripts/importtime.py --budget-ms 150
+    ./scripts/importtime.py --stmt "import ipyflow.kernel" --budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def measure(stmt, top_module):
+    env = dict(os.environ, PYTHONPATH="core")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_by_module = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        if not cumulative_us.strip().isdigit():
+            # the header line
+            continue
+        cumulative_by_module[module.strip()] = int(cumulative_us)
+    return cumulative_by_module[top_module] / 1000.0, cumulative_by_module
+
+
+def main(args):
+    top_module = args.stmt.split()[-1].split(",")[0]
+    timings = []
+    cumulative_by_module = {}
+    for _ in range(args.repeat):
+        total_ms, cumulative_by_module = measure(args.stmt, top_module)
+        timings.append(total_ms)
+    best_ms = min(timings)
+    print(f"{args.stmt}: best of {args.repeat}: {best_ms:.1f}ms")
+    slowest = sorted(cumulative_by_module.items(), key=lambda kv: -kv[1])
+    for module, cumulative_us in slowest[: args.top]:
+        print(f"  {cumulative_us / 1000.0:8.1f}ms  {module}")
+    if args.budget_ms is not None and best_ms > args.budget_ms:
+        print(f"import time {best_ms:.1f}ms exceeds budget of {args.budget_ms}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time benchmark for ipyflow.")
+    parser.add_argument(
+        "--stmt", default="import ipyflow", help="import statement to time"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of fresh interpreters to take the best of",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="number of slowest modules to show"
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="fail if the best time exceeds this",
+    )
+    sys.exit(main(parser.parse_args()))
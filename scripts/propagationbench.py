@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmarks propagating staleness from one updated symbol to a large number of
+dependents, which is too slow to run as part of the unit tests. Run from the
+repository root, e.g.:
+
+    ./scripts/propagationbench.py --children 100000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "core"))
+
+from ipyflow.data_model.cell import cells  # noqa: E402
+from ipyflow.data_model.symbol import Symbol, SymbolType  # noqa: E402
+from ipyflow.flow import NotebookFlow  # noqa: E402
+from ipyflow.shell import IPyflowInteractiveShell  # noqa: E402
+from ipyflow.singletons import flow, shell  # noqa: E402
+from ipyflow.tracing.ipyflow_tracer import DataflowTracer  # noqa: E402
+
+
+def run_cell(code, cell_id):
+    shell().execution_count = cells().next_exec_counter()
+    flow().set_active_cell(cell_id)
+    cells()._position_by_cell_id[cell_id] = cell_id
+    shell().run_cell(code, cell_id=cell_id)
+
+
+def make_fan_out(root, num_children):
+    children = []
+    for idx in range(num_children):
+        child = Symbol(
+            f"child_{idx}", SymbolType.DEFAULT, object(), root.containing_scope
+        )
+        root.containing_scope.put(child.name, child)
+        root.children[child] = []
+        child.parents[root] = []
+        children.append(child)
+    return children
+
+
+def bench(num_children):
+    NotebookFlow.clear_instance()
+    NotebookFlow.instance(test_context=True)
+    DataflowTracer.clear_instance()
+    DataflowTracer.reset_bookkeeping()
+    DataflowTracer.instance()
+    run_cell("x = 0", 1)
+    children = make_fan_out(flow().global_scope["x"], num_children)
+    start = time.perf_counter()
+    run_cell("x = 1", 1)
+    elapsed = time.perf_counter() - start
+    assert all(child.is_waiting for child in children)
+    IPyflowInteractiveShell.instance().cleanup_tracers()
+    IPyflowInteractiveShell.instance().reset()
+    return elapsed
+
+
+def main(args):
+    logging.disable(logging.WARNING)
+    IPyflowInteractiveShell.instance()
+    baseline_s = min(bench(0) for _ in range(args.repeat))
+    fan_out_s = min(bench(args.children) for _ in range(args.repeat))
+    print(
+        f"fan-out to {args.children} children: {fan_out_s:.3f}s "
+        f"({(fan_out_s - baseline_s) / args.children * 1e6:.2f}us/child over "
+        f"a {baseline_s * 1e3:.1f}ms cell with no dependents)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Staleness propagation benchmark for ipyflow."
+    )
+    parser.add_argument(
+        "--children",
+        type=int,
+        default=10**5,
+        help="number of symbols depending on the updated one",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of times to repeat each measurement",
+    )
+    sys.exit(main(parser.parse_args()))